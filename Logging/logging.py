@@ -1,76 +1,229 @@
+import atexit
+import gzip
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import shutil
 import sys
-import asyncio
 import time
-from datetime import datetime
+from datetime import datetime, timezone
 from fastapi import Request
 
-# Define log directory and file path
-LOG_DIR = r"E:\TrendConnect\Logging"
+# Log files live next to the code by default; containers usually point LOG_DIR at a volume
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOG_DIR = os.getenv("LOG_DIR", os.path.join(PROJECT_ROOT, "logs"))
 LOG_FILE_PATH = os.path.join(LOG_DIR, "trendconnect.log")
 
-# Ensure the log directory exists
-if not os.path.exists(LOG_DIR):
-    os.makedirs(LOG_DIR)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Per-module overrides, e.g. "routes.likes_routes=DEBUG,tasks=WARNING,sqlalchemy.engine=INFO"
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+# "json" or "text" on stdout; the file is always JSON lines
+LOG_CONSOLE_FORMAT = os.getenv("LOG_CONSOLE_FORMAT", "json")
+# The file is rotated when it reaches either limit; rotated files are gzipped
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(50 * 1024 * 1024)))
+LOG_ROTATE_HOURS = float(os.getenv("LOG_ROTATE_HOURS", "24"))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "14"))
+
+# LogRecord attributes that are not user supplied `extra` fields
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "module_path"}
+
+
+_module_paths = {}
+
+
+def _module_path(pathname: str) -> str:
+    """Dotted module of a source file inside the project, e.g. routes.likes_routes."""
+    module = _module_paths.get(pathname)
+    if module is None:
+        relative = os.path.relpath(pathname, PROJECT_ROOT)
+        if relative.startswith(".."):
+            module = os.path.splitext(os.path.basename(pathname))[0]
+        else:
+            module = os.path.splitext(relative)[0].replace(os.sep, ".")
+        _module_paths[pathname] = module
+    return module
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the standard fields plus any `extra` passed to the log call."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "module": getattr(record, "module_path", record.module),
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and value is not None:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class ModuleLevelFilter(logging.Filter):
+    """
+    Applies per-module levels to the shared application logger. The most
+    specific configured prefix of the record's module wins.
+    """
+
+    def __init__(self, default_level: int, levels: dict):
+        super().__init__()
+        self.default_level = default_level
+        self.levels = levels
+        self._resolved = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        module = _module_path(record.pathname)
+        record.module_path = module
+        level = self._resolved.get(module)
+        if level is None:
+            level = self.default_level
+            for prefix in sorted(self.levels, key=len, reverse=True):
+                if module == prefix or module.startswith(prefix + "."):
+                    level = self.levels[prefix]
+                    break
+            self._resolved[module] = level
+        return record.levelno >= level
+
+
+class GzipRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Rotates on size or age, whichever comes first, and gzips rotated files."""
+
+    def __init__(self, filename: str, max_bytes: int, rotate_seconds: float, backup_count: int):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True)
+        self.rotate_seconds = rotate_seconds
+        self.rollover_at = time.time() + rotate_seconds
+        self.namer = lambda name: f"{name}.gz"
+        self.rotator = self._gzip
+
+    @staticmethod
+    def _gzip(source: str, dest: str):
+        with open(source, "rb") as plain, gzip.open(dest, "wb") as compressed:
+            shutil.copyfileobj(plain, compressed)
+        os.remove(source)
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.rotate_seconds > 0 and time.time() >= self.rollover_at:
+            return os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = time.time() + self.rotate_seconds
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the writer thread with as little work as possible on the
+    calling thread: the message is merged with its arguments and the traceback
+    rendered (both need the caller's state), JSON formatting and I/O happen in
+    the listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if not hasattr(record, "module_path"):
+            record.module_path = record.name  # Library records skip ModuleLevelFilter
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.stack_info = None
+        return record
+
+
+def _parse_level(name: str, setting: str) -> int:
+    level = logging.getLevelName(name.strip().upper())
+    if not isinstance(level, int):
+        raise ValueError(f"{setting}: unknown log level {name.strip()!r}, expected DEBUG, INFO, WARNING, ERROR or CRITICAL")
+    return level
+
+
+def _parse_levels(spec: str) -> dict:
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = item.partition("=")
+        levels[name.strip()] = _parse_level(level, f"LOG_LEVELS entry {item!r}")
+    return levels
+
+
+def _configure_library_loggers(levels: dict, handler: logging.Handler):
+    """
+    Applies the overrides to library loggers of that name (sqlalchemy.engine,
+    uvicorn.access, ...). Those without a handler of their own write through
+    the queue too; otherwise their records would reach no handler at all.
+    """
+    for name, level in levels.items():
+        library_logger = logging.getLogger(name)
+        library_logger.setLevel(level)
+        if not library_logger.handlers:
+            library_logger.addHandler(handler)
+            library_logger.propagate = False
+
+
+def _build_listener():
+    os.makedirs(LOG_DIR, exist_ok=True)
+    file_handler = GzipRotatingFileHandler(LOG_FILE_PATH, LOG_MAX_BYTES, LOG_ROTATE_HOURS * 3600, LOG_BACKUP_COUNT)
+    file_handler.setFormatter(JsonFormatter())
+
+    console_handler = logging.StreamHandler(sys.stdout)
+    if LOG_CONSOLE_FORMAT == "text":
+        console_handler.setFormatter(logging.Formatter(
+            "%(asctime)s - %(levelname)s - %(module_path)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
+        ))
+    else:
+        console_handler.setFormatter(JsonFormatter())
+
+    return logging.handlers.QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+
+
+# Request threads only enqueue; a single listener thread formats and writes
+log_queue = queue.SimpleQueue()
+
+_default_level = _parse_level(LOG_LEVEL, "LOG_LEVEL")
+_module_levels = _parse_levels(LOG_LEVELS)
 
 # Create a logger
 logger = logging.getLogger("trendconnect_logger")
-logger.setLevel(logging.INFO)  # Set logging level
+logger.setLevel(min([_default_level, *_module_levels.values()]))
+logger.addFilter(ModuleLevelFilter(_default_level, _module_levels))
+logger.addHandler(_QueueHandler(log_queue))
+logger.propagate = False
 
-# Formatter for logs
-formatter = logging.Formatter(
-    "%(asctime)s - %(levelname)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
-)
+_configure_library_loggers(_module_levels, _QueueHandler(log_queue))
 
-# File Handler - Stores logs in a file
-file_handler = logging.FileHandler(LOG_FILE_PATH, mode="a", encoding="utf-8")
-file_handler.setFormatter(formatter)
-logger.addHandler(file_handler)
-
-# Console Handler - Outputs logs to the terminal
-console_handler = logging.StreamHandler(sys.stdout)
-console_handler.setFormatter(formatter)
-logger.addHandler(console_handler)
+listener = _build_listener()
+listener.start()
+atexit.register(listener.stop)
 
 
 async def log_event(request: Request, response_status: int, execution_time: float, response_body: str = None, error: str = None):
     """
-    Logs request and response details asynchronously.
-    
+    Logs request and response details as one structured record.
+    Only enqueues the record, so it is safe to await on the event loop.
+
     :param request: The incoming HTTP request
     :param response_status: HTTP response status code
     :param execution_time: Time taken to execute the request (in seconds)
     :param response_body: Optional response content (truncated for readability)
     :param error: Optional error message if an exception occurred
     """
-    log_time = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-    client_ip = request.client.host if request.client else "Unknown"
-    method = request.method
-    url = str(request.url)
-    endpoint = request.url.path  # Extract endpoint name
-    execution_time_ms = round(execution_time * 1000, 2)  # Convert to milliseconds
-
-    log_message = (
-        f"[{log_time}] - IP: {client_ip} | {method} {url} "
-        f"| Endpoint: {endpoint} | Status: {response_status} | Time: {execution_time_ms} ms"
+    logger.info(
+        f"{request.method} {request.url.path} {response_status}",
+        extra={
+            "client_ip": request.client.host if request.client else "Unknown",
+            "method": request.method,
+            "url": str(request.url),
+            "endpoint": request.url.path,
+            "status": response_status,
+            "duration_ms": round(execution_time * 1000, 2),
+            "error": error,
+            "response": response_body[:500] if response_body else None,
+        }
     )
-
-    if error:
-        log_message += f" | ERROR: {error}"
-
-    if response_body:
-        log_message += f" | Response: {response_body[:500]}"  # Limit response size for readability
-
-    # Run logging in the background
-    asyncio.create_task(write_log(log_message))
-
-
-async def write_log(message: str):
-    """
-    Writes log message asynchronously to both the log file and console.
-    
-    :param message: The formatted log message
-    """
-    loop = asyncio.get_running_loop()
-    await loop.run_in_executor(None, logger.info, message)
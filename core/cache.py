@@ -0,0 +1,265 @@
+"""
+Response cache for hot, mostly-read endpoints.
+
+Entries are JSON documents stored under a key together with the versions of
+the tags they depend on (for example "content" or "post:42"). Write routes
+invalidate by bumping tag versions once their transaction commits; an entry
+whose stored versions no longer match is a miss, so nothing has to find and
+delete the affected keys. Concurrent misses on the same key in one process
+are coalesced so the query runs once.
+
+CACHE_URL selects the backend: `local://` (default, an LRU + TTL map per
+process, so invalidations only reach the process that made them and other
+workers catch up within the TTL), `redis://...` (shared by all workers,
+requires the `redis` package) or `none://` (disabled).
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from Logging.logging import logger
+
+CACHE_URL = os.getenv("CACHE_URL", "local://")
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "30"))
+
+REDIS_PREFIX = "trendconnect:cache:"
+
+
+class LocalBackend:
+    """In-process LRU map with per-entry expiry; tag versions are plain counters."""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: int):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def versions(self, tags: List[str]) -> List[int]:
+        with self._lock:
+            return [self._versions.get(tag, 0) for tag in tags]
+
+    def bump(self, tags: Iterable[str]):
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+
+class RedisBackend:
+    """Shared backend speaking the Redis protocol; takes a URL or a ready client."""
+
+    def __init__(self, url: Optional[str] = None, client=None):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self._client = client
+
+    def get(self, key: str) -> Optional[str]:
+        value = self._client.get(REDIS_PREFIX + key)
+        return value.decode() if isinstance(value, bytes) else value
+
+    def set(self, key: str, value: str, ttl: int):
+        self._client.set(REDIS_PREFIX + key, value, ex=ttl)
+
+    def versions(self, tags: List[str]) -> List[int]:
+        if not tags:
+            return []
+        return [int(version or 0) for version in self._client.mget([f"{REDIS_PREFIX}tag:{tag}" for tag in tags])]
+
+    def bump(self, tags: Iterable[str]):
+        pipeline = self._client.pipeline(transaction=False)
+        for tag in tags:
+            pipeline.incr(f"{REDIS_PREFIX}tag:{tag}")
+        pipeline.execute()
+
+    def clear(self):
+        keys = list(self._client.scan_iter(f"{REDIS_PREFIX}*"))
+        if keys:
+            self._client.delete(*keys)
+
+
+class _Flight:
+    """A computation in progress that concurrent callers for the same key wait on."""
+    __slots__ = ("done", "value", "failed")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.failed = False
+
+
+class ResponseCache:
+    """
+    get_or_compute() is meant for sync routes, which run in the threadpool:
+    callers coalesced onto another request's computation block until it ends.
+    Backend and serialization errors are logged and the value is computed
+    uncached, so a cache outage never fails a request.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.counts = {"hit": 0, "miss": 0, "coalesced": 0, "error": 0}
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, outcome: str):
+        with self._lock:
+            self.counts[outcome] += 1
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        tags: Union[Iterable[str], Callable[[Any], Iterable[str]]] = (),
+        ttl: int = CACHE_TTL_SECONDS
+    ):
+        """
+        Returns the cached value of `key`, or runs `compute` and caches its
+        JSON-serializable result, which callers must not modify since
+        coalesced callers share it. `tags` may depend on the result (e.g. the
+        posts on a page); their versions are then read after computing, so a
+        write landing in between can leave the entry stale for up to `ttl`.
+        """
+        if self.backend is None:
+            return compute()
+
+        static_tags = None if callable(tags) else sorted(set(tags))
+        try:
+            cached = self.backend.get(key)
+            if cached is not None:
+                entry = json.loads(cached)
+                if self.backend.versions(entry["tags"]) == entry["versions"]:
+                    self._count("hit")
+                    return entry["value"]
+            versions = self.backend.versions(static_tags) if static_tags is not None else None
+        except Exception as e:
+            self._count("error")
+            logger.warning(f"Cache read failed for {key}: {str(e)}")
+            return compute()
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            self._count("coalesced")
+            flight.done.wait()
+            if not flight.failed:
+                return flight.value
+            return compute()
+
+        self._count("miss")
+        try:
+            value = compute()
+            flight.value = value
+        except BaseException:
+            flight.failed = True
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+        try:
+            entry_tags = static_tags if static_tags is not None else sorted(set(tags(value)))
+            if versions is None:
+                versions = self.backend.versions(entry_tags)
+            self.backend.set(key, json.dumps({"tags": entry_tags, "versions": versions, "value": value}), ttl)
+        except Exception as e:
+            self._count("error")
+            logger.warning(f"Cache write failed for {key}: {str(e)}")
+        return value
+
+    def invalidate(self, *tags: str):
+        if self.backend is None or not tags:
+            return
+        try:
+            self.backend.bump(tags)
+        except Exception as e:
+            self._count("error")
+            logger.error(f"Cache invalidation of {', '.join(tags)} failed: {str(e)}")
+
+    def versions(self, tags: Iterable[str]) -> List[int]:
+        """Current versions of the given tags, e.g. to derive validators."""
+        tags = list(tags)
+        if self.backend is None:
+            return [0] * len(tags)
+        return self.backend.versions(tags)
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+    def render(self) -> str:
+        with self._lock:
+            counts = dict(self.counts)
+        lines = [
+            "# HELP response_cache_requests_total Cache lookups by outcome: hit, miss, coalesced onto another miss, backend error.",
+            "# TYPE response_cache_requests_total counter",
+        ]
+        lines.extend(f'response_cache_requests_total{{outcome="{outcome}"}} {count}' for outcome, count in counts.items())
+        return "\n".join(lines) + "\n"
+
+
+def _create_backend():
+    if CACHE_URL.startswith(("redis://", "rediss://")):
+        return RedisBackend(CACHE_URL)
+    if CACHE_URL.startswith("none"):
+        return None
+    return LocalBackend()
+
+
+cache = ResponseCache(_create_backend())
+
+
+def cache_key(*parts) -> str:
+    return ":".join(str(part) for part in parts)
+
+
+# Invalidate only once the write the tags describe is committed
+
+def invalidate_after_commit(db: Session, *tags: str):
+    """Queues tag invalidations on the session; they are applied if and when the transaction commits."""
+    db.info.setdefault("cache_tags", set()).update(tags)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session: Session):
+    tags = session.info.pop("cache_tags", None)
+    if tags:
+        cache.invalidate(*tags)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session: Session):
+    session.info.pop("cache_tags", None)
@@ -0,0 +1,204 @@
+"""
+Response compression negotiated from Accept-Encoding: zstd and brotli when
+the optional `zstandard` / `brotli` packages are installed, gzip always.
+
+Complete bodies are compressed in one go once they reach
+COMPRESSION_MIN_SIZE. Streamed bodies (NDJSON exports, server-sent events)
+are compressed chunk by chunk, and every chunk is flushed to the client as it
+is produced, so nothing is buffered and events are not delayed.
+"""
+import os
+import zlib
+from typing import Callable, Dict, Optional
+from starlette.datastructures import Headers, MutableHeaders
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_TYPES = frozenset(
+    media_type.strip() for media_type in os.getenv(
+        "COMPRESSION_TYPES",
+        "application/json,application/x-ndjson,text/event-stream,text/html,text/plain"
+    ).split(",") if media_type.strip()
+)
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_LEVEL = int(os.getenv("BROTLI_LEVEL", "4"))
+ZSTD_LEVEL = int(os.getenv("ZSTD_LEVEL", "3"))
+
+
+class GzipEncoder:
+    def __init__(self, level: int = GZIP_LEVEL):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliEncoder:
+    def __init__(self, level: int = BROTLI_LEVEL):
+        import brotli
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdEncoder:
+    def __init__(self, level: int = ZSTD_LEVEL):
+        import zstandard
+        self._flush_block = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(self._flush_block)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+def available_encoders() -> Dict[str, Callable]:
+    """Encoders usable in this process, most preferred first."""
+    encoders = {}
+    for name, encoder, module in (("zstd", ZstdEncoder, "zstandard"), ("br", BrotliEncoder, "brotli")):
+        try:
+            __import__(module)
+        except ImportError:
+            continue
+        encoders[name] = encoder
+    encoders["gzip"] = GzipEncoder
+    return encoders
+
+
+ENCODERS = available_encoders()
+
+
+def choose_encoding(accept_encoding: str, encoders: Dict[str, Callable] = ENCODERS) -> Optional[str]:
+    """
+    The encoding to use for an Accept-Encoding header: among the codings the
+    client accepts with the highest q-value, the one we prefer. None for identity.
+    """
+    accepted = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                continue
+        if name:
+            accepted[name.strip()] = quality
+
+    best, best_quality = None, 0.0
+    for name in encoders:
+        quality = accepted.get(name, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+def _compressible(headers: Headers, status: int) -> bool:
+    if status < 200 or status in (204, 304) or "content-encoding" in headers:
+        return False
+    if "no-transform" in headers.get("cache-control", ""):
+        return False
+    media_type = headers.get("content-type", "").split(";")[0].strip().lower()
+    return media_type in COMPRESSION_TYPES
+
+
+class CompressionMiddleware:
+    """
+    Pure ASGI middleware compressing responses of the allowed content types.
+    The response start is held back until the first body chunk shows whether
+    the body is complete and large enough, or a stream.
+    """
+
+    def __init__(self, app, min_size: int = COMPRESSION_MIN_SIZE, encoders: Dict[str, Callable] = ENCODERS):
+        self.app = app
+        self.min_size = min_size
+        self.encoders = encoders
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""), self.encoders)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        encoder = None
+        passthrough = False
+
+        async def compressing_send(message):
+            nonlocal start, encoder, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if not _compressible(headers, message["status"]):
+                    passthrough = True
+                    await send(message)
+                    return
+                start = message
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if encoder is None:
+                headers = MutableHeaders(raw=start["headers"])
+                headers.add_vary_header("Accept-Encoding")
+                if not more_body and len(body) < self.min_size:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+
+                encoder = self.encoders[encoding]()
+                headers["Content-Encoding"] = encoding
+                if "content-length" in headers:
+                    del headers["content-length"]
+                if "etag" in headers and not headers["etag"].startswith("W/"):
+                    # A strong validator names exact bytes, which now differ per encoding
+                    headers["ETag"] = "W/" + headers["etag"]
+
+                if not more_body:
+                    body = encoder.compress(body) + encoder.finish()
+                    headers["Content-Length"] = str(len(body))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                await send(start)
+
+            if more_body:
+                if not body:
+                    return
+                chunk = encoder.compress(body) + encoder.flush()
+            else:
+                chunk = encoder.compress(body) + encoder.finish()
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, compressing_send)
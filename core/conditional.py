@@ -0,0 +1,72 @@
+"""
+Conditional GET for read endpoints.
+
+ETags are derived from the response cache's tag versions (see core.cache)
+instead of hashing the body, so a matching If-None-Match is answered with 304
+before the endpoint runs its queries. The tags of a response are the same ones
+the write routes already invalidate.
+
+With the per-process `local://` backend, tag versions only count the writes a
+worker handled itself, so its ETags also include a process id and roll over
+every CACHE_TTL_SECONDS: a client may revalidate in full when it reaches
+another worker, and sees other workers' writes within the TTL, as with the
+cache itself. With the cache disabled, no ETags are sent.
+"""
+import hashlib
+import json
+import time
+import uuid
+from typing import Iterable, Optional
+from fastapi import Request, Response, status
+from core.cache import CACHE_TTL_SECONDS, LocalBackend, cache
+from Logging.logging import logger
+
+PROCESS_ID = uuid.uuid4().hex
+
+# Responses may be stored by the client, but must be revalidated before reuse
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(tags: Iterable[str], *parts) -> Optional[str]:
+    """
+    Weak ETag over the current versions of `tags` and any request parameters
+    in `parts` that shape the response. None if no validator can be given.
+    """
+    if cache.backend is None:
+        return None
+    tags = sorted(set(tags))
+    try:
+        versions = cache.versions(tags)
+    except Exception as e:
+        logger.warning(f"ETag versions unavailable: {str(e)}")
+        return None
+
+    seed = [tags, versions, parts]
+    if isinstance(cache.backend, LocalBackend):
+        seed += [PROCESS_ID, int(time.time() // CACHE_TTL_SECONDS)]
+    digest = hashlib.sha1(json.dumps(seed, default=str).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+
+def not_modified(request: Request, response: Response, etag: Optional[str]) -> Optional[Response]:
+    """
+    Sets the validator headers on the endpoint's response and returns a 304
+    response to send instead if the client already holds this version.
+    """
+    if etag is None:
+        return None
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    response.headers.update(headers)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return None
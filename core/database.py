@@ -1,6 +1,13 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker, declarative_base, Session
+from sqlalchemy.pool import Pool
+from sqlalchemy.dialects import postgresql, sqlite
 from configuration.config import settings  # Import settings instead of DATABASE_URL
+from core.metrics import background_metrics
 
 # Use settings to get the database URL
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
@@ -21,3 +28,44 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Name of the background task whose session is open in the current context
+_background_task: ContextVar[Optional[str]] = ContextVar("background_task", default=None)
+
+@contextmanager
+def background_session(task: str, session_factory=None):
+    """
+    Short-lived session for work outside of a request, e.g. a background task
+    that was handed plain ids. Commits on success, rolls back on error and
+    closes on exit, so the pooled connection is back in the pool before the
+    task goes on to network calls such as SMTP. How long the connection was
+    checked out is reported per task in /metrics.
+    """
+    token = _background_task.set(task)
+    db = (session_factory or SessionLocal)()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+        _background_task.reset(token)
+
+@event.listens_for(Pool, "checkout")
+def _connection_checked_out(dbapi_connection, connection_record, connection_proxy):
+    connection_record.info["checked_out_at"] = time.perf_counter()
+
+@event.listens_for(Pool, "checkin")
+def _connection_checked_in(dbapi_connection, connection_record):
+    checked_out_at = connection_record.info.pop("checked_out_at", None)
+    task = _background_task.get()
+    if task is not None and checked_out_at is not None:
+        background_metrics.record_connection_held(task, time.perf_counter() - checked_out_at)
+
+# INSERT construct with ON CONFLICT support for the session's database
+def dialect_insert(db: Session, model):
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
@@ -0,0 +1,183 @@
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+from fastapi import HTTPException, status
+from Logging.logging import logger
+
+# I/O-bound work: email, file deletes, notification writes
+IO_EXECUTOR_WORKERS = int(os.getenv("IO_EXECUTOR_WORKERS", "8"))
+IO_EXECUTOR_QUEUE_SIZE = int(os.getenv("IO_EXECUTOR_QUEUE_SIZE", "1000"))
+# CPU-bound work: password hashing. Few workers, so it cannot starve request threads
+CPU_EXECUTOR_WORKERS = int(os.getenv("CPU_EXECUTOR_WORKERS", "2"))
+CPU_EXECUTOR_QUEUE_SIZE = int(os.getenv("CPU_EXECUTOR_QUEUE_SIZE", "64"))
+# Share of the queue open to non-critical tasks; the rest is kept for critical ones
+EXECUTOR_SHED_RATIO = float(os.getenv("EXECUTOR_SHED_RATIO", "0.8"))
+# Time given to queued tasks to finish on shutdown
+EXECUTOR_DRAIN_SECONDS = float(os.getenv("EXECUTOR_DRAIN_SECONDS", "10"))
+
+# Seconds clients are told to wait when a critical task is rejected
+RETRY_AFTER_SECONDS = 5
+
+OUTCOMES = ("completed", "failed", "shed", "rejected")
+
+
+class BoundedExecutor:
+    """
+    Fixed pool of worker threads fed from a bounded queue.
+
+    Non-critical tasks (notifications, courtesy emails) are shed once the
+    queue is EXECUTOR_SHED_RATIO full, which keeps the remaining capacity for
+    critical tasks (OTP emails, password hashing); those are only rejected
+    when the queue is completely full. `submit` never blocks the caller and
+    reports whether the task was accepted, so routes can degrade gracefully.
+    """
+
+    def __init__(self, name: str, workers: int, max_queue: int, shed_ratio: float = EXECUTOR_SHED_RATIO):
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+        self.shed_at = max(1, int(max_queue * shed_ratio))
+        self.counts: Dict[str, int] = dict.fromkeys(OUTCOMES, 0)
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def _count(self, outcome: str):
+        with self._lock:
+            self.counts[outcome] += 1
+
+    def _ensure_started(self):
+        if self._threads:
+            return
+        with self._lock:
+            if not self._threads:
+                self._threads = [
+                    threading.Thread(target=self._work, name=f"{self.name}-executor-{i}", daemon=True)
+                    for i in range(self.workers)
+                ]
+                for thread in self._threads:
+                    thread.start()
+
+    def submit(self, fn: Callable, *args, critical: bool = False, **kwargs) -> bool:
+        """Queues fn(*args, **kwargs). Returns False if the task was shed or rejected."""
+        return self._enqueue(fn, args, kwargs, critical, None)
+
+    def _enqueue(self, fn: Callable, args, kwargs, critical: bool, future: Optional[Future]) -> bool:
+        if self._closed:
+            logger.warning(f"{self.name} executor is shut down, {fn.__name__} rejected")
+            self._count("rejected")
+            return False
+        if not critical and self._queue.qsize() >= self.shed_at:
+            logger.warning(f"{self.name} executor queue at {self._queue.qsize()}/{self.max_queue}, {fn.__name__} shed")
+            self._count("shed")
+            return False
+
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((fn, args, kwargs, future))
+        except queue.Full:
+            logger.error(f"{self.name} executor queue full, {fn.__name__} rejected")
+            self._count("rejected")
+            return False
+        return True
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """
+        Runs a critical task on the pool and awaits its result without
+        blocking the event loop. Answers 503 if the pool is saturated.
+        """
+        future: Future = Future()
+        if not self._enqueue(fn, args, kwargs, True, future):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please retry shortly",
+                headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+            )
+        return await asyncio.wrap_future(future)
+
+    def _work(self):
+        while True:
+            try:
+                fn, args, kwargs, future = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                if self._closed:
+                    return
+                continue
+
+            try:
+                if future is not None and not future.set_running_or_notify_cancel():
+                    continue
+                result = fn(*args, **kwargs)
+                if future is not None:
+                    future.set_result(result)
+                self._count("completed")
+            except Exception as e:
+                if future is not None:
+                    future.set_exception(e)
+                self._count("failed")
+                logger.error(f"{self.name} executor task {fn.__name__} failed: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def shutdown(self, timeout: float = EXECUTOR_DRAIN_SECONDS) -> int:
+        """
+        Stops accepting tasks and gives the queued ones until `timeout` to
+        finish. Returns the number of tasks that had to be abandoned.
+        """
+        self._closed = True
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        abandoned = self._queue.qsize()
+        if abandoned:
+            logger.error(f"{self.name} executor shut down with {abandoned} tasks not run")
+        else:
+            logger.info(f"{self.name} executor drained")
+        return abandoned
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
+
+
+io_executor = BoundedExecutor("io", IO_EXECUTOR_WORKERS, IO_EXECUTOR_QUEUE_SIZE)
+cpu_executor = BoundedExecutor("cpu", CPU_EXECUTOR_WORKERS, CPU_EXECUTOR_QUEUE_SIZE)
+
+EXECUTORS = (io_executor, cpu_executor)
+
+
+def render_executor_metrics() -> str:
+    """Queue depth, capacity and task outcomes of every pool, in Prometheus text format."""
+    lines = [
+        "# HELP executor_queue_depth Tasks waiting in the pool's queue.",
+        "# TYPE executor_queue_depth gauge",
+    ]
+    lines.extend(f'executor_queue_depth{{pool="{executor.name}"}} {executor.depth}' for executor in EXECUTORS)
+    lines.append("# HELP executor_queue_capacity Size of the pool's queue.")
+    lines.append("# TYPE executor_queue_capacity gauge")
+    lines.extend(f'executor_queue_capacity{{pool="{executor.name}"}} {executor.max_queue}' for executor in EXECUTORS)
+    lines.append("# HELP executor_tasks_total Tasks by outcome: completed, failed, shed (non-critical, queue busy) or rejected.")
+    lines.append("# TYPE executor_tasks_total counter")
+    for executor in EXECUTORS:
+        counts = executor.snapshot()
+        lines.extend(
+            f'executor_tasks_total{{pool="{executor.name}",outcome="{outcome}"}} {counts[outcome]}'
+            for outcome in OUTCOMES
+        )
+    return "\n".join(lines) + "\n"
+
+
+def shutdown_executors(timeout: float = EXECUTOR_DRAIN_SECONDS):
+    """Drains both pools within one shared deadline."""
+    deadline = time.monotonic() + timeout
+    for executor in EXECUTORS:
+        executor.shutdown(max(0.0, deadline - time.monotonic()))
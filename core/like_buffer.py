@@ -0,0 +1,225 @@
+import glob
+import json
+import os
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import bindparam, delete, select, tuple_, update
+from core.cache import invalidate_after_commit
+from core.database import SessionLocal, background_session, dialect_insert
+from core import models
+from Logging.logging import logger
+
+# Opt-in write-behind mode for likes, meant for posts receiving thousands of likes per second
+WRITE_BEHIND_ENABLED = os.getenv("LIKES_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+FLUSH_INTERVAL_MS = int(os.getenv("LIKES_FLUSH_INTERVAL_MS", "200"))
+FLUSH_MAX_EVENTS = int(os.getenv("LIKES_FLUSH_MAX_EVENTS", "500"))
+# Append-only journal of buffered events, replayed on startup after a crash
+SPILL_PATH = os.getenv("LIKES_SPILL_PATH", os.path.join("content_database", "likes_spill.ndjson"))
+
+
+class LikeBuffer:
+    """
+    In-process write-behind buffer for like / unlike events.
+
+    Events are deduplicated per (user_id, post_id), keeping only the latest
+    direction, and written every `flush_interval_ms` or `max_events` events in
+    batched multi-row statements. Like counters are merged per post and applied
+    once per flush. Every event is appended to a spill file before it is
+    acknowledged; the file is rotated at each flush and removed once the batch
+    is committed, so events left behind by a crash are replayed on start.
+    Replaying is safe because writes are idempotent and counters only move for
+    rows that actually changed.
+    """
+
+    def __init__(self, session_factory=SessionLocal, flush_interval_ms: int = FLUSH_INTERVAL_MS,
+                 max_events: int = FLUSH_MAX_EVENTS, spill_path: str = SPILL_PATH):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_events = max_events
+        self.spill_path = spill_path
+
+        self._pending: Dict[Tuple[int, int], int] = {}
+        # The batch being written: still read by pending_state until it commits
+        self._inflight: Dict[Tuple[int, int], int] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._spill = None
+        self._spill_sequence = 0
+        self._unflushed_spills = []
+        self._thread: Optional[threading.Thread] = None
+
+    # Lifecycle
+
+    def start(self):
+        """Replays spill files left by a previous process and starts the flusher thread."""
+        spill_dir = os.path.dirname(self.spill_path)
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+        leftovers = sorted(glob.glob(f"{glob.escape(self.spill_path)}.*.inflight"))
+        if os.path.exists(self.spill_path):
+            recovered = f"{self.spill_path}.{int(time.time() * 1000)}.recovered.inflight"
+            os.replace(self.spill_path, recovered)
+            leftovers.append(recovered)
+
+        for path in leftovers:
+            with open(path, encoding="utf-8") as spill:
+                for line in spill:
+                    try:
+                        user_id, post_id, direction = json.loads(line)
+                    except ValueError:
+                        continue  # Torn last line of a crashed write
+                    self._pending[(user_id, post_id)] = direction
+        self._unflushed_spills.extend(leftovers)
+        if leftovers:
+            logger.info(f"Like buffer replayed {len(self._pending)} events from {len(leftovers)} spill files")
+
+        self._spill = open(self.spill_path, "a", encoding="utf-8")
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="like-buffer-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the flusher thread and writes out everything still buffered."""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+            if not self._pending and os.path.getsize(self.spill_path) == 0:
+                os.remove(self.spill_path)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    # Recording and reading
+
+    def record(self, user_id: int, post_id: int, direction: int):
+        """Buffers a like (1) or unlike (0), journaling it to the spill file first."""
+        with self._lock:
+            if self._spill is not None:
+                self._spill.write(json.dumps([user_id, post_id, direction]) + "\n")
+                self._spill.flush()
+            self._pending[(user_id, post_id)] = direction
+            full = len(self._pending) >= self.max_events
+        if full:
+            self._wakeup.set()
+
+    def pending_state(self, user_id: int, post_id: int) -> Optional[int]:
+        """The buffered direction for this user and post, or None if nothing is pending."""
+        key = (user_id, post_id)
+        with self._lock:
+            if key in self._pending:
+                return self._pending[key]
+            return self._inflight.get(key)
+
+    def pending_for_user(self, user_id: int, post_ids: Iterable[int]) -> Dict[int, int]:
+        """Buffered directions for a user across several posts, for read-your-writes overlays."""
+        states = {}
+        with self._lock:
+            for post_id in post_ids:
+                key = (user_id, post_id)
+                if key in self._pending:
+                    states[post_id] = self._pending[key]
+                elif key in self._inflight:
+                    states[post_id] = self._inflight[key]
+        return states
+
+    def __len__(self):
+        return len(self._pending)
+
+    # Flushing
+
+    def flush(self):
+        """Writes every buffered event in one transaction; failed batches are kept for the next flush."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return
+                batch, self._pending = self._pending, {}
+                self._inflight = batch
+                if self._spill is not None:
+                    self._spill.close()
+                    self._spill_sequence += 1
+                    rotated = f"{self.spill_path}.{int(time.time() * 1000)}.{self._spill_sequence}.inflight"
+                    os.replace(self.spill_path, rotated)
+                    self._unflushed_spills.append(rotated)
+                    self._spill = open(self.spill_path, "a", encoding="utf-8")
+                spills = list(self._unflushed_spills)
+
+            start_time = time.time()
+            try:
+                deltas = self._write_batch(batch)
+            except Exception as e:
+                logger.error(f"Like buffer flush of {len(batch)} events failed, retrying later: {str(e)}")
+                with self._lock:
+                    for key, direction in batch.items():
+                        self._pending.setdefault(key, direction)
+                    self._inflight = {}
+                return
+
+            with self._lock:
+                self._inflight = {}
+                self._unflushed_spills = [path for path in self._unflushed_spills if path not in spills]
+            for path in spills:
+                os.remove(path)
+
+            execution_time = time.time() - start_time
+            logger.info(f"Like buffer flushed {len(batch)} events touching {len(deltas)} posts in {round(execution_time * 1000, 2)} ms")
+
+    def _write_batch(self, batch: Dict[Tuple[int, int], int]) -> Counter:
+        """Applies one deduplicated batch and returns the per-post counter deltas it applied."""
+        likes_table = models.Likes.__table__
+        content_table = models.Content.__table__
+        likes = [key for key, direction in batch.items() if direction == 1]
+        unlikes = [key for key, direction in batch.items() if direction == 0]
+        deltas = Counter()
+
+        with background_session("like_buffer", self.session_factory) as db:
+            if likes:
+                post_ids = {post_id for _, post_id in likes}
+                existing = set(db.execute(
+                    select(content_table.c.c_id).where(content_table.c.c_id.in_(post_ids))
+                ).scalars())
+                rows = [{"user_id": user_id, "post_id": post_id} for user_id, post_id in likes if post_id in existing]
+                if rows:
+                    inserted = db.execute(
+                        dialect_insert(db, likes_table)
+                        .values(rows)
+                        .on_conflict_do_nothing(index_elements=["user_id", "post_id"])
+                        .returning(likes_table.c.post_id)
+                    ).scalars()
+                    deltas.update(inserted)
+
+            if unlikes:
+                deleted = db.execute(
+                    delete(likes_table)
+                    .where(tuple_(likes_table.c.user_id, likes_table.c.post_id).in_(unlikes))
+                    .returning(likes_table.c.post_id)
+                ).scalars()
+                deltas.subtract(deleted)
+
+            changes = [{"b_post_id": post_id, "b_delta": delta} for post_id, delta in deltas.items() if delta]
+            if changes:
+                db.execute(
+                    update(content_table)
+                    .where(content_table.c.c_id == bindparam("b_post_id"))
+                    .values(likes_count=content_table.c.likes_count + bindparam("b_delta")),
+                    changes
+                )
+                invalidate_after_commit(db, *(f"post:{change['b_post_id']}" for change in changes))
+            return deltas
+
+
+like_buffer = LikeBuffer()
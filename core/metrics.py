@@ -0,0 +1,186 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Tuple
+from starlette.requests import Request
+from Logging.logging import log_event
+
+# Upper bounds (seconds) of the latency buckets; p50/p95/p99 come from histogram_quantile() in Prometheus
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds (bytes) of the request / response payload buckets
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+# Label for requests that matched no route, so scanners cannot create unbounded series
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class Histogram:
+    """Fixed-bucket histogram in Prometheus' cumulative layout."""
+    __slots__ = ("bounds", "counts", "total", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # The last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def cumulative(self) -> Iterable[Tuple[str, int]]:
+        running = 0
+        for bound, count in zip(self.bounds, self.counts):
+            running += count
+            yield _format_number(bound), running
+        yield "+Inf", running + self.counts[-1]
+
+
+class RequestMetrics:
+    """
+    Per-route request metrics of one process. Updated only from the event
+    loop thread by MetricsMiddleware, so no locking is needed.
+    """
+
+    def __init__(self):
+        self.in_flight = 0
+        self.requests: Dict[Tuple[str, str, int], int] = {}
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.request_size: Dict[Tuple[str, str], Histogram] = {}
+        self.response_size: Dict[Tuple[str, str], Histogram] = {}
+
+    def record(self, method: str, route: str, status: int, duration: float, request_bytes: int, response_bytes: int):
+        key = (method, route)
+        self.requests[(method, route, status)] = self.requests.get((method, route, status), 0) + 1
+        self._histogram(self.latency, key, LATENCY_BUCKETS).observe(duration)
+        self._histogram(self.request_size, key, SIZE_BUCKETS).observe(request_bytes)
+        self._histogram(self.response_size, key, SIZE_BUCKETS).observe(response_bytes)
+
+    @staticmethod
+    def _histogram(histograms: Dict, key, bounds) -> Histogram:
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = Histogram(bounds)
+        return histogram
+
+    def render(self) -> str:
+        """The Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = [
+            "# HELP http_requests_in_flight Requests currently being served.",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+            "# HELP http_requests_total Requests served, by route template and status code.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route, status), count in sorted(self.requests.items()):
+            lines.append(f'http_requests_total{{method="{method}",route="{_escape(route)}",status="{status}"}} {count}')
+
+        for name, help_text, histograms in (
+            ("http_request_duration_seconds", "Request latency by route template.", self.latency),
+            ("http_request_size_bytes", "Request body size by route template.", self.request_size),
+            ("http_response_size_bytes", "Response body size by route template.", self.response_size),
+        ):
+            lines.extend(_histogram_lines(name, help_text, {
+                f'method="{method}",route="{_escape(route)}"': histogram
+                for (method, route), histogram in sorted(histograms.items())
+            }))
+        return "\n".join(lines) + "\n"
+
+
+class BackgroundMetrics:
+    """
+    How long background tasks keep a pooled database connection checked out.
+    Recorded from threadpool threads, so updates are guarded by a lock.
+    """
+
+    def __init__(self):
+        self.connection_held: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def record_connection_held(self, task: str, duration: float):
+        with self._lock:
+            histogram = self.connection_held.get(task)
+            if histogram is None:
+                histogram = self.connection_held[task] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(duration)
+
+    def render(self) -> str:
+        with self._lock:
+            lines = _histogram_lines(
+                "background_db_connection_held_seconds",
+                "Time a background task kept a pooled database connection checked out.",
+                {f'task="{_escape(task)}"': histogram for task, histogram in sorted(self.connection_held.items())}
+            )
+        return "\n".join(lines) + "\n"
+
+
+def _histogram_lines(name: str, help_text: str, histograms: Dict[str, Histogram]) -> List[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for labels, histogram in histograms.items():
+        for bound, count in histogram.cumulative():
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+        lines.append(f"{name}_sum{{{labels}}} {_format_number(histogram.total)}")
+        lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+    return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware timing every HTTP request. Labels use the matched
+    route's path template (/followers/{username}), not the raw URL. Also
+    writes one structured access log record per request.
+    """
+
+    def __init__(self, app, metrics: RequestMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = self.metrics
+        status = 500
+        request_bytes = 0
+        response_bytes = 0
+
+        async def counting_receive():
+            nonlocal request_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                request_bytes += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            nonlocal status, response_bytes
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        metrics.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            duration = time.perf_counter() - start
+            metrics.in_flight -= 1
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or UNMATCHED_ROUTE
+            metrics.record(scope["method"], route_path, status, duration, request_bytes, response_bytes)
+            await log_event(Request(scope), status, duration)
+
+
+request_metrics = RequestMetrics()
+background_metrics = BackgroundMetrics()
@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, Date, Boolean, ForeignKey, DateTime, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Date, Boolean, Float, ForeignKey, DateTime, UniqueConstraint, Index, JSON, true, false
 from sqlalchemy.orm import relationship
-from datetime import datetime
+from datetime import datetime, timezone
 from core.database import Base
 import warnings
 warnings.filterwarnings('ignore')
 
+# Default of the timezone-aware DateTime columns
+def utc_now():
+    return datetime.now(timezone.utc)
+
 class Registration(Base):
     __tablename__ = "registrations"
     user_id = Column(Integer, primary_key=True, index=True)
@@ -18,7 +22,10 @@ class Registration(Base):
     otp = Column(Integer, nullable=True)
     otp_expiry = Column(DateTime, nullable=True, index=True)
     retry_attempts = Column(Integer, default=0)
-    created_at = Column(Date, default=datetime.utcnow, index=True)
+    created_at = Column(DateTime(timezone=True), default=utc_now, index=True)
+    # Maintained alongside every notification insert / read, so the badge count is a column read
+    unread_notifications = Column(Integer, nullable=False, default=0, server_default="0")
+    email_notifications = Column(Boolean, nullable=False, default=True, server_default=true())
 
     content = relationship("Content", back_populates="owner")
     likes = relationship("Likes", back_populates="user")
@@ -30,12 +37,21 @@ class Registration(Base):
 class Content(Base):
     __tablename__ = "content"
     c_id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("registrations.user_id"), index=True)
+    user_id = Column(Integer, ForeignKey("registrations.user_id"))
     username = Column(String, index=True)
     title = Column(String, index=True)
     caption = Column(String)
     file = Column(String)
-    created_at = Column(Date, default=datetime.utcnow, index=True)
+    created_at = Column(DateTime(timezone=True), default=utc_now)
+    likes_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Maintained alongside every comment insert, so listings never count comments
+    comments_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        # Serve the content listings newest first: a user's posts, and all posts
+        Index('ix_content_user_created_at_id', user_id, created_at.desc(), c_id),
+        Index('ix_content_created_at_id', created_at.desc(), c_id),
+    )
 
     owner = relationship("Registration", back_populates="content")
     likes = relationship("Likes", back_populates="content")
@@ -46,6 +62,11 @@ class Likes(Base):
     like_id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("registrations.user_id"), index=True)
     post_id = Column(Integer, ForeignKey("content.c_id"), index=True)
+    # Naive UTC, stamped by SQLAlchemy (also for likes inserted from a SELECT or in batches), as trending decays in UTC
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    # One like per user and post, also the conflict target of the like upsert
+    __table_args__ = (Index('uq_likes_user_post', 'user_id', 'post_id', unique=True),)
 
     user = relationship("Registration", back_populates="likes")
     content = relationship("Content", back_populates="likes")
@@ -56,6 +77,21 @@ class Comment(Base):
     user_id = Column(Integer, ForeignKey("registrations.user_id"), index=True)
     post_id = Column(Integer, ForeignKey("content.c_id"), index=True)
     user_comment = Column(String)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    # Threading: NULL parent for top-level comments. `path` is the materialized path,
+    # the zero-padded ids of all ancestors followed by the comment's own id
+    parent_id = Column(Integer, ForeignKey("comments.comment_id"), nullable=True)
+    path = Column(String, nullable=True)
+    depth = Column(Integer, nullable=False, default=0, server_default="0")
+    # Replies anywhere below this comment, maintained alongside every reply insert
+    reply_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        # Serves keyset pagination of a post's top-level comments oldest first, and the per-post previews
+        Index('ix_comments_post_parent_created_at_id', 'post_id', 'parent_id', 'created_at', 'comment_id'),
+        # A whole thread, or any subtree of it, is one range of paths
+        Index('ix_comments_post_path', 'post_id', 'path'),
+    )
 
     user = relationship("Registration", back_populates="comments")
     content = relationship("Content", back_populates="comments")
@@ -67,7 +103,52 @@ class Follows(Base):
     following_id = Column(Integer, ForeignKey("registrations.user_id"), nullable=False, index=True)
     followed_at = Column(DateTime, default=datetime.utcnow, index=True)
 
-    __table_args__ = (UniqueConstraint('follower_id', 'following_id', name='unique_follow'),)
+    __table_args__ = (
+        UniqueConstraint('follower_id', 'following_id', name='unique_follow'),
+        # Serve keyset pagination of followers / following lists newest first
+        Index('ix_follows_following_followed_at_id', 'following_id', 'followed_at', 'id'),
+        Index('ix_follows_follower_followed_at_id', 'follower_id', 'followed_at', 'id'),
+    )
     
     follower = relationship("Registration", foreign_keys=[follower_id], back_populates="following")
     following = relationship("Registration", foreign_keys=[following_id], back_populates="followers")
+
+class NotificationOutbox(Base):
+    __tablename__ = "notification_outbox"
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(String, nullable=False, default="pending", server_default="pending")  # pending / dead
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Serves the worker's "due pending entries" scan
+    __table_args__ = (Index('ix_outbox_status_next_attempt', 'status', 'next_attempt_at'),)
+
+class Notification(Base):
+    __tablename__ = "notifications"
+    id = Column(Integer, primary_key=True, index=True)
+    # A deleted recipient takes their inbox along; a deleted actor or post leaves the notification in place
+    user_id = Column(Integer, ForeignKey("registrations.user_id", ondelete="CASCADE"), nullable=False)  # Recipient
+    actor_id = Column(Integer, ForeignKey("registrations.user_id", ondelete="SET NULL"), nullable=True)
+    kind = Column(String, nullable=False)  # like / comment / follow / new_post
+    post_id = Column(Integer, ForeignKey("content.c_id", ondelete="SET NULL"), nullable=True)
+    text = Column(String, nullable=True)
+    is_read = Column(Boolean, nullable=False, default=False, server_default=false())
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    # Serves keyset pagination of a user's inbox newest first
+    __table_args__ = (Index('ix_notifications_user_created_at_id', 'user_id', 'created_at', 'id'),)
+
+# Snapshot of the trending scores of all API processes, see core.trending
+class TrendingScore(Base):
+    __tablename__ = "trending_scores"
+    # Not a foreign key: a snapshot may briefly outlive a deleted post
+    post_id = Column(Integer, primary_key=True)
+    epoch = Column(Integer, nullable=False)
+    score = Column(Float, nullable=False)  # Forward-decayed, relative to the landmark of `epoch`
+
+    # Serves loading the leading posts of an epoch and dropping expired epochs
+    __table_args__ = (Index('ix_trending_scores_epoch_score', 'epoch', 'score'),)
@@ -0,0 +1,179 @@
+import inspect
+import os
+import sys
+import threading
+from collections import Counter
+from types import CodeType
+from typing import Dict, Optional, Tuple
+from starlette.datastructures import Headers
+from starlette.responses import PlainTextResponse
+from oauth2 import is_admin_token
+from Logging.logging import logger
+
+# Sampling interval while profiling a single request sent with `X-Profile: 1`
+PROFILE_REQUEST_INTERVAL_MS = float(os.getenv("PROFILE_REQUEST_INTERVAL_MS", "1"))
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Leaf frames of threads that are blocked waiting for work rather than running
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),
+    ("handlers.py", "dequeue"),
+}
+
+# A stack as sampled: code objects from the leaf frame up to the thread's entry point
+Stack = Tuple[CodeType, ...]
+
+
+class ProfilerBusy(Exception):
+    """Raised when another profile is already being taken in this process."""
+
+
+# One profile at a time per process, so overlapping profiles do not sample each other
+_active = threading.Lock()
+
+
+class StackSampler:
+    """
+    Samples the Python stacks of every thread of the process from a
+    background thread. Nothing is installed while no profile is being taken,
+    so the profiler costs nothing until it is started.
+    """
+
+    def __init__(self, interval: float, include_idle: bool = False):
+        self.interval = interval
+        self.include_idle = include_idle
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if not _active.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already being taken in this process")
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            _active.release()
+        return self.samples
+
+    def _run(self):
+        own_id = threading.get_ident()
+        samples = self.samples
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                if not self.include_idle and _is_idle(stack[0]):
+                    continue
+                samples[tuple(stack)] += 1
+
+
+def _is_idle(code: CodeType) -> bool:
+    return (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES
+
+
+_labels: Dict[CodeType, str] = {}
+
+
+def _label(code: CodeType) -> str:
+    """module:function, with project files relative to the project root."""
+    label = _labels.get(code)
+    if label is None:
+        filename = code.co_filename
+        relative = os.path.relpath(filename, PROJECT_ROOT) if os.path.isabs(filename) else filename
+        if relative.startswith(".."):
+            _, found, relative = filename.rpartition("site-packages" + os.sep)
+            if not found:
+                relative = os.path.basename(filename)
+        module = os.path.splitext(relative)[0].replace(os.sep, ".")
+        name = getattr(code, "co_qualname", code.co_name)
+        label = _labels[code] = f"{module}:{name}".replace(";", ":").replace(" ", "_")
+    return label
+
+
+def only_containing(samples: Counter, code: CodeType) -> Counter:
+    """The samples whose stack passes through the given function."""
+    return Counter({stack: count for stack, count in samples.items() if code in stack})
+
+
+def collapse(samples: Counter) -> str:
+    """
+    Collapsed-stack format, one `root;caller;leaf count` line per distinct
+    stack, as read by flamegraph.pl, speedscope and inferno.
+    """
+    merged: Counter = Counter()
+    for stack, count in samples.items():
+        merged[";".join(_label(code) for code in reversed(stack))] += count
+    return "".join(f"{line} {count}\n" for line, count in merged.most_common())
+
+
+def _profile_requested(scope) -> bool:
+    for name, _ in scope["headers"]:
+        if name == b"x-profile":
+            return True
+    return False
+
+
+class ProfilerMiddleware:
+    """
+    Profiles a single request sent with an `X-Profile: 1` header by an admin.
+    The request runs normally, but the response is replaced by the collapsed
+    stacks sampled inside its endpoint; the endpoint's own status code is in
+    the `X-Profile-Status` header. Time spent in dependencies and in other
+    middleware is not included. Requests without the header only pay for one
+    scan of their header names.
+    """
+
+    def __init__(self, app, interval_ms: float = PROFILE_REQUEST_INTERVAL_MS):
+        self.app = app
+        self.interval = interval_ms / 1000
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _profile_requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        scheme, _, token = Headers(scope=scope).get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not is_admin_token(token):
+            await self.app(scope, receive, send)
+            return
+
+        sampler = StackSampler(self.interval)
+        try:
+            sampler.start()
+        except ProfilerBusy:
+            logger.warning(f"Profile of {scope['path']} skipped: another profile is running")
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def capture(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        try:
+            await self.app(scope, receive, capture)
+        finally:
+            samples = sampler.stop()
+
+        endpoint = getattr(scope.get("route"), "endpoint", None)
+        if endpoint is not None:
+            samples = only_containing(samples, inspect.unwrap(endpoint).__code__)
+        logger.info(f"Profiled {scope['method']} {scope['path']}: {sum(samples.values())} samples")
+        response = PlainTextResponse(collapse(samples), headers={"X-Profile-Status": str(status)})
+        await response(scope, receive, send)
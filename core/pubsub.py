@@ -0,0 +1,207 @@
+import asyncio
+import json
+import os
+from collections import deque
+from typing import Dict, Optional, Set
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from Logging.logging import logger
+
+# Cross-worker broker for push events; unset keeps events inside the process that produced them
+PUSH_BROKER_URL = os.getenv("PUSH_BROKER_URL", "")
+# Events kept per connection while the client is not reading; older ones are dropped
+PUSH_BUFFER_SIZE = int(os.getenv("PUSH_BUFFER_SIZE", "32"))
+
+REDIS_CHANNEL = "trendconnect:push"
+
+
+class Subscription:
+    """
+    One open push connection. Kept deliberately small so tens of thousands of
+    idle connections cost little: the event buffer is only allocated once an
+    event arrives and is dropped again when the client has drained it.
+    """
+    __slots__ = ("user_id", "buffer", "wakeup", "dropped", "closed")
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.buffer: Optional[deque] = None
+        self.wakeup = asyncio.Event()
+        self.dropped = False
+        self.closed = False
+
+    def push(self, message: dict):
+        if self.buffer is None:
+            self.buffer = deque(maxlen=PUSH_BUFFER_SIZE)
+        elif len(self.buffer) == self.buffer.maxlen:
+            self.dropped = True  # Slow reader: tell the client to resync
+        self.buffer.append(message)
+        self.wakeup.set()
+
+    def drain(self):
+        messages, self.buffer = self.buffer or (), None
+        self.wakeup.clear()
+        return messages
+
+    def close(self):
+        self.closed = True
+        self.wakeup.set()
+
+
+class PushHub:
+    """Routes events to the open connections of their recipient. Only used from the event loop thread."""
+
+    def __init__(self):
+        self._subscriptions: Dict[int, Set[Subscription]] = {}
+
+    def subscribe(self, user_id: int) -> Subscription:
+        subscription = Subscription(user_id)
+        self._subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscriptions = self._subscriptions.get(subscription.user_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.user_id]
+
+    def deliver(self, user_id: int, message: dict):
+        for subscription in self._subscriptions.get(user_id, ()):
+            subscription.push(message)
+
+    def deliver_many(self, events):
+        for user_id, message in events:
+            self.deliver(user_id, message)
+
+    def close(self):
+        """Ends every open stream, e.g. on shutdown."""
+        for subscriptions in self._subscriptions.values():
+            for subscription in subscriptions:
+                subscription.close()
+        self._subscriptions.clear()
+
+    def __len__(self):
+        return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+
+class LocalBroker:
+    """
+    In-process stand-in for a cross-worker broker: events reach connections
+    held by the same process only. Events published where no hub is running
+    (e.g. the outbox worker) are dropped.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._hub: Optional[PushHub] = None
+
+    async def start(self, hub: PushHub):
+        self._loop = asyncio.get_running_loop()
+        self._hub = hub
+
+    async def stop(self):
+        self._loop = None
+        self._hub = None
+
+    def publish_many(self, events):
+        """Thread-safe; callable from request threads and background tasks."""
+        loop, hub = self._loop, self._hub
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(hub.deliver_many, list(events))
+
+
+class RedisBroker(LocalBroker):
+    """
+    Fans events out to every API worker through one Redis pub/sub channel.
+    Publishing is synchronous so worker processes without an event loop can
+    publish too; each API worker runs one listener task feeding its hub.
+    Requires the optional `redis` package.
+    """
+
+    def __init__(self, url: str):
+        super().__init__()
+        import redis
+        self._url = url
+        self._client = redis.Redis.from_url(url)
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self, hub: PushHub):
+        await super().start(hub)
+        self._listener = asyncio.create_task(self._listen(hub))
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        await super().stop()
+
+    async def _listen(self, hub: PushHub):
+        import redis.asyncio as aioredis
+        client = aioredis.Redis.from_url(self._url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(REDIS_CHANNEL)
+        try:
+            async for item in pubsub.listen():
+                if item["type"] != "message":
+                    continue
+                try:
+                    user_id, message = json.loads(item["data"])
+                except ValueError:
+                    continue
+                hub.deliver(user_id, message)
+        finally:
+            await pubsub.aclose()
+            await client.aclose()
+
+    def publish_many(self, events):
+        """One pipelined round trip for a whole batch, e.g. a new-post fan-out."""
+        try:
+            pipeline = self._client.pipeline(transaction=False)
+            for user_id, message in events:
+                pipeline.publish(REDIS_CHANNEL, json.dumps([user_id, message]))
+            pipeline.execute()
+        except Exception as e:
+            logger.error(f"Push events not published: {str(e)}")
+
+
+def _create_broker():
+    if PUSH_BROKER_URL.startswith(("redis://", "rediss://")):
+        return RedisBroker(PUSH_BROKER_URL)
+    return LocalBroker()
+
+
+hub = PushHub()
+broker = _create_broker()
+
+
+def publish(user_id: int, message: dict):
+    broker.publish_many([(user_id, message)])
+
+
+async def start_push():
+    await broker.start(hub)
+
+
+async def stop_push():
+    hub.close()
+    await broker.stop()
+
+
+# Publish only once the data the event describes is committed
+
+def publish_after_commit(db: Session, user_id: int, message: dict):
+    """Queues an event on the session; it is published if and when the transaction commits."""
+    db.info.setdefault("push_events", []).append((user_id, message))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed(session: Session):
+    events = session.info.pop("push_events", None)
+    if events:
+        broker.publish_many(events)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session: Session):
+    session.info.pop("push_events", None)
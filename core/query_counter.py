@@ -0,0 +1,155 @@
+import os
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, List, Optional
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from Logging.logging import logger
+
+# Query totals are exposed as response headers outside of production
+DEBUG_MODE = os.getenv("ENVIRONMENT", "development").lower() != "production"
+
+# Number of identical statement shapes in one request that is reported as a likely N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """
+    Normalizes a SQL statement so that queries differing only in literal values compare equal.
+    """
+    shape = _LITERAL_RE.sub("?", statement)
+    shape = _IN_LIST_RE.sub("(...)", shape)
+    return _WHITESPACE_RE.sub(" ", shape).strip()
+
+
+class QueryStats:
+    """Statement count, DB time and statement shapes collected for one unit of work."""
+
+    __slots__ = ("count", "duration", "shapes")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement: str, duration: float):
+        self.count += 1
+        self.duration += duration
+        self.shapes[statement_shape(statement)] += 1
+
+    @property
+    def duration_ms(self) -> float:
+        return round(self.duration * 1000, 2)
+
+    def repeated_shapes(self, threshold: int = N_PLUS_ONE_THRESHOLD):
+        """Returns (shape, count) pairs executed more than `threshold` times, most frequent first."""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > threshold]
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+# ASGI scope of the request being handled; the router adds the matched route to it
+_request_scope: ContextVar[Optional[dict]] = ContextVar("request_scope", default=None)
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+def current_request_scope() -> Optional[dict]:
+    return _request_scope.get()
+
+
+# Called with (cursor, statement, parameters, duration, dialect name, executemany) after every statement
+_statement_observers: List[Callable] = []
+
+
+def observe_statements(observer: Callable):
+    """Registers `observer` for the timing of every statement, measured once here (see core.slow_queries)."""
+    _statement_observers.append(observer)
+    return observer
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info["query_start_time"].pop()
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, duration)
+    for observer in _statement_observers:
+        observer(cursor, statement, parameters, duration, conn.dialect.name, executemany)
+
+
+@event.listens_for(Engine, "handle_error")
+def _discard_start_time(exception_context):
+    # A failed statement never reaches after_cursor_execute; drop its start time so it
+    # does not stay behind on the pooled connection
+    if exception_context.connection is not None and exception_context.execution_context is not None:
+        start_times = exception_context.connection.info.get("query_start_time")
+        if start_times:
+            start_times.pop()
+
+
+@contextmanager
+def track_queries():
+    """
+    Collects every SQL statement executed in the current context into a fresh QueryStats.
+    """
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+@contextmanager
+def assert_max_queries(max_queries: int):
+    """
+    Test helper failing when the wrapped block executes more than `max_queries` statements.
+    """
+    with track_queries() as stats:
+        yield stats
+    if stats.count > max_queries:
+        shapes = "\n".join(f"  {count}x {shape}" for shape, count in stats.shapes.most_common())
+        raise AssertionError(f"Expected at most {max_queries} queries, got {stats.count}:\n{shapes}")
+
+
+def report_query_stats(label: str, stats: QueryStats):
+    """Logs the totals for a unit of work and flags repeated statement shapes as likely N+1."""
+    logger.info(f"{label} | queries: {stats.count} | db time: {stats.duration_ms} ms")
+    for shape, count in stats.repeated_shapes():
+        logger.warning(f"Possible N+1 in {label}: statement executed {count} times: {shape}")
+
+
+async def query_stats_middleware(request: Request, call_next):
+    """
+    Counts the statements issued while handling a request, logs them and,
+    in debug mode, returns the totals as response headers.
+    """
+    scope_token = _request_scope.set(request.scope)
+    try:
+        with track_queries() as stats:
+            response = await call_next(request)
+    finally:
+        _request_scope.reset(scope_token)
+
+    report_query_stats(f"{request.method} {request.url.path}", stats)
+
+    if DEBUG_MODE:
+        response.headers["X-DB-Query-Count"] = str(stats.count)
+        response.headers["X-DB-Time-Ms"] = str(stats.duration_ms)
+
+    return response
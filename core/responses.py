@@ -0,0 +1,24 @@
+"""
+Fast path for hot list endpoints.
+
+FastAPI validates an endpoint's return value against its response model and
+walks it with jsonable_encoder before the JSON encoder sees it. List endpoints
+that already build plain dicts from SQL result rows return a FastJSONResponse
+instead, which FastAPI sends as is: one orjson pass, no models, no re-encoding.
+orjson writes dates and datetimes in ISO 8601 like the default path does.
+"""
+from typing import Any, Optional
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+
+
+class FastJSONResponse(ORJSONResponse):
+    """orjson-rendered response that keeps the headers an endpoint set on its injected Response."""
+
+    def __init__(self, content: Any, status_code: int = 200, response: Optional[Response] = None):
+        super().__init__(content, status_code=status_code)
+        # FastAPI only applies those headers to responses it builds itself
+        if response is not None:
+            for name, value in response.headers.items():
+                if name not in ("content-length", "content-type"):
+                    self.headers[name] = value
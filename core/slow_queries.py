@@ -0,0 +1,212 @@
+"""
+Slow query log.
+
+Statements taking longer than SLOW_QUERY_MS are kept in a bounded in-memory
+ring per process (GET /admin/slow_queries) and written to the application log.
+The top statements by total time, across workers and rotated log files:
+
+    python -m core.slow_queries [--top 20] [LOG_FILE ...]
+"""
+import argparse
+import glob
+import gzip
+import json
+import os
+import threading
+import time
+from collections import Counter, OrderedDict, deque, namedtuple
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Iterable, List, Optional
+from core.query_counter import current_request_scope, observe_statements, statement_shape
+from Logging.logging import LOG_FILE_PATH, logger
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "500"))
+# Capture the EXPLAIN plan of slow SELECTs on PostgreSQL (one extra round trip per slow query)
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "false").lower() in ("1", "true", "yes")
+# The same statement shape is explained at most once per interval
+EXPLAIN_INTERVAL_SECONDS = 300
+# Statement shapes whose last EXPLAIN time is remembered, least recently explained dropped first
+EXPLAINED_SHAPES = 1000
+
+# Route of statements issued outside of a request (background tasks, workers)
+BACKGROUND = "<background>"
+
+# Characters of the statement kept per entry
+STATEMENT_LENGTH = 2000
+
+SlowQuery = namedtuple("SlowQuery", ["at", "route", "duration_ms", "statement", "parameters", "plan"])
+
+
+def current_route() -> str:
+    """`METHOD /path/{template}` of the request issuing the statement."""
+    scope = current_request_scope()
+    if scope is None:
+        return BACKGROUND
+    route = getattr(scope.get("route"), "path", None) or scope["path"]
+    return f"{scope['method']} {route}"
+
+
+def _redact(value):
+    if value is None or isinstance(value, (bool, int, float, Decimal)):
+        return value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (str, bytes)):
+        return f"<{type(value).__name__} len={len(value)}>"
+    return f"<{type(value).__name__}>"
+
+
+def redact_parameters(parameters, executemany: bool = False):
+    """
+    Keeps numbers, booleans and dates, which is enough to tell ids and limits
+    apart, and replaces text (passwords, emails, comment bodies) by its length.
+    """
+    if executemany:
+        return f"<{len(parameters)} parameter sets>"
+    if isinstance(parameters, dict):
+        return {key: _redact(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_redact(value) for value in parameters]
+    return _redact(parameters)
+
+
+class SlowQueryLog:
+    """
+    Bounded ring of the most recent slow statements of this process.
+    Appends and snapshots of a deque are atomic, so no lock is needed.
+    """
+
+    def __init__(self, threshold_ms: float, size: int, explain: bool = False):
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self._entries: deque = deque(maxlen=size)
+        self._explained: OrderedDict = OrderedDict()
+        self._explained_lock = threading.Lock()
+
+    def record(self, cursor, statement: str, parameters, duration: float, dialect: str, executemany: bool = False):
+        duration_ms = round(duration * 1000, 2)
+        route = current_route()
+        plan = None
+        if self.explain and dialect == "postgresql" and not executemany:
+            plan = self._explain(cursor, statement, parameters)
+        entry = SlowQuery(
+            at=datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            route=route,
+            duration_ms=duration_ms,
+            statement=statement[:STATEMENT_LENGTH],
+            parameters=redact_parameters(parameters, executemany),
+            plan=plan
+        )
+        self._entries.append(entry)
+        logger.warning(
+            f"Slow query ({duration_ms} ms) in {route}",
+            extra={
+                "slow_query": statement_shape(statement)[:STATEMENT_LENGTH],
+                "route": route,
+                "duration_ms": duration_ms,
+                "parameters": entry.parameters,
+                "plan": plan,
+            }
+        )
+
+    def _explain(self, cursor, statement: str, parameters) -> Optional[str]:
+        """Plan of a slow SELECT, run on the same DBAPI connection so it sees the same transaction."""
+        if statement.lstrip()[:6].upper() not in ("SELECT", "WITH"):
+            return None
+        shape = statement_shape(statement)
+        now = time.monotonic()
+        with self._explained_lock:
+            if now - self._explained.get(shape, -EXPLAIN_INTERVAL_SECONDS) < EXPLAIN_INTERVAL_SECONDS:
+                return None
+            self._explained[shape] = now
+            self._explained.move_to_end(shape)
+            if len(self._explained) > EXPLAINED_SHAPES:
+                self._explained.popitem(last=False)
+
+        try:
+            explain_cursor = cursor.connection.cursor()
+            try:
+                explain_cursor.execute(f"EXPLAIN {statement}", parameters)
+                return "\n".join(row[0] for row in explain_cursor.fetchall())
+            finally:
+                explain_cursor.close()
+        except Exception as e:
+            logger.warning(f"Could not explain slow query: {str(e)}")
+            return None
+
+    def entries(self, limit: Optional[int] = None) -> List[SlowQuery]:
+        """Most recent first."""
+        entries = list(self._entries)
+        entries.reverse()
+        return entries[:limit] if limit is not None else entries
+
+    def clear(self):
+        self._entries.clear()
+
+
+slow_query_log = SlowQueryLog(SLOW_QUERY_MS, SLOW_QUERY_LOG_SIZE, SLOW_QUERY_EXPLAIN)
+
+
+# Timed by core.query_counter, which measures every statement once
+@observe_statements
+def _record_slow_query(cursor, statement, parameters, duration, dialect, executemany):
+    if duration * 1000 >= slow_query_log.threshold_ms:
+        slow_query_log.record(cursor, statement, parameters, duration, dialect, executemany)
+
+
+# Developer CLI: aggregate slow query records from the JSON log files
+
+def read_slow_queries(paths: Iterable[str]):
+    """Slow query records from JSON log files, gzipped or not."""
+    for path in paths:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as lines:
+            for line in lines:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if "slow_query" in record:
+                    yield record
+
+
+def top_offenders(records: Iterable[dict], top: int = 20) -> List[dict]:
+    """Statement shapes ordered by total time, with count, mean / max time and the routes issuing them."""
+    totals = {}
+    for record in records:
+        total = totals.get(record["slow_query"])
+        if total is None:
+            total = totals[record["slow_query"]] = {
+                "statement": record["slow_query"], "count": 0, "total_ms": 0.0, "max_ms": 0.0, "routes": Counter()
+            }
+        total["count"] += 1
+        total["total_ms"] += record["duration_ms"]
+        total["max_ms"] = max(total["max_ms"], record["duration_ms"])
+        total["routes"][record.get("route", BACKGROUND)] += 1
+
+    ranked = sorted(totals.values(), key=lambda total: total["total_ms"], reverse=True)[:top]
+    for total in ranked:
+        total["mean_ms"] = round(total["total_ms"] / total["count"], 2)
+        total["total_ms"] = round(total["total_ms"], 2)
+    return ranked
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Top slow SQL statements by total time")
+    parser.add_argument("paths", nargs="*", help="JSON log files (default: the application log and its rotations)")
+    parser.add_argument("--top", type=int, default=20, help="Number of statements to show")
+    args = parser.parse_args(argv)
+
+    paths = args.paths or sorted(glob.glob(f"{LOG_FILE_PATH}*"))
+    for rank, total in enumerate(top_offenders(read_slow_queries(paths), args.top), start=1):
+        print(f"{rank:>3}. total {total['total_ms']:.0f} ms | {total['count']} calls | "
+              f"mean {total['mean_ms']:.1f} ms | max {total['max_ms']:.1f} ms")
+        for route, count in total["routes"].most_common(3):
+            print(f"     {count}x {route}")
+        print(f"     {total['statement']}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+Trending posts from time-decayed likes and comments.
+
+Scores use forward decay: an event at time t adds weight * 2 ** ((t - L) / half_life)
+to its post, for a landmark L. Dividing a score by 2 ** ((now - L) / half_life)
+gives the post's decayed heat now, but that divisor is the same for every post,
+so rankings never need it: scores stay comparable and are plain sums that
+processes can add up. An undone like subtracts exactly what it added. Every EPOCH_HALF_LIVES half-lives the landmark
+moves forward and scores are scaled by 2 ** -EPOCH_HALF_LIVES, far from float
+overflow at any time.
+
+Each API process adds its likes and comments to an in-memory score table and a
+top-K heap as they happen. Every TRENDING_SYNC_SECONDS it adds its increments to
+the `trending_scores` table and reloads the leading posts of all processes from
+it, so the table is the snapshot a restarted process starts from.
+`python -m tasks.trending_rebuild` recomputes it from the like and comment timestamps.
+"""
+import heapq
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import case, delete, select
+from core.database import SessionLocal, background_session, dialect_insert
+from core import models
+from Logging.logging import logger
+
+TRENDING_HALF_LIFE_SECONDS = float(os.getenv("TRENDING_HALF_LIFE_SECONDS", "21600"))
+TRENDING_SIZE = int(os.getenv("TRENDING_SIZE", "50"))
+TRENDING_SYNC_SECONDS = float(os.getenv("TRENDING_SYNC_SECONDS", "60"))
+
+# Half-lives between landmarks; scores of the previous epoch are scaled by 2 ** -64
+EPOCH_HALF_LIVES = 64
+EPOCH_FACTOR = 2.0 ** -EPOCH_HALF_LIVES
+# Posts loaded from the table per place in the top K, so posts just below it can climb in
+CANDIDATE_FACTOR = 4
+
+LIKE = "like"
+COMMENT = "comment"
+EVENT_WEIGHTS = {LIKE: 1.0, COMMENT: 3.0}
+
+
+def timestamp_of(moment: datetime) -> float:
+    """Unix timestamp of a stored event time; naive timestamps are stored in UTC."""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def epoch_of(timestamp: float, half_life: float = TRENDING_HALF_LIFE_SECONDS) -> int:
+    return int(timestamp // (half_life * EPOCH_HALF_LIVES))
+
+
+def event_score(timestamp: float, epoch: int, weight: float = 1.0, half_life: float = TRENDING_HALF_LIFE_SECONDS) -> float:
+    """Forward-decayed value of an event relative to the landmark of `epoch`."""
+    landmark = epoch * half_life * EPOCH_HALF_LIVES
+    return weight * 2.0 ** ((timestamp - landmark) / half_life)
+
+
+def heat(score: float, epoch: int, now: float, half_life: float = TRENDING_HALF_LIFE_SECONDS) -> float:
+    """A score decayed to `now`: what its events weigh after losing half every half-life."""
+    return score / event_score(now, epoch, half_life=half_life)
+
+
+def _rescale(epoch_from: int, epoch_to: int) -> float:
+    """Factor turning scores relative to one epoch's landmark into scores relative to another's."""
+    return EPOCH_FACTOR ** (epoch_to - epoch_from)
+
+
+class TopK:
+    """
+    The k highest scores of posts whose scores only grow, kept in a min-heap with
+    lazy deletion: a raised score is pushed again and the outdated entry is
+    dropped when it reaches the top of the heap. A lowered score needs `rebuild`,
+    since a post outside the k may now rank above it.
+    """
+
+    def __init__(self, k: int):
+        self.k = k
+        self._heap: List[Tuple[float, int]] = []
+        self._members: Dict[int, float] = {}
+
+    def offer(self, post_id: int, score: float):
+        if post_id not in self._members:
+            if len(self._members) >= self.k:
+                self._drop_outdated()
+                if score <= self._heap[0][0]:
+                    return
+                _, evicted = heapq.heappop(self._heap)
+                del self._members[evicted]
+        self._members[post_id] = score
+        heapq.heappush(self._heap, (score, post_id))
+        if len(self._heap) > 4 * self.k:
+            self._heap = [(score, post_id) for post_id, score in self._members.items()]
+            heapq.heapify(self._heap)
+
+    def rebuild(self, scores: Dict[int, float]):
+        """Replaces the members with the k best of `scores`."""
+        best = heapq.nlargest(self.k, scores.items(), key=lambda item: item[1])
+        self._members = dict(best)
+        self._heap = [(score, post_id) for post_id, score in best]
+        heapq.heapify(self._heap)
+
+    def ranking(self) -> List[Tuple[int, float]]:
+        """Members best first; ties go to the older post."""
+        return sorted(self._members.items(), key=lambda item: (-item[1], item[0]))
+
+    def _drop_outdated(self):
+        while self._heap and self._members.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def __contains__(self, post_id: int):
+        return post_id in self._members
+
+    def __len__(self):
+        return len(self._members)
+
+
+class TrendingEngine:
+    """
+    In-process trending scores with a top-K heap, synced with the
+    `trending_scores` table every `sync_seconds`. Scores of posts outside the
+    loaded candidates are only known from this process's own events until
+    the next sync.
+    """
+
+    def __init__(self, session_factory=SessionLocal, size: int = TRENDING_SIZE,
+                 half_life: float = TRENDING_HALF_LIFE_SECONDS, sync_seconds: float = TRENDING_SYNC_SECONDS,
+                 clock=time.time):
+        self.session_factory = session_factory
+        self.size = size
+        self.half_life = half_life
+        self.sync_seconds = sync_seconds
+        self.clock = clock
+
+        self._epoch = epoch_of(clock(), half_life)
+        self._scores: Dict[int, float] = {}
+        self._pending: Dict[int, float] = {}
+        self._top = TopK(size)
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # Lifecycle
+
+    def start(self):
+        """Loads the last snapshot and starts the sync thread."""
+        self.sync()
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="trending-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the sync thread and writes out the increments still held."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.sync()
+
+    def _run(self):
+        while not self._stopping.wait(self.sync_seconds):
+            self.sync()
+
+    # Recording and reading
+
+    def record(self, post_id: int, kind: str, at: Optional[float] = None):
+        """Adds a like or comment on a post, at `at` (a Unix timestamp) or now."""
+        at = self.clock() if at is None else at
+        with self._lock:
+            self._advance(epoch_of(at, self.half_life))
+            value = event_score(at, self._epoch, EVENT_WEIGHTS[kind], self.half_life)
+            self._pending[post_id] = self._pending.get(post_id, 0.0) + value
+            score = self._scores.get(post_id, 0.0) + value
+            self._scores[post_id] = score
+            self._top.offer(post_id, score)
+
+    def retract(self, post_id: int, kind: str, at: Optional[float] = None):
+        """Takes back an event recorded at `at`, such as an undone like. Scores never go below zero."""
+        at = self.clock() if at is None else at
+        with self._lock:
+            self._advance(epoch_of(at, self.half_life))
+            value = event_score(at, self._epoch, EVENT_WEIGHTS[kind], self.half_life)
+            self._pending[post_id] = self._pending.get(post_id, 0.0) - value
+            if post_id not in self._scores:
+                return
+            self._scores[post_id] = max(self._scores[post_id] - value, 0.0)
+            if post_id in self._top:
+                self._top.rebuild(self._scores)
+
+    def discard(self, post_id: int):
+        """Forgets a deleted post."""
+        with self._lock:
+            self._scores.pop(post_id, None)
+            self._pending.pop(post_id, None)
+            self._top.rebuild(self._scores)
+
+    def top(self, limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Up to `limit` (post_id, heat) pairs, hottest first."""
+        now = self.clock()
+        with self._lock:
+            ranking = self._top.ranking()[:limit]
+            epoch = self._epoch
+        return [(post_id, heat(score, epoch, now, self.half_life)) for post_id, score in ranking]
+
+    def _advance(self, epoch: int):
+        """Moves the landmark forward to `epoch`, scaling every score held. Called with the lock held."""
+        if epoch <= self._epoch:
+            return
+        factor = _rescale(self._epoch, epoch)
+        self._scores = {post_id: score * factor for post_id, score in self._scores.items()}
+        self._pending = {post_id: value * factor for post_id, value in self._pending.items()}
+        self._epoch = epoch
+        self._top.rebuild(self._scores)
+
+    # Syncing
+
+    def sync(self):
+        """Adds this process's increments to the table and reloads the leading posts from it."""
+        with self._sync_lock:
+            with self._lock:
+                self._advance(epoch_of(self.clock(), self.half_life))
+                pending, self._pending = self._pending, {}
+                epoch = self._epoch
+
+            start_time = time.time()
+            try:
+                leaders = self._write_and_load(pending, epoch)
+            except Exception as e:
+                # Keep the increments for the next sync
+                with self._lock:
+                    factor = _rescale(epoch, self._epoch)
+                    for post_id, value in pending.items():
+                        self._pending[post_id] = self._pending.get(post_id, 0.0) + value * factor
+                logger.error(f"Trending sync of {len(pending)} posts failed, retrying later: {str(e)}")
+                return
+
+            with self._lock:
+                factor = _rescale(epoch, self._epoch)
+                scores = {post_id: score * factor for post_id, score in leaders.items()}
+                # Events recorded while the sync ran are not in the table yet
+                for post_id, value in self._pending.items():
+                    scores[post_id] = scores.get(post_id, 0.0) + value
+                self._scores = scores
+                self._top.rebuild(scores)
+
+            execution_time = time.time() - start_time
+            logger.info(f"Trending synced {len(pending)} posts, loaded {len(leaders)} in {round(execution_time * 1000, 2)} ms")
+
+    def _write_and_load(self, pending: Dict[int, float], epoch: int) -> Dict[int, float]:
+        """Upserts the increments and returns the candidate scores, relative to `epoch`."""
+        table = models.TrendingScore.__table__
+        with background_session("trending", self.session_factory) as db:
+            if pending:
+                insert_scores = dialect_insert(db, table).values(
+                    [{"post_id": post_id, "epoch": epoch, "score": value} for post_id, value in pending.items()]
+                )
+                stored, added = table.c, insert_scores.excluded
+                db.execute(insert_scores.on_conflict_do_update(
+                    index_elements=["post_id"],
+                    set_={
+                        "score": case(
+                            (stored.epoch == added.epoch, stored.score + added.score),
+                            (stored.epoch == added.epoch - 1, stored.score * EPOCH_FACTOR + added.score),
+                            (stored.epoch == added.epoch + 1, stored.score + added.score * EPOCH_FACTOR),
+                            (stored.epoch > added.epoch, stored.score),
+                            else_=added.score
+                        ),
+                        "epoch": case((stored.epoch > added.epoch, stored.epoch), else_=added.epoch),
+                    }
+                ))
+            # Older epochs weigh less than 2 ** -128 of the current one
+            db.execute(delete(table).where(table.c.epoch < epoch - 1))
+
+            limit = self.size * CANDIDATE_FACTOR
+            leaders: Dict[int, float] = {}
+            for row_epoch in (epoch - 1, epoch, epoch + 1):
+                rows = db.execute(
+                    select(table.c.post_id, table.c.score)
+                    .where(table.c.epoch == row_epoch)
+                    .order_by(table.c.score.desc())
+                    .limit(limit)
+                )
+                factor = _rescale(row_epoch, epoch)
+                for post_id, score in rows:
+                    leaders[post_id] = score * factor
+            return dict(heapq.nlargest(limit, leaders.items(), key=lambda item: item[1]))
+
+
+trending = TrendingEngine()
@@ -1,5 +1,19 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from core import database, models  
+from core.query_counter import query_stats_middleware
+from core.metrics import MetricsMiddleware, background_metrics, request_metrics
+from core.executor import render_executor_metrics, shutdown_executors
+from core.cache import cache
+from core.profiler import ProfilerMiddleware
+from core.compression import CompressionMiddleware
+from core.like_buffer import like_buffer, WRITE_BEHIND_ENABLED
+from core.pubsub import start_push, stop_push
+from core.trending import trending
+from tasks.notification_digest import notification_digest
+from utils.mail_templates import preload_templates
+from utils.mail_transport import close_mail_transport
 import routes.auth_routes as auth_routes
 import routes.user_routes as user_routes
 import routes.content_routes as content_routes
@@ -8,15 +22,57 @@ import routes.comments_routes as comments_routes
 import routes.search_routes as search_routes
 import routes.profile_routes as profile_routes
 import routes.follow_routes as follow_routes
+import routes.viewer_routes as viewer_routes
+import routes.notification_routes as notification_routes
+import routes.push_routes as push_routes
+import routes.admin_routes as admin_routes
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Compile mail templates before the first request needs them
+    preload_templates()
+    # Start the write-behind like buffer and flush it on shutdown
+    if WRITE_BEHIND_ENABLED:
+        like_buffer.start()
+    # Batch like / comment notifications into periodic digests
+    notification_digest.start()
+    # Restore trending scores from the last snapshot and keep syncing them
+    trending.start()
+    # Connect the push hub to the in-process or cross-worker broker
+    await start_push()
+    yield
+    await stop_push()
+    # Let queued background tasks finish first: they still record likes into the digest
+    shutdown_executors()
+    # Then write out what the buffers hold
+    if WRITE_BEHIND_ENABLED:
+        like_buffer.stop()
+    notification_digest.stop()
+    trending.stop()
+    # Log out of pooled SMTP connections
+    close_mail_transport()
 
 app = FastAPI(
     title="Trend Connect",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Create the database tables
 models.Base.metadata.create_all(bind=database.engine)  # Ensure models.Base is set up properly
 
+# Count SQL statements and DB time per request
+app.middleware("http")(query_stats_middleware)
+
+# Admin-only profiling of single requests sent with an X-Profile header
+app.add_middleware(ProfilerMiddleware)
+
+# Compress JSON, NDJSON and event streams; inside the metrics so they record bytes on the wire
+app.add_middleware(CompressionMiddleware)
+
+# Per-route latency, status and payload size metrics, outermost so they cover everything
+app.add_middleware(MetricsMiddleware, metrics=request_metrics)
+
 # Register API router for login
 app.include_router(auth_routes.router)
 
@@ -41,8 +97,27 @@ app.include_router(profile_routes.router)
 # Register API Routes for Follow / Unfollow
 app.include_router(follow_routes.router)
 
+# Register API Routes for batch viewer state
+app.include_router(viewer_routes.router)
+
+# Register API Routes for the in-app notification inbox
+app.include_router(notification_routes.router)
+
+# Register API Routes for the Server-Sent Events push stream
+app.include_router(push_routes.router)
+
+# Register API Routes for admin diagnostics
+app.include_router(admin_routes.router)
+
 #HEalth check
 @app.get("/health", tags=["Health"])
 async def health_check():
     return {"status": "healthy", "service": "TrendConnect"}
 
+# Prometheus scrape endpoint
+@app.get("/metrics", tags=["Health"], response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(
+        request_metrics.render() + background_metrics.render() + render_executor_metrics() + cache.render(),
+        media_type="text/plain; version=0.0.4"
+    )
@@ -0,0 +1,29 @@
+"""Composite indexes for keyset pagination of followers / following
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_follows_following_followed_at_id", "follows",
+        ["following_id", "followed_at", "id"], if_not_exists=True
+    )
+    op.create_index(
+        "ix_follows_follower_followed_at_id", "follows",
+        ["follower_id", "followed_at", "id"], if_not_exists=True
+    )
+
+
+def downgrade():
+    op.drop_index("ix_follows_follower_followed_at_id", table_name="follows")
+    op.drop_index("ix_follows_following_followed_at_id", table_name="follows")
@@ -0,0 +1,34 @@
+"""Unique (user_id, post_id) likes and a per-post like counter
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keep the oldest like of every duplicate (user_id, post_id) pair
+    op.execute(
+        "DELETE FROM likes WHERE like_id NOT IN "
+        "(SELECT MIN(like_id) FROM likes GROUP BY user_id, post_id)"
+    )
+    op.create_index("uq_likes_user_post", "likes", ["user_id", "post_id"], unique=True)
+
+    op.add_column("content", sa.Column("likes_count", sa.Integer(), nullable=False, server_default="0"))
+    op.execute(
+        "UPDATE content SET likes_count = "
+        "(SELECT COUNT(*) FROM likes WHERE likes.post_id = content.c_id)"
+    )
+
+
+def downgrade():
+    op.drop_column("content", "likes_count")
+    op.drop_index("uq_likes_user_post", table_name="likes")
@@ -0,0 +1,36 @@
+"""Durable notification outbox
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "notification_outbox",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("kind", sa.String(), nullable=False),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False, server_default="pending"),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("next_attempt_at", sa.DateTime(), nullable=False),
+        sa.Column("last_error", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_notification_outbox_id", "notification_outbox", ["id"])
+    op.create_index("ix_outbox_status_next_attempt", "notification_outbox", ["status", "next_attempt_at"])
+
+
+def downgrade():
+    op.drop_index("ix_outbox_status_next_attempt", table_name="notification_outbox")
+    op.drop_index("ix_notification_outbox_id", table_name="notification_outbox")
+    op.drop_table("notification_outbox")
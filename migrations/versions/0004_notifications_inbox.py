@@ -0,0 +1,41 @@
+"""In-app notifications, unread counter and email preference
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "notifications",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("registrations.user_id", ondelete="CASCADE"), nullable=False),
+        sa.Column("actor_id", sa.Integer(), sa.ForeignKey("registrations.user_id", ondelete="SET NULL"), nullable=True),
+        sa.Column("kind", sa.String(), nullable=False),
+        sa.Column("post_id", sa.Integer(), sa.ForeignKey("content.c_id", ondelete="SET NULL"), nullable=True),
+        sa.Column("text", sa.String(), nullable=True),
+        sa.Column("is_read", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_notifications_id", "notifications", ["id"])
+    op.create_index("ix_notifications_user_created_at_id", "notifications", ["user_id", "created_at", "id"])
+
+    op.add_column("registrations", sa.Column("unread_notifications", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column("registrations", sa.Column("email_notifications", sa.Boolean(), nullable=False, server_default=sa.true()))
+
+
+def downgrade():
+    op.drop_column("registrations", "email_notifications")
+    op.drop_column("registrations", "unread_notifications")
+    op.drop_index("ix_notifications_user_created_at_id", table_name="notifications")
+    op.drop_index("ix_notifications_id", table_name="notifications")
+    op.drop_table("notifications")
@@ -0,0 +1,38 @@
+"""Comment timestamps with a keyset index and a per-post comment counter
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing comments get the migration time; comment_id keeps their original order.
+    # SQLite cannot add a column with a non-constant default, so backfill it and tighten afterwards
+    op.add_column("comments", sa.Column("created_at", sa.DateTime(), nullable=True))
+    op.execute("UPDATE comments SET created_at = CURRENT_TIMESTAMP")
+    with op.batch_alter_table("comments") as batch:
+        batch.alter_column(
+            "created_at", existing_type=sa.DateTime(), nullable=False, server_default=sa.func.current_timestamp()
+        )
+    op.create_index("ix_comments_post_created_at_id", "comments", ["post_id", "created_at", "comment_id"])
+
+    op.add_column("content", sa.Column("comments_count", sa.Integer(), nullable=False, server_default="0"))
+    op.execute(
+        "UPDATE content SET comments_count = "
+        "(SELECT COUNT(*) FROM comments WHERE comments.post_id = content.c_id)"
+    )
+
+
+def downgrade():
+    op.drop_column("content", "comments_count")
+    op.drop_index("ix_comments_post_created_at_id", table_name="comments")
+    op.drop_column("comments", "created_at")
@@ -0,0 +1,51 @@
+"""Threaded comment replies with a materialized path
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+# Must match tasks.comment_threads.PATH_SEGMENT_WIDTH
+PATH_SEGMENT_WIDTH = 10
+
+
+def upgrade():
+    with op.batch_alter_table("comments") as batch:
+        batch.add_column(sa.Column("parent_id", sa.Integer(), nullable=True))
+        batch.add_column(sa.Column("path", sa.String(), nullable=True))
+        batch.add_column(sa.Column("depth", sa.Integer(), nullable=False, server_default="0"))
+        batch.add_column(sa.Column("reply_count", sa.Integer(), nullable=False, server_default="0"))
+        batch.create_foreign_key("fk_comments_parent_id", "comments", ["parent_id"], ["comment_id"])
+
+    # Every existing comment is top-level, so its path is its own zero-padded id
+    connection = op.get_bind()
+    ids = [row[0] for row in connection.execute(sa.text("SELECT comment_id FROM comments"))]
+    if ids:
+        connection.execute(
+            sa.text("UPDATE comments SET path = :path WHERE comment_id = :comment_id"),
+            [{"path": f"{comment_id:0{PATH_SEGMENT_WIDTH}d}", "comment_id": comment_id} for comment_id in ids]
+        )
+
+    op.drop_index("ix_comments_post_created_at_id", table_name="comments")
+    op.create_index("ix_comments_post_parent_created_at_id", "comments", ["post_id", "parent_id", "created_at", "comment_id"])
+    op.create_index("ix_comments_post_path", "comments", ["post_id", "path"])
+
+
+def downgrade():
+    op.drop_index("ix_comments_post_path", table_name="comments")
+    op.drop_index("ix_comments_post_parent_created_at_id", table_name="comments")
+    op.create_index("ix_comments_post_created_at_id", "comments", ["post_id", "created_at", "comment_id"])
+    with op.batch_alter_table("comments") as batch:
+        batch.drop_constraint("fk_comments_parent_id", type_="foreignkey")
+        batch.drop_column("reply_count")
+        batch.drop_column("depth")
+        batch.drop_column("path")
+        batch.drop_column("parent_id")
@@ -0,0 +1,41 @@
+"""Like timestamps and the trending scores snapshot
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing likes get the migration time; run tasks.trending_rebuild only once real timestamps accrue.
+    # Backfilled before tightening, as in 0005: SQLite cannot add a column with a non-constant default
+    op.add_column("likes", sa.Column("created_at", sa.DateTime(), nullable=True))
+    # Timestamps are naive UTC; SQLite's CURRENT_TIMESTAMP already is
+    utc_now = "timezone('utc', now())" if op.get_bind().dialect.name == "postgresql" else "CURRENT_TIMESTAMP"
+    op.execute(f"UPDATE likes SET created_at = {utc_now}")
+    with op.batch_alter_table("likes") as batch:
+        batch.alter_column(
+            "created_at", existing_type=sa.DateTime(), nullable=False, server_default=sa.func.current_timestamp()
+        )
+
+    op.create_table(
+        "trending_scores",
+        sa.Column("post_id", sa.Integer(), primary_key=True),
+        sa.Column("epoch", sa.Integer(), nullable=False),
+        sa.Column("score", sa.Float(), nullable=False),
+    )
+    op.create_index("ix_trending_scores_epoch_score", "trending_scores", ["epoch", "score"])
+
+
+def downgrade():
+    op.drop_index("ix_trending_scores_epoch_score", table_name="trending_scores")
+    op.drop_table("trending_scores")
+    op.drop_column("likes", "created_at")
@@ -0,0 +1,74 @@
+"""Timezone-aware post and registration timestamps, newest-first listing indexes
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+# Tables whose created_at changes type, with their primary keys
+TABLES = (("content", "c_id"), ("registrations", "user_id"))
+
+
+def _retype(table, key, existing_type, type_, postgresql_using, stored_value):
+    connection = op.get_bind()
+    if connection.dialect.name != "sqlite":
+        op.alter_column(table, "created_at", existing_type=existing_type, type_=type_, postgresql_using=postgresql_using)
+        return
+
+    # SQLite rebuilds the table and CASTs the column, which turns '2025-01-02' into 2025,
+    # so the values are written back as text in the new type's format
+    rows = connection.execute(sa.text(f"SELECT {key}, created_at FROM {table} WHERE created_at IS NOT NULL")).all()
+    with op.batch_alter_table(table) as batch:
+        batch.alter_column("created_at", existing_type=existing_type, type_=type_)
+    if rows:
+        connection.execute(
+            sa.text(f"UPDATE {table} SET created_at = :created_at WHERE {key} = :key"),
+            [{"key": row_key, "created_at": stored_value(str(value))} for row_key, value in rows]
+        )
+
+
+def upgrade():
+    # Existing dates become midnight UTC of that day; only new rows carry the time of day
+    for table, key in TABLES:
+        _retype(
+            table, key, sa.Date(), sa.DateTime(timezone=True),
+            "created_at::timestamp AT TIME ZONE 'UTC'",
+            lambda value: f"{value[:10]} 00:00:00.000000"
+        )
+
+    # Like times are set by the application in UTC; a database default would use the server's time zone
+    with op.batch_alter_table("likes") as batch:
+        batch.alter_column("created_at", existing_type=sa.DateTime(), existing_nullable=False, server_default=None)
+
+    # Both are led by the new composite index
+    op.drop_index("ix_content_created_at", table_name="content")
+    op.drop_index("ix_content_user_id", table_name="content")
+    op.create_index("ix_content_user_created_at_id", "content", ["user_id", sa.text("created_at DESC"), "c_id"])
+    op.create_index("ix_content_created_at_id", "content", [sa.text("created_at DESC"), "c_id"])
+
+
+def downgrade():
+    op.drop_index("ix_content_created_at_id", table_name="content")
+    op.drop_index("ix_content_user_created_at_id", table_name="content")
+    op.create_index("ix_content_user_id", "content", ["user_id"])
+    op.create_index("ix_content_created_at", "content", ["created_at"])
+
+    with op.batch_alter_table("likes") as batch:
+        batch.alter_column(
+            "created_at", existing_type=sa.DateTime(), existing_nullable=False, server_default=sa.func.current_timestamp()
+        )
+
+    for table, key in TABLES:
+        _retype(
+            table, key, sa.DateTime(timezone=True), sa.Date(),
+            "(created_at AT TIME ZONE 'UTC')::date",
+            lambda value: value[:10]
+        )
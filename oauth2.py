@@ -1,3 +1,4 @@
+import os
 from datetime import datetime, timedelta
 from schemas.token import Token, TokenData
 from core import database, models
@@ -15,6 +16,9 @@ secret_key = settings.SECRET_KEY
 algorithm = settings.ALGORITHM
 expire_time_minutes = settings.ACCESS_TOKEN_EXPIRY_MINUTES
 
+# Usernames allowed to use the /admin endpoints and request profiling, comma separated
+ADMIN_USERNAMES = frozenset(filter(None, (name.strip() for name in os.getenv("ADMIN_USERNAMES", "").split(","))))
+
 def create_tokens(data: dict):
     """
     Creates a JWT token with the given data and expiration time.
@@ -93,3 +97,32 @@ def get_current_user(db: Session = Depends(database.get_db), token: str = Depend
     except JWTError:
         # Handle invalid token error
         raise credential_exception
+
+def is_admin_token(token: str) -> bool:
+    """
+    Checks that the token is valid and belongs to an admin, without a database
+    lookup, so it can be used outside of a request's dependencies.
+    """
+    try:
+        payload = jwt.decode(token, secret_key, algorithms=[algorithm])
+    except JWTError:
+        return False
+    return payload.get("sub") in ADMIN_USERNAMES
+
+def get_admin_username(token: str = Depends(oauth2_scheme)) -> str:
+    """
+    Admin-only dependency. Checks the token alone so long-running admin
+    requests do not keep a database connection checked out.
+    """
+    credential_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"}
+    )
+    username = verify_token(token, credential_exception).username
+    if username not in ADMIN_USERNAMES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    return username
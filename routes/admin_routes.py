@@ -0,0 +1,57 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+from core.profiler import ProfilerBusy, StackSampler, collapse
+from core.slow_queries import slow_query_log
+from oauth2 import get_admin_username
+from Logging.logging import logger
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["Admin"]
+)
+
+@router.get("/profile", response_class=PlainTextResponse, summary="Sample the stacks of this worker for a number of seconds")
+async def profile_worker(
+    seconds: float = Query(10, gt=0, le=60),
+    interval_ms: float = Query(5, ge=1, le=100),
+    idle: bool = Query(False, description="Include threads that are waiting for work"),
+    admin: str = Depends(get_admin_username)
+):
+    """
+    Samples every thread of the worker that serves this request and returns
+    collapsed stacks (`root;caller;leaf count`) for flamegraph.pl, speedscope
+    or inferno. Each worker process is profiled separately.
+    """
+    sampler = StackSampler(interval_ms / 1000, include_idle=idle)
+    try:
+        sampler.start()
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+    logger.info(f"Worker profile started by {admin} for {seconds}s")
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        samples = sampler.stop()
+    return PlainTextResponse(collapse(samples))
+
+@router.get("/slow_queries", summary="Most recent slow SQL statements of this worker")
+def get_slow_queries(
+    limit: int = Query(100, ge=1, le=1000),
+    admin: str = Depends(get_admin_username)
+):
+    """
+    Statements slower than `threshold_ms`, newest first, with redacted
+    parameters, the route that issued them and, if enabled, their PostgreSQL
+    plan. `python -m core.slow_queries` aggregates them across workers from the logs.
+    """
+    return {
+        "threshold_ms": slow_query_log.threshold_ms,
+        "queries": [entry._asdict() for entry in slow_query_log.entries(limit)]
+    }
+
+@router.delete("/slow_queries", status_code=status.HTTP_204_NO_CONTENT, summary="Empty this worker's slow query log")
+def clear_slow_queries(admin: str = Depends(get_admin_username)):
+    slow_query_log.clear()
+    logger.info(f"Slow query log cleared by {admin}")
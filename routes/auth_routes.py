@@ -7,7 +7,6 @@ from core import models
 from oauth2 import create_tokens
 import warnings
 from Logging.logging import logger
-import time
 warnings.filterwarnings('ignore')
 
 router = APIRouter(tags=["Authentication"])
@@ -23,7 +22,6 @@ def login(
     user_credential: OAuth2PasswordRequestForm = Depends(), 
     db: Session = Depends(get_db)
 ):
-    start_time = time.time()
     logger.info(f"Login attempt for username: {user_credential.username}")
     
     # Fetch user by username
@@ -54,8 +52,7 @@ def login(
     })
 
     # Log successful login
-    execution_time = time.time() - start_time
-    logger.info(f"Login successful for user: {user_credential.username} | User ID: {user.user_id} | Time: {round(execution_time * 1000, 2)} ms")
+    logger.info(f"Login successful for user: {user_credential.username} | User ID: {user.user_id}")
     
     # Return login response
     return {
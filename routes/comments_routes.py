@@ -1,33 +1,38 @@
-from fastapi import APIRouter, HTTPException, status, Depends, BackgroundTasks
+from typing import Optional
+from fastapi import APIRouter, HTTPException, status, Depends, Query
+from sqlalchemy import tuple_, update
 from sqlalchemy.orm import Session
+from core.cache import invalidate_after_commit
 from core.database import get_db
 from core import models
+from core import trending as trending_events
 from oauth2 import get_current_user
 from schemas.comments import CommentInput
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-import smtplib
-from configuration.config import settings  # Import settings from your config file
 from tasks.comment_notify import notify_post_owner_background
+from tasks.comment_threads import MAX_REPLY_DEPTH, ancestor_ids, comment_path, subtree_bounds
+from tasks.notifications import COMMENT, add_notification
+from utils.pagination import encode_cursor, decode_cursor, encode_path_cursor, decode_path_cursor
 from Logging.logging import logger
-import time
 
 router = APIRouter(
     tags=["Comments"]
 )
 
+# Page size limits for a post's comments
+COMMENT_PAGE_SIZE = 50
+MAX_COMMENT_PAGE_SIZE = 200
+
 # Manage comments on a post
 @router.post("/comments", status_code=status.HTTP_201_CREATED, summary="Add a comment to a post")
 def add_comment(
     comment: CommentInput,
-    background_tasks: BackgroundTasks,  # Background task dependency
     db: Session = Depends(get_db),
     current_user: str = Depends(get_current_user)
 ):
     """
-    Adds a comment to a post and notifies the post owner in the background.
+    Adds a comment to a post, or a reply to another comment when `parent_id` is set,
+    and adds it to the post owner's next notification digest.
     """
-    start_time = time.time()
     logger.info(f"Comment addition attempt by user {current_user.username} on post {comment.post_id}")
     
     try:
@@ -37,28 +42,54 @@ def add_comment(
             logger.warning(f"Comment failed: Post with ID {comment.post_id} not found")
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
 
+        # A reply must answer a comment on the same post
+        parent = None
+        if comment.parent_id is not None:
+            parent = db.query(models.Comment).filter(models.Comment.comment_id == comment.parent_id).first()
+            if not parent or parent.post_id != comment.post_id:
+                logger.warning(f"Comment failed: Parent comment {comment.parent_id} not found on post {comment.post_id}")
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Parent comment not found")
+            if parent.depth + 1 > MAX_REPLY_DEPTH:
+                logger.warning(f"Comment failed: Reply to comment {comment.parent_id} is nested too deeply")
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Replies are nested too deeply")
+
         # Create a new comment entry in the database
         new_comment = models.Comment(
             user_id=current_user.user_id,  
             post_id=comment.post_id,
-            user_comment=comment.user_comment
+            user_comment=comment.user_comment,
+            parent_id=comment.parent_id,
+            depth=parent.depth + 1 if parent else 0
         )
 
-        # Add and commit the new comment to the database
+        # Add and commit the new comment together with the owner's in-app notification
         db.add(new_comment)
+        # The path ends with the comment's own id, which the insert assigns
+        db.flush()
+        new_comment.path = comment_path(parent.path if parent else "", new_comment.comment_id)
+        if parent is not None:
+            db.execute(
+                update(models.Comment)
+                .where(models.Comment.comment_id.in_(ancestor_ids(parent.path)))
+                .values(reply_count=models.Comment.reply_count + 1)
+            )
+        db.execute(
+            update(models.Content)
+            .where(models.Content.c_id == comment.post_id)
+            .values(comments_count=models.Content.comments_count + 1)
+        )
+        add_notification(db, post.user_id, current_user.user_id, COMMENT, comment.post_id, comment.user_comment)
+        invalidate_after_commit(db, f"post:{comment.post_id}")
         db.commit()
         db.refresh(new_comment)
+        trending_events.trending.record(comment.post_id, trending_events.COMMENT)
 
         # Log the successful comment creation
         logger.info(f"Comment {new_comment.comment_id} added successfully by user {current_user.username} on post {comment.post_id}")
         
-        # Notify the post owner in the background
-        background_tasks.add_task(notify_post_owner_background, comment.post_id, comment.user_comment, current_user.username, db, background_tasks)
-        logger.info(f"Background notification task scheduled for post owner of post {comment.post_id}")
+        # Only records the comment in memory for the owner's digest, so it needs no background task
+        notify_post_owner_background(comment.post_id, comment.user_comment, current_user.user_id, current_user.username)
 
-        execution_time = time.time() - start_time
-        logger.info(f"Comment operation completed in {round(execution_time * 1000, 2)} ms")
-        
         return {
             "message": "Comment added successfully",
             "comment": {
@@ -66,6 +97,8 @@ def add_comment(
                 "post_id": new_comment.post_id,
                 "user_comment": new_comment.user_comment,
                 "comment_id": new_comment.comment_id,  
+                "parent_id": new_comment.parent_id,
+                "depth": new_comment.depth,
             }
         }
     except HTTPException:
@@ -77,4 +110,122 @@ def add_comment(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An unexpected error occurred while adding comment"
-        )
\ No newline at end of file
+        )
+
+@router.get("/posts/{post_id}/comments", summary="Page through the top-level comments of a post")
+def get_post_comments(
+    post_id: int,
+    limit: int = Query(COMMENT_PAGE_SIZE, ge=1, le=MAX_COMMENT_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Returns a post's top-level comments oldest first with their authors and
+    how many replies each has. Pages are fetched with the `next_cursor` of the
+    previous page; replies are read through /comments/{comment_id}/replies.
+    """
+    logger.info(f"Comments of post {post_id} requested by {current_user.username}")
+
+    if db.query(models.Content.c_id).filter(models.Content.c_id == post_id).first() is None:
+        logger.warning(f"Comments request failed: Post with ID {post_id} not found")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
+
+    query = (
+        db.query(
+            models.Comment.comment_id,
+            models.Comment.user_id,
+            models.Registration.username,
+            models.Comment.user_comment,
+            models.Comment.created_at,
+            models.Comment.reply_count
+        )
+        .outerjoin(models.Registration, models.Registration.user_id == models.Comment.user_id)
+        .filter(models.Comment.post_id == post_id, models.Comment.parent_id.is_(None))
+    )
+    if cursor:
+        query = query.filter(tuple_(models.Comment.created_at, models.Comment.comment_id) > tuple_(*decode_cursor(cursor)))
+    rows = query.order_by(models.Comment.created_at, models.Comment.comment_id).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].comment_id)
+
+    return {
+        "comments": [
+            {
+                "comment_id": row.comment_id,
+                "user_id": row.user_id,
+                "username": row.username,
+                "user_comment": row.user_comment,
+                "created_at": row.created_at.strftime("%Y-%m-%d %H:%M:%S"),
+                "reply_count": row.reply_count
+            } for row in rows
+        ],
+        "next_cursor": next_cursor
+    }
+
+@router.get("/comments/{comment_id}/replies", summary="Page through the replies below a comment")
+def get_comment_replies(
+    comment_id: int,
+    limit: int = Query(COMMENT_PAGE_SIZE, ge=1, le=MAX_COMMENT_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Returns every reply below a comment, at any depth, in thread order: each
+    reply is followed by its own replies, and siblings come oldest first.
+    The whole subtree is one range of the comment paths index, and pages are
+    fetched with the `next_cursor` of the previous page.
+    """
+    logger.info(f"Replies to comment {comment_id} requested by {current_user.username}")
+
+    root = db.query(models.Comment.post_id, models.Comment.path).filter(models.Comment.comment_id == comment_id).first()
+    if root is None:
+        logger.warning(f"Replies request failed: Comment with ID {comment_id} not found")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comment not found")
+
+    after, before = subtree_bounds(root.path)
+    if cursor:
+        after = max(after, decode_path_cursor(cursor))
+    rows = (
+        db.query(
+            models.Comment.comment_id,
+            models.Comment.parent_id,
+            models.Comment.depth,
+            models.Comment.path,
+            models.Comment.user_id,
+            models.Registration.username,
+            models.Comment.user_comment,
+            models.Comment.created_at,
+            models.Comment.reply_count
+        )
+        .outerjoin(models.Registration, models.Registration.user_id == models.Comment.user_id)
+        .filter(models.Comment.post_id == root.post_id, models.Comment.path > after, models.Comment.path < before)
+        .order_by(models.Comment.path)
+        .limit(limit + 1)
+        .all()
+    )
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_path_cursor(rows[-1].path)
+
+    return {
+        "replies": [
+            {
+                "comment_id": row.comment_id,
+                "parent_id": row.parent_id,
+                "depth": row.depth,
+                "user_id": row.user_id,
+                "username": row.username,
+                "user_comment": row.user_comment,
+                "created_at": row.created_at.strftime("%Y-%m-%d %H:%M:%S"),
+                "reply_count": row.reply_count
+            } for row in rows
+        ],
+        "next_cursor": next_cursor
+    }
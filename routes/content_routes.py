@@ -1,21 +1,27 @@
 #Content_routes.py
 
-from fastapi import APIRouter, HTTPException, status, Depends, File, UploadFile, Form, Query
+from fastapi import APIRouter, HTTPException, status, Depends, File, UploadFile, Form, Query, Request, Response
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from typing import List
 from core.database import get_db
 from core import models
-from schemas.content import ContentResponse, ContentUpdate, ContentDetailResponse, ContentCreate
+from schemas.content import ContentResponse, ContentUpdate, ContentCreate
 from oauth2 import get_current_user  # Ensure the user is authenticated
 import os
 from datetime import datetime
-from fastapi import BackgroundTasks
 from tasks.savecontent import save_content_to_folder_background
 from tasks.deletecontent import delete_content_folder_background
-from core.models import Registration, Content, Likes, Comment
-from tasks.notify_followers import notify_followers_background
+from core.cache import cache, cache_key, invalidate_after_commit
+from core.conditional import make_etag, not_modified
+from core.executor import io_executor
+from core.responses import FastJSONResponse
+from core.trending import TRENDING_SIZE, trending
+from core.models import Registration, Content
+from tasks.notify_followers import enqueue_new_post_notification
+from tasks.comment_preview import get_comment_previews
+from tasks.viewer_state import get_viewer_state
 from Logging.logging import logger
-import time
 
 router = APIRouter(
     tags=["Content"]
@@ -23,6 +29,56 @@ router = APIRouter(
 
 # Directory for saving content files
 CONTENT_DIR = "content_database"
+# Posts per page of the content listings
+PAGE_SIZE = 6
+# Listing order, served by the (created_at DESC, c_id) and (user_id, created_at DESC, c_id) indexes
+NEWEST_FIRST = (Content.created_at.desc(), Content.c_id)
+
+def _page_etag(post_query, page: int, viewer_id: int, *parts):
+    """
+    ETag of a listing page: the posts on it (one index-only query for their
+    ids), any post being added or removed, and the viewer's likes and follows.
+    """
+    post_ids = [row.c_id for row in post_query.offset((page - 1) * PAGE_SIZE).limit(PAGE_SIZE).all()]
+    return make_etag(["content", f"viewer:{viewer_id}"] + [f"post:{post_id}" for post_id in post_ids], page, *parts)
+
+# Columns of a listed post, read as plain tuples rather than hydrated Content objects
+POST_COLUMNS = (
+    Content.c_id, Content.user_id, Content.username, Content.title,
+    Content.caption, Content.created_at, Content.likes_count, Content.comments_count
+)
+
+def _post_details(db: Session, rows):
+    """
+    Listing entries (the fields of ContentDetailResponse) built directly from
+    POST_COLUMNS rows, with the first comments of all posts fetched in one query.
+    """
+    previews = get_comment_previews(db, [row.c_id for row in rows])
+    return [
+        {
+            "c_id": row.c_id,
+            "user_id": row.user_id,
+            "username": row.username,
+            "title": row.title,
+            "caption": row.caption,
+            "created_at": row.created_at.isoformat(),
+            "file": None,
+            "comments": previews.get(row.c_id, []),
+            "comments_count": row.comments_count or 0,
+            "total_likes": row.likes_count or 0,
+        } for row in rows
+    ]
+
+def _with_viewer_state(db: Session, viewer_id: int, posts):
+    """Copies of the listing entries with the viewer's like / follow status, in two queries for the page."""
+    viewer_state = get_viewer_state(db, viewer_id, [post["c_id"] for post in posts], [post["user_id"] for post in posts])
+    return [
+        {
+            **post,
+            "liked_by_viewer": viewer_state["liked"].get(post["c_id"]),
+            "following_author": viewer_state["following"].get(post["user_id"])
+        } for post in posts
+    ]
 
 # Welcome to the content route
 @router.get("/welcome")
@@ -33,7 +89,6 @@ def welcome():
 # Create Content
 @router.post("/create_content")
 async def create_content(
-    background_tasks: BackgroundTasks,
     username: str = Form(...),
     title: str = Form(...),
     caption: str = Form(...),
@@ -41,7 +96,6 @@ async def create_content(
     db: Session = Depends(get_db),
     current_user: int = Depends(get_current_user)
 ):
-    start_time = time.time()
     logger.info(f"Content creation attempt by user {username}, file: {file.filename}")
     
     try:
@@ -58,17 +112,15 @@ async def create_content(
         )
 
         db.add(content)
+        db.flush()
+
+        # Queue follower notifications in the same transaction; the outbox worker fans them out
+        enqueue_new_post_notification(db, content)
+        invalidate_after_commit(db, "content")
         db.commit()
         db.refresh(content)
-        logger.info(f"Content entry created in database with ID: {content.c_id}")
+        logger.info(f"Content entry created in database with ID: {content.c_id}, follower notifications queued")
 
-        # Notify followers asynchronously
-        notify_followers_background(username, title, caption, db, background_tasks)
-        logger.info(f"Background notification task scheduled for followers of {username}")
-
-        execution_time = time.time() - start_time
-        logger.info(f"Content creation completed in {round(execution_time * 1000, 2)} ms")
-        
         return {"message": "Content created successfully", "content_id": content.c_id}
 
     except Exception as e:
@@ -79,18 +131,39 @@ async def create_content(
 #GEt all content
 @router.get("/get_content", status_code=status.HTTP_200_OK)
 def get_all_content(
+    request: Request,
+    response: Response,
     page: int = Query(1, alias="page", ge=1),
     db: Session = Depends(get_db),
     current_user: str = Depends(get_current_user),  # Ensure the user is authenticated
 ):
     """
-    Retrieve paginated content, including total likes and associated comments.
-    Default: Page 1, 6 posts per page.
+    Retrieve paginated content newest first, including total likes, the comment count and the first comments.
+    Default: Page 1, 6 posts per page. Answers 304 to a current If-None-Match.
     """
-    start_time = time.time()
     logger.info(f"Get all content request from user {current_user.username}, page: {page}")
-    
-    PAGE_SIZE = 6
+
+    unchanged = not_modified(request, response, _page_etag(db.query(Content.c_id).order_by(*NEWEST_FIRST), page, current_user.user_id))
+    if unchanged:
+        logger.info(f"Content page {page} not modified for user {current_user.username}")
+        return unchanged
+
+    # The page itself is the same for everyone; only the viewer state is per user
+    page_data = cache.get_or_compute(
+        cache_key("get_content", page),
+        lambda: _content_page(db, page),
+        tags=lambda data: ["content"] + [f"post:{item['c_id']}" for item in data["content"]]
+    )
+
+    return FastJSONResponse({
+        "content": _with_viewer_state(db, current_user.user_id, page_data["content"]),
+        "total_content": page_data["total_content"],
+        "total_pages": page_data["total_pages"],
+        "current_page": page
+    }, response=response)
+
+def _content_page(db: Session, page: int):
+    """One page of posts with their like counts and comments, as cacheable JSON data."""
     total_content = db.query(Content).count()
     total_pages = (total_content + PAGE_SIZE - 1) // PAGE_SIZE  # Calculate total pages
 
@@ -100,52 +173,78 @@ def get_all_content(
         raise HTTPException(status_code=400, detail="Invalid choice of page")
 
     offset = (page - 1) * PAGE_SIZE
-    content = db.query(Content).offset(offset).limit(PAGE_SIZE).all()
-    logger.info(f"Retrieved {len(content)} content items for page {page}")
-
-    content_details = []
-    for c in content:
-        likes_count = db.query(Likes).filter(Likes.post_id == c.c_id).count()
-        comments = db.query(Comment).filter(Comment.post_id == c.c_id).all()
-        comment_texts = [comment.user_comment for comment in comments]
-
-        content_details.append(ContentDetailResponse(
-            username=c.username,
-            title=c.title,
-            caption=c.caption,
-            created_at=c.created_at,
-            comments=comment_texts,
-            total_likes=likes_count
-        ))
-
-    execution_time = time.time() - start_time
-    logger.info(f"Get all content completed in {round(execution_time * 1000, 2)} ms")
-    
+    rows = db.query(*POST_COLUMNS).order_by(*NEWEST_FIRST).offset(offset).limit(PAGE_SIZE).all()
+    logger.info(f"Retrieved {len(rows)} content items for page {page}")
+
     return {
-        "content": content_details,
+        "content": _post_details(db, rows),
         "total_content": total_content,
-        "total_pages": total_pages,
-        "current_page": page
+        "total_pages": total_pages
     }
 
+@router.get("/trending", status_code=status.HTTP_200_OK)
+def get_trending(
+    response: Response,
+    limit: int = Query(TRENDING_SIZE, ge=1, le=TRENDING_SIZE),
+    db: Session = Depends(get_db),
+    current_user: str = Depends(get_current_user),
+):
+    """
+    The hottest posts right now by likes and comments, each losing half its weight
+    every TRENDING_HALF_LIFE_SECONDS. The ranking is read from memory; only the
+    listed posts are queried.
+    """
+    logger.info(f"Trending request from user {current_user.username}, limit: {limit}")
+
+    ranking = trending.top(limit)
+    post_ids = [post_id for post_id, _ in ranking]
+    posts = cache.get_or_compute(
+        cache_key("trending", *post_ids),
+        lambda: _trending_posts(db, post_ids),
+        tags=[f"post:{post_id}" for post_id in post_ids]
+    )
+
+    heat = dict(ranking)
+    return FastJSONResponse({
+        "content": [
+            {**post, "trending_score": round(heat[post["c_id"]], 3)}
+            for post in _with_viewer_state(db, current_user.user_id, posts)
+        ]
+    }, response=response)
+
+def _trending_posts(db: Session, post_ids: List[int]):
+    """Listing entries of the ranked posts in ranking order; deleted posts are left out."""
+    if not post_ids:
+        return []
+    rows = {row.c_id: row for row in db.query(*POST_COLUMNS).filter(Content.c_id.in_(post_ids)).all()}
+    return _post_details(db, [rows[post_id] for post_id in post_ids if post_id in rows])
+
 # Get content by username with pagination and authentication
 @router.get("/get_content_by_username", status_code=status.HTTP_200_OK)
 def get_content_by_username(
+    request: Request,
+    response: Response,
     username: str,
     page: int = Query(1, alias="page", ge=1),
     db: Session = Depends(get_db),
     current_user: str = Depends(get_current_user),  # Ensure the user is authenticated
 ):
     """
-    Retrieve paginated content by username, including total likes and associated comments.
-    Default: Page 1, 6 posts per page.
+    Retrieve paginated content by username newest first, including total likes, the comment count and the first comments.
+    Default: Page 1, 6 posts per page. Answers 304 to a current If-None-Match.
     """
-    start_time = time.time()
     logger.info(f"Get content by username request from {current_user.username} for user {username}, page: {page}")
-    
-    PAGE_SIZE = 6
-    # Query content for the given username
-    total_content = db.query(Content).filter(Content.username == username).count()
+
+    # Posts are sought by the owner's id, which leads the (user_id, created_at DESC, c_id) index;
+    # the id is resolved once per statement, and an unknown username matches no posts
+    owner_id = select(Registration.user_id).where(Registration.username == username).scalar_subquery()
+    post_query = db.query(Content.c_id).filter(Content.user_id == owner_id)
+    unchanged = not_modified(request, response, _page_etag(post_query.order_by(*NEWEST_FIRST), page, current_user.user_id, username))
+    if unchanged:
+        logger.info(f"Content page {page} of {username} not modified for user {current_user.username}")
+        return unchanged
+
+    total_content = post_query.count()
     total_pages = (total_content + PAGE_SIZE - 1) // PAGE_SIZE  # Calculate total pages
 
     # Validate if requested page exists
@@ -154,33 +253,22 @@ def get_content_by_username(
         raise HTTPException(status_code=400, detail="Invalid choice of page")
 
     offset = (page - 1) * PAGE_SIZE
-    content = db.query(Content).filter(Content.username == username).offset(offset).limit(PAGE_SIZE).all()
-    logger.info(f"Retrieved {len(content)} content items for user {username}, page {page}")
-
-    content_details = []
-    for c in content:
-        likes_count = db.query(Likes).filter(Likes.post_id == c.c_id).count()
-        comments = db.query(Comment).filter(Comment.post_id == c.c_id).all()
-        comment_texts = [comment.user_comment for comment in comments]
-
-        content_details.append(ContentDetailResponse(
-            username=c.username,
-            title=c.title,
-            caption=c.caption,
-            created_at=c.created_at,
-            comments=comment_texts,
-            total_likes=likes_count
-        ))
-
-    execution_time = time.time() - start_time
-    logger.info(f"Get content by username completed in {round(execution_time * 1000, 2)} ms")
-    
-    return {
-        "content": content_details,
+    rows = (
+        db.query(*POST_COLUMNS)
+        .filter(Content.user_id == owner_id)
+        .order_by(*NEWEST_FIRST)
+        .offset(offset)
+        .limit(PAGE_SIZE)
+        .all()
+    )
+    logger.info(f"Retrieved {len(rows)} content items for user {username}, page {page}")
+
+    return FastJSONResponse({
+        "content": _with_viewer_state(db, current_user.user_id, _post_details(db, rows)),
         "total_content": total_content,
         "total_pages": total_pages,
         "current_page": page
-    }
+    }, response=response)
 
 
 # Delete content by ID
@@ -188,10 +276,8 @@ def get_content_by_username(
 def delete_content_by_id(
     id: int, 
     db: Session = Depends(get_db), 
-    current_user: str = Depends(get_current_user), 
-    background_tasks: BackgroundTasks = BackgroundTasks()  # Corrected this line
+    current_user: str = Depends(get_current_user)
 ):
-    start_time = time.time()
     logger.info(f"Delete content request from {current_user.username} for content ID: {id}")
     
     # Retrieve content from the database
@@ -208,16 +294,18 @@ def delete_content_by_id(
     try:
         # Delete the content from the database
         db.delete(content)
+        db.query(models.TrendingScore).filter(models.TrendingScore.post_id == id).delete(synchronize_session=False)
+        invalidate_after_commit(db, "content", f"post:{id}")
         db.commit()
+        trending.discard(id)
         logger.info(f"Content {id} deleted from database by {current_user.username}")
 
-        # Trigger the background task to delete the user's folder
-        background_tasks.add_task(delete_content_folder_background, content.username)
-        logger.info(f"Background task scheduled to delete content folder for {content.username}")
-        
-        execution_time = time.time() - start_time
-        logger.info(f"Delete content completed in {round(execution_time * 1000, 2)} ms")
-        
+        # Delete the user's folder on the background executor
+        if io_executor.submit(delete_content_folder_background, content.username, critical=True):
+            logger.info(f"Background task queued to delete content folder for {content.username}")
+        else:
+            logger.error(f"Content folder of {content.username} left behind: background executor is full")
+
         return {"message": "Content deleted successfully", "id": id}
     except Exception as e:
         db.rollback()
@@ -2,16 +2,24 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from datetime import datetime
 from core.models import Follows, Registration
+from core.cache import invalidate_after_commit
 from core.database import get_db
 from oauth2 import get_current_user
 from schemas.follow import FollowRequest
+from tasks.notifications import FOLLOW, add_notification
 from Logging.logging import logger
-import time
 
 router = APIRouter(
     tags=["Follow"]
 )
 
+def follow_tags(follower_id: int, following_id: int):
+    """Cache tags of both users' follow lists and profiles, and of what the follower sees."""
+    return (
+        f"following:{follower_id}", f"user:{follower_id}", f"viewer:{follower_id}",
+        f"followers:{following_id}", f"user:{following_id}"
+    )
+
 @router.post("/follow", summary="Id you want to follow")
 def follow_user(
     request: FollowRequest, 
@@ -19,7 +27,6 @@ def follow_user(
     db: Session = Depends(get_db)
 ):
     """Follow a user"""
-    start_time = time.time()
     logger.info(f"Follow request from user {current_user.user_id} to follow user {request.user_id}")
 
     try:
@@ -51,10 +58,11 @@ def follow_user(
             followed_at=datetime.utcnow()
         )
         db.add(follow_entry)
+        add_notification(db, request.user_id, current_user.user_id, FOLLOW)
+        invalidate_after_commit(db, *follow_tags(current_user.user_id, request.user_id))
         db.commit()
         
-        execution_time = time.time() - start_time
-        logger.info(f"Follow relationship created: User {current_user.user_id} now follows {request.user_id}. Completed in {round(execution_time * 1000, 2)} ms")
+        logger.info(f"Follow relationship created: User {current_user.user_id} now follows {request.user_id}")
         
         return {"message": "Followed successfully"}
 
@@ -72,7 +80,6 @@ def unfollow_user(
     db: Session = Depends(get_db)
 ):
     """Unfollow a user"""
-    start_time = time.time()
     logger.info(f"Unfollow request from user {current_user.user_id} to unfollow user {request.user_id}")
 
     try:
@@ -88,10 +95,10 @@ def unfollow_user(
 
         # Remove follow relationship
         db.delete(follow_entry)
+        invalidate_after_commit(db, *follow_tags(current_user.user_id, request.user_id))
         db.commit()
 
-        execution_time = time.time() - start_time
-        logger.info(f"Follow relationship removed: User {current_user.user_id} unfollowed {request.user_id}. Completed in {round(execution_time * 1000, 2)} ms")
+        logger.info(f"Follow relationship removed: User {current_user.user_id} unfollowed {request.user_id}")
 
         return {"message": "Unfollowed successfully"}
 
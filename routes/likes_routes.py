@@ -1,98 +1,198 @@
-from fastapi import APIRouter, HTTPException, status, Depends, BackgroundTasks
+from fastapi import APIRouter, HTTPException, status, Depends
+from sqlalchemy import select, update, delete, literal
 from sqlalchemy.orm import Session
-from core.database import get_db
+from core.cache import cache, invalidate_after_commit
+from core.database import get_db, dialect_insert
+from core.executor import io_executor
 from core import models
+from core.like_buffer import like_buffer, WRITE_BEHIND_ENABLED
+from core.trending import LIKE, timestamp_of, trending
 from oauth2 import get_current_user
 from schemas.likes import LikeInput
 from tasks.notify_user import notify_post_owner_background
+from tasks.notification_digest import notification_digest
 from Logging.logging import logger
-import time
 
 router = APIRouter(
     tags=["Likes"]
 )
 
+def _apply_like_change(db: Session, change, post_id: int, delta: int):
+    """
+    Runs an INSERT/DELETE ... RETURNING post_id, created_at on likes and moves
+    the post's likes_count by `delta` only if a row was actually changed.
+    On PostgreSQL both happen in one statement through a data-modifying CTE.
+    Returns the new like count and the changed like's created_at, or None when nothing changed.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        changed = change.cte("changed_like")
+        return db.execute(
+            update(models.Content)
+            .where(models.Content.c_id == changed.c.post_id)
+            .values(likes_count=models.Content.likes_count + delta)
+            .returning(models.Content.likes_count, changed.c.created_at)
+        ).first()
+
+    changed = db.execute(change).first()
+    if changed is None:
+        return None
+    total_likes = db.execute(
+        update(models.Content)
+        .where(models.Content.c_id == post_id)
+        .values(likes_count=models.Content.likes_count + delta)
+        .returning(models.Content.likes_count)
+    ).scalar()
+    return total_likes, changed.created_at
+
+def _post_exists(db: Session, post_id: int) -> bool:
+    return db.query(models.Content.c_id).filter(models.Content.c_id == post_id).first() is not None
+
+def _current_like_state(db: Session, user_id: int, post_id: int):
+    """
+    Returns None if the post does not exist, otherwise whether the user likes it
+    and since when (None for a like still in the buffer), answering from the
+    write-behind buffer before falling back to one read.
+    """
+    pending = like_buffer.pending_state(user_id, post_id)
+    if pending is not None:
+        return pending == 1, None
+
+    row = (
+        db.query(models.Content.c_id, models.Likes.like_id, models.Likes.created_at)
+        .outerjoin(models.Likes, (models.Likes.post_id == models.Content.c_id) & (models.Likes.user_id == user_id))
+        .filter(models.Content.c_id == post_id)
+        .first()
+    )
+    if row is None:
+        return None
+    return row.like_id is not None, row.created_at
+
+def _buffer_like(like: LikeInput, db: Session, current_user):
+    """Write-behind variant of manage_likes: validates, then queues the change without writing."""
+    state = _current_like_state(db, current_user.user_id, like.post_id)
+    if state is None:
+        logger.warning(f"Like action failed: Post {like.post_id} not found")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No post found")
+    liked, liked_at = state
+
+    if like.dir == 1:
+        if liked:
+            logger.warning(f"Like action failed: User {current_user.username} has already liked post {like.post_id}")
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Post already liked")
+
+        like_buffer.record(current_user.user_id, like.post_id, 1)
+        trending.record(like.post_id, LIKE)
+        # The viewer sees their like at once; the post's count changes when the buffer is flushed
+        cache.invalidate(f"viewer:{current_user.user_id}")
+        io_executor.submit(notify_post_owner_background, like.post_id, current_user.user_id, current_user.username)
+        logger.info(f"Like buffered: User {current_user.username} liked post {like.post_id}")
+        return {"message": "Post liked successfully"}
+
+    if not liked:
+        logger.warning(f"Unlike action failed: No like found for user {current_user.username} on post {like.post_id}")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No like found")
+
+    like_buffer.record(current_user.user_id, like.post_id, 0)
+    # A like still in the buffer was scored moments ago, so now is close enough
+    trending.retract(like.post_id, LIKE, at=timestamp_of(liked_at) if liked_at is not None else None)
+    cache.invalidate(f"viewer:{current_user.user_id}")
+    notification_digest.retract_like(like.post_id, current_user.user_id)
+    logger.info(f"Unlike buffered: User {current_user.username} unliked post {like.post_id}")
+    return {"message": "Post unliked successfully"}
+
 @router.post("/likes", status_code=status.HTTP_201_CREATED, summary="Like or unlike a post")
 def manage_likes(
-    background_tasks: BackgroundTasks,
     like: LikeInput, 
     db: Session = Depends(get_db), 
     current_user: str = Depends(get_current_user),
 ):
     """
     Likes or unlikes a post based on the direction (1 for like, 0 for unlike).
+    The like row and the post's like counter change together and idempotently,
+    so concurrent double-taps cannot create duplicate likes.
+    With LIKES_WRITE_BEHIND enabled the change is buffered and written in batches.
     After liking, it sends an email notification to the post owner.
     """
-    start_time = time.time()
     action = "like" if like.dir == 1 else "unlike"
     logger.info(f"{action.capitalize()} request from user {current_user.username} for post {like.post_id}")
 
     try:
-        # Check if the post exists
-        post = db.query(models.Content).filter(models.Content.c_id == like.post_id).first()
-        if not post:
-            logger.warning(f"Like action failed: Post {like.post_id} not found")
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No post found")
-
-        # Check if the user has already liked the post
-        found_like = db.query(models.Likes).filter(
-            models.Likes.user_id == current_user.user_id,
-            models.Likes.post_id == like.post_id
-        ).first()
+        if WRITE_BEHIND_ENABLED:
+            return _buffer_like(like, db, current_user)
 
         if like.dir == 1:  # Like the post
-            if found_like:
+            # Insert only if the post exists; the unique (user_id, post_id) index absorbs duplicates
+            insert_like = (
+                dialect_insert(db, models.Likes)
+                .from_select(
+                    ["user_id", "post_id"],
+                    select(literal(current_user.user_id), models.Content.c_id).where(models.Content.c_id == like.post_id)
+                )
+                .on_conflict_do_nothing(index_elements=["user_id", "post_id"])
+                .returning(models.Likes.post_id, models.Likes.created_at)
+            )
+            changed = _apply_like_change(db, insert_like, like.post_id, 1)
+
+            if changed is None:
+                db.rollback()
+                if not _post_exists(db, like.post_id):
+                    logger.warning(f"Like action failed: Post {like.post_id} not found")
+                    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No post found")
                 logger.warning(f"Like action failed: User {current_user.username} has already liked post {like.post_id}")
                 raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Post already liked")
 
-            # Add the like to the post
-            new_like = models.Likes(user_id=current_user.user_id, post_id=like.post_id)
-            db.add(new_like)
+            total_likes, liked_at = changed
+            invalidate_after_commit(db, f"post:{like.post_id}", f"viewer:{current_user.user_id}")
             db.commit()
             logger.info(f"Like created: User {current_user.username} liked post {like.post_id}")
-
-            # Get total likes for the post
-            total_likes = db.query(models.Likes).filter(models.Likes.post_id == like.post_id).count()
+            # Scored at its stored time, which is what an unlike takes back
+            trending.record(like.post_id, LIKE, at=timestamp_of(liked_at))
             logger.info(f"Post {like.post_id} now has {total_likes} likes")
 
-            # Schedule notification
-            username = current_user.username
-            background_tasks.add_task(notify_post_owner_background, like.post_id, db, username)
-            logger.info(f"Background notification task scheduled for post owner about like from {username}")
+            # Notify the owner unless the background executor is shedding load
+            if io_executor.submit(notify_post_owner_background, like.post_id, current_user.user_id, current_user.username):
+                logger.info(f"Notification task queued for post owner about like from {current_user.username}")
 
-            execution_time = time.time() - start_time
-            logger.info(f"Like operation completed in {round(execution_time * 1000, 2)} ms")
-            
             return {"message": "Post liked successfully"}
 
         else:  # Unlike the post
-            if not found_like:
+            delete_like = (
+                delete(models.Likes)
+                .where(
+                    models.Likes.user_id == current_user.user_id,
+                    models.Likes.post_id == like.post_id
+                )
+                .returning(models.Likes.post_id, models.Likes.created_at)
+            )
+            changed = _apply_like_change(db, delete_like, like.post_id, -1)
+
+            if changed is None:
+                db.rollback()
+                if not _post_exists(db, like.post_id):
+                    logger.warning(f"Unlike action failed: Post {like.post_id} not found")
+                    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No post found")
                 logger.warning(f"Unlike action failed: No like found for user {current_user.username} on post {like.post_id}")
                 raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No like found")
 
-            db.delete(found_like)
+            total_likes, liked_at = changed
+            invalidate_after_commit(db, f"post:{like.post_id}", f"viewer:{current_user.user_id}")
             db.commit()
             logger.info(f"Like removed: User {current_user.username} unliked post {like.post_id}")
-
-            # Get updated total likes
-            total_likes = db.query(models.Likes).filter(models.Likes.post_id == like.post_id).count()
+            trending.retract(like.post_id, LIKE, at=timestamp_of(liked_at))
+            notification_digest.retract_like(like.post_id, current_user.user_id)
             logger.info(f"Post {like.post_id} now has {total_likes} likes")
 
-            execution_time = time.time() - start_time
-            logger.info(f"Unlike operation completed in {round(execution_time * 1000, 2)} ms")
-            
             return {"message": "Post unliked successfully"}
 
     except HTTPException as he:
         # Log the HTTP exception but re-raise it
-        execution_time = time.time() - start_time
-        logger.warning(f"HTTP Exception in {action} operation after {round(execution_time * 1000, 2)} ms: {str(he.detail)}")
+        logger.warning(f"HTTP Exception in {action} operation: {str(he.detail)}")
         raise he
     except Exception as e:
         # Log unexpected errors
-        execution_time = time.time() - start_time
-        logger.error(f"Unexpected error in {action} operation after {round(execution_time * 1000, 2)} ms: {str(e)}")
+        db.rollback()
+        logger.error(f"Unexpected error in {action} operation: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error occurred while processing {action} request: {str(e)}"
-        )
\ No newline at end of file
+        )
@@ -0,0 +1,108 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session, aliased
+from typing import Optional
+from core.database import get_db
+from core.models import Notification, Registration
+from oauth2 import get_current_user
+from schemas.notifications import NotificationPage, MarkReadRequest, NotificationPreferences
+from tasks.notifications import mark_read
+from utils.pagination import encode_cursor, decode_cursor
+from Logging.logging import logger
+
+router = APIRouter(
+    tags=["Notifications"]
+)
+
+# Page size limits for the notification inbox
+NOTIFICATION_PAGE_SIZE = 30
+MAX_NOTIFICATION_PAGE_SIZE = 100
+
+@router.get("/notifications", response_model=NotificationPage, status_code=status.HTTP_200_OK, summary="The current user's notifications, newest first")
+def get_notifications(
+    limit: int = Query(NOTIFICATION_PAGE_SIZE, ge=1, le=MAX_NOTIFICATION_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: Session = Depends(get_db),
+    current_user: Registration = Depends(get_current_user)
+):
+    """
+    One page of the inbox with the actor of each notification joined in,
+    and the unread count read from the user's counter column.
+    """
+    logger.info(f"Notifications request from user {current_user.user_id}")
+    try:
+        actor = aliased(Registration)
+        query = (
+            db.query(Notification, actor.username)
+            .outerjoin(actor, actor.user_id == Notification.actor_id)
+            .filter(Notification.user_id == current_user.user_id)
+        )
+        if cursor:
+            query = query.filter(tuple_(Notification.created_at, Notification.id) < tuple_(*decode_cursor(cursor)))
+        rows = query.order_by(Notification.created_at.desc(), Notification.id.desc()).limit(limit + 1).all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][0].created_at, rows[-1][0].id)
+
+        return {
+            "notifications": [
+                {
+                    "id": notification.id,
+                    "kind": notification.kind,
+                    "actor_username": actor_username,
+                    "post_id": notification.post_id,
+                    "text": notification.text,
+                    "is_read": notification.is_read,
+                    "created_at": notification.created_at.strftime("%Y-%m-%d %H:%M:%S")
+                } for notification, actor_username in rows
+            ],
+            "unread_count": current_user.unread_notifications,
+            "next_cursor": next_cursor
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error in get_notifications: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error occurred while fetching notifications")
+
+@router.get("/notifications/unread_count", status_code=status.HTTP_200_OK, summary="Number of unread notifications")
+def get_unread_count(current_user: Registration = Depends(get_current_user)):
+    """Reads the counter maintained with every notification, without counting rows."""
+    return {"unread_count": current_user.unread_notifications}
+
+@router.post("/notifications/read", status_code=status.HTTP_200_OK, summary="Mark notifications as read")
+def read_notifications(
+    request: MarkReadRequest,
+    db: Session = Depends(get_db),
+    current_user: Registration = Depends(get_current_user)
+):
+    """Marks the given notification ids, or all of them when no ids are sent, as read."""
+    try:
+        changed = mark_read(db, current_user.user_id, request.ids)
+        db.commit()
+        db.refresh(current_user)
+        logger.info(f"User {current_user.user_id} marked {changed} notifications as read")
+        return {"marked_read": changed, "unread_count": current_user.unread_notifications}
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Unexpected error in read_notifications: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error occurred while marking notifications as read")
+
+@router.put("/notifications/preferences", response_model=NotificationPreferences, status_code=status.HTTP_200_OK, summary="Choose whether notifications are also emailed")
+def update_notification_preferences(
+    preferences: NotificationPreferences,
+    db: Session = Depends(get_db),
+    current_user: Registration = Depends(get_current_user)
+):
+    """With email_notifications off, notifications only appear in the in-app inbox."""
+    try:
+        current_user.email_notifications = preferences.email_notifications
+        db.commit()
+        logger.info(f"User {current_user.user_id} set email notifications to {preferences.email_notifications}")
+        return {"email_notifications": preferences.email_notifications}
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Unexpected error in update_notification_preferences: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error occurred while updating notification preferences")
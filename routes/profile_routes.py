@@ -1,12 +1,19 @@
-from fastapi import FastAPI, HTTPException, Depends, APIRouter
+from fastapi import FastAPI, HTTPException, Depends, APIRouter, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Session
+from typing import Optional
 from fastapi.security import OAuth2PasswordRequestForm
-from core.models import Registration, Content, Likes, Comment, Follows
+from core.models import Registration, Content, Follows
 from schemas.profile import UserProfileResponse, ContentDetailResponse
-from core.database import get_db
+from core.cache import cache, cache_key
+from core.conditional import make_etag, not_modified
+from core.database import get_db, background_session
 from utils.hashing import verify
+from utils.pagination import encode_cursor, decode_cursor
+from tasks.comment_preview import get_comment_previews
 from Logging.logging import logger
-import time
+import json
 
 router = APIRouter(
     tags=['Profile']
@@ -21,7 +28,6 @@ def profile_login(
     Authenticate the user using username and password, then return the user's profile, content,
     followers count, and following count.
     """
-    start_time = time.time()
     logger.info(f"Profile login attempt for user: {user_credential.username}")
 
     try:
@@ -52,48 +58,135 @@ def profile_login(
             "content": []
         }
 
-        # Fetch the user's content
-        content_list = db.query(Content).filter(Content.username == user.username).all()
+        # Fetch the user's content newest first, like and comment counts read from the post rows
+        content_list = (
+            db.query(
+                Content.c_id, Content.username, Content.title, Content.caption,
+                Content.created_at, Content.likes_count, Content.comments_count
+            )
+            .filter(Content.user_id == user.user_id)
+            .order_by(Content.created_at.desc(), Content.c_id)
+            .all()
+        )
         logger.info(f"Retrieved {len(content_list)} content items for user {user_credential.username}")
 
-        for c in content_list:
-            likes_count = db.query(Likes).filter(Likes.post_id == c.c_id).count()
-            comments = db.query(Comment).filter(Comment.post_id == c.c_id).all()
-            comment_texts = [comment.user_comment for comment in comments]
+        # First comments of every post in one query; the full lists are paged through /posts/{id}/comments
+        previews = get_comment_previews(db, [c.c_id for c in content_list])
 
+        for c in content_list:
             content_details = ContentDetailResponse(
                 username=c.username,
                 title=c.title,
                 caption=c.caption,
                 created_at=c.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                comments=comment_texts,
-                total_likes=likes_count
+                comments=previews.get(c.c_id, []),
+                comments_count=c.comments_count or 0,
+                total_likes=c.likes_count or 0
             )
             user_profile["content"].append(content_details)
 
-        execution_time = time.time() - start_time
-        logger.info(f"Profile login completed for user {user_credential.username} in {round(execution_time * 1000, 2)} ms")
-        
         return user_profile
 
     except HTTPException as he:
-        execution_time = time.time() - start_time
-        logger.warning(f"HTTP Exception in profile login after {round(execution_time * 1000, 2)} ms: {str(he.detail)}")
+        logger.warning(f"HTTP Exception in profile login: {str(he.detail)}")
         raise he
     except Exception as e:
-        execution_time = time.time() - start_time
-        logger.error(f"Unexpected error in profile login after {round(execution_time * 1000, 2)} ms: {str(e)}")
+        logger.error(f"Unexpected error in profile login: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error occurred during profile login: {str(e)}")
 
+# Page size limits for followers / following listings
+FOLLOW_PAGE_SIZE = 50
+MAX_FOLLOW_PAGE_SIZE = 200
+# Rows fetched per round trip when streaming a full export
+FOLLOW_EXPORT_BATCH_SIZE = 1000
+
+def _follow_rows(db: Session, user_id: int, direction: str, limit: int, after=None):
+    """
+    Fetch one page of a user's followers or following list with a single join,
+    newest first, seeking past the (followed_at, id) key given in `after`.
+    """
+    if direction == "followers":
+        match_column, other_column = Follows.following_id, Follows.follower_id
+    else:
+        match_column, other_column = Follows.follower_id, Follows.following_id
+
+    query = (
+        db.query(Registration.username, Follows.followed_at, Follows.id)
+        .join(Follows, Registration.user_id == other_column)
+        .filter(match_column == user_id)
+    )
+    if after is not None:
+        query = query.filter(tuple_(Follows.followed_at, Follows.id) < tuple_(*after))
+
+    return query.order_by(Follows.followed_at.desc(), Follows.id.desc()).limit(limit).all()
+
+def _follow_page(db: Session, user_id: int, direction: str, limit: int, cursor: Optional[str]):
+    """Returns the serialized rows of one page and the cursor of the next page, if any."""
+    after = decode_cursor(cursor) if cursor else None
+    rows = _follow_rows(db, user_id, direction, limit + 1, after)
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].followed_at, rows[-1].id)
+
+    details = [
+        {
+            "username": row.username,
+            "followed_since": row.followed_at.strftime("%Y-%m-%d %H:%M:%S")
+        } for row in rows
+    ]
+    return details, next_cursor
+
+def _cached_follow_page(db: Session, user_id: int, direction: str, limit: int, cursor: Optional[str]):
+    """Like _follow_page, with the first page, which nearly every visitor asks for, served from the cache."""
+    if cursor:
+        return _follow_page(db, user_id, direction, limit, cursor)
+    details, next_cursor = cache.get_or_compute(
+        cache_key(direction, user_id, limit),
+        lambda: _follow_page(db, user_id, direction, limit, None),
+        tags=[f"{direction}:{user_id}"]
+    )
+    return details, next_cursor
+
+def _stream_follows(user_id: int, direction: str):
+    """
+    Yield the complete list as NDJSON, one line per user, in keyset batches.
+    Each batch is read with its own short-lived session, because the request
+    session is closed before streaming starts and a connection must not stay
+    checked out while a slow client reads the stream.
+    """
+    after = None
+    while True:
+        with background_session("follow_export") as db:
+            rows = _follow_rows(db, user_id, direction, FOLLOW_EXPORT_BATCH_SIZE, after)
+        if not rows:
+            break
+        yield "".join(
+            json.dumps({
+                "username": row.username,
+                "followed_since": row.followed_at.strftime("%Y-%m-%d %H:%M:%S")
+            }) + "\n" for row in rows
+        )
+        if len(rows) < FOLLOW_EXPORT_BATCH_SIZE:
+            break
+        after = (rows[-1].followed_at, rows[-1].id)
+
 @router.get("/followers/{username}", summary="Get the users who follow a specific user")
 def get_followers(
+    request: Request,
+    response: Response,
     username: str,
+    limit: int = Query(FOLLOW_PAGE_SIZE, ge=1, le=MAX_FOLLOW_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
     db: Session = Depends(get_db)
 ):
     """
-    Get the list of users who follow the specified user, with details including the date they followed.
+    Get the users who follow the specified user, newest first, with the date they followed.
+    Pages are fetched with the `next_cursor` of the previous page; `format=ndjson` streams the full list.
+    JSON pages answer 304 to a current If-None-Match.
     """
-    start_time = time.time()
     logger.info(f"Fetching followers for user: {username}")
 
     try:
@@ -104,47 +197,47 @@ def get_followers(
             logger.warning(f"Get followers failed: User not found - {username}")
             raise HTTPException(status_code=404, detail="User not found")
 
-        # Fetch followers
-        followers = db.query(Follows).filter(Follows.following_id == user.user_id).all()
-        logger.info(f"Found {len(followers)} followers for user {username}")
+        if format == "ndjson":
+            logger.info(f"Streaming followers export for user {username}")
+            return StreamingResponse(_stream_follows(user.user_id, "followers"), media_type="application/x-ndjson")
 
-        if not followers:
-            logger.info(f"No followers found for user {username}")
-            raise HTTPException(status_code=404, detail="No followers found")
+        unchanged = not_modified(request, response, make_etag([f"followers:{user.user_id}"], user.user_id, limit, cursor))
+        if unchanged:
+            logger.info(f"Followers of {username} not modified")
+            return unchanged
 
-        # Prepare the response with follower details
-        followers_details = []
-        for follower in followers:
-            follower_user = db.query(Registration).filter(Registration.user_id == follower.follower_id).first()
-            if follower_user:
-                followers_details.append({
-                    "username": follower_user.username,
-                    "followed_since": follower.followed_at.strftime("%Y-%m-%d %H:%M:%S")
-                })
+        # Fetch one page of followers joined with their usernames
+        followers_details, next_cursor = _cached_follow_page(db, user.user_id, "followers", limit, cursor)
+        logger.info(f"Found {len(followers_details)} followers for user {username}")
 
-        execution_time = time.time() - start_time
-        logger.info(f"Get followers completed for user {username} in {round(execution_time * 1000, 2)} ms")
+        if not followers_details and not cursor:
+            logger.info(f"No followers found for user {username}")
+            raise HTTPException(status_code=404, detail="No followers found")
 
-        return {"followers": followers_details}
+        return {"followers": followers_details, "next_cursor": next_cursor}
 
     except HTTPException as he:
-        execution_time = time.time() - start_time
-        logger.warning(f"HTTP Exception in get followers after {round(execution_time * 1000, 2)} ms: {str(he.detail)}")
+        logger.warning(f"HTTP Exception in get followers: {str(he.detail)}")
         raise he
     except Exception as e:
-        execution_time = time.time() - start_time
-        logger.error(f"Unexpected error in get followers after {round(execution_time * 1000, 2)} ms: {str(e)}")
+        logger.error(f"Unexpected error in get followers: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error occurred while fetching followers: {str(e)}")
 
 @router.get("/following/{username}", summary="Get the users that a specific user is following")
 def get_following(
+    request: Request,
+    response: Response,
     username: str,
+    limit: int = Query(FOLLOW_PAGE_SIZE, ge=1, le=MAX_FOLLOW_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
     db: Session = Depends(get_db)
 ):
     """
-    Get the list of users that the specified user is following, with details including the date they started following them.
+    Get the users that the specified user is following, newest first, with the date they started following them.
+    Pages are fetched with the `next_cursor` of the previous page; `format=ndjson` streams the full list.
+    JSON pages answer 304 to a current If-None-Match.
     """
-    start_time = time.time()
     logger.info(f"Fetching following list for user: {username}")
 
     try:
@@ -155,34 +248,28 @@ def get_following(
             logger.warning(f"Get following failed: User not found - {username}")
             raise HTTPException(status_code=404, detail="User not found")
 
-        # Fetch following
-        following = db.query(Follows).filter(Follows.follower_id == user.user_id).all()
-        logger.info(f"Found {len(following)} users followed by {username}")
+        if format == "ndjson":
+            logger.info(f"Streaming following export for user {username}")
+            return StreamingResponse(_stream_follows(user.user_id, "following"), media_type="application/x-ndjson")
 
-        if not following:
-            logger.info(f"User {username} is not following anyone")
-            raise HTTPException(status_code=404, detail="Not following anyone")
+        unchanged = not_modified(request, response, make_etag([f"following:{user.user_id}"], user.user_id, limit, cursor))
+        if unchanged:
+            logger.info(f"Following of {username} not modified")
+            return unchanged
 
-        # Prepare the response with following details
-        following_details = []
-        for follow in following:
-            followed_user = db.query(Registration).filter(Registration.user_id == follow.following_id).first()
-            if followed_user:
-                following_details.append({
-                    "username": followed_user.username,
-                    "followed_since": follow.followed_at.strftime("%Y-%m-%d %H:%M:%S")
-                })
+        # Fetch one page of followed users joined with their usernames
+        following_details, next_cursor = _cached_follow_page(db, user.user_id, "following", limit, cursor)
+        logger.info(f"Found {len(following_details)} users followed by {username}")
 
-        execution_time = time.time() - start_time
-        logger.info(f"Get following completed for user {username} in {round(execution_time * 1000, 2)} ms")
+        if not following_details and not cursor:
+            logger.info(f"User {username} is not following anyone")
+            raise HTTPException(status_code=404, detail="Not following anyone")
 
-        return {"following": following_details}
+        return {"following": following_details, "next_cursor": next_cursor}
 
     except HTTPException as he:
-        execution_time = time.time() - start_time
-        logger.warning(f"HTTP Exception in get following after {round(execution_time * 1000, 2)} ms: {str(he.detail)}")
+        logger.warning(f"HTTP Exception in get following: {str(he.detail)}")
         raise he
     except Exception as e:
-        execution_time = time.time() - start_time
-        logger.error(f"Unexpected error in get following after {round(execution_time * 1000, 2)} ms: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error occurred while fetching following list: {str(e)}")
\ No newline at end of file
+        logger.error(f"Unexpected error in get following: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error occurred while fetching following list: {str(e)}")
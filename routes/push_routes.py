@@ -0,0 +1,67 @@
+import asyncio
+import json
+import os
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from core.database import SessionLocal
+from core.pubsub import hub
+from oauth2 import get_current_user, oauth2_scheme
+from Logging.logging import logger
+
+router = APIRouter(
+    tags=["Push"]
+)
+
+# Comment line sent on idle streams so proxies do not time them out
+PUSH_HEARTBEAT_SECONDS = int(os.getenv("PUSH_HEARTBEAT_SECONDS", "25"))
+
+def _stream_user_id(token: str = Depends(oauth2_scheme)) -> int:
+    """
+    Authenticates the stream with a short-lived session. The regular
+    get_current_user dependency would keep a pooled database connection
+    checked out for as long as the stream stays open.
+    """
+    db = SessionLocal()
+    try:
+        return get_current_user(db=db, token=token).user_id
+    finally:
+        db.close()
+
+def _format_event(message: dict) -> str:
+    return f"event: {message.get('type', 'message')}\ndata: {json.dumps(message, separators=(',', ':'))}\n\n"
+
+async def _event_stream(user_id: int):
+    """Runs until the client disconnects (the response cancels it) or the hub shuts down."""
+    subscription = hub.subscribe(user_id)
+    logger.info(f"Push stream opened for user {user_id}")
+    try:
+        yield "retry: 5000\n\n"
+        while not subscription.closed:
+            try:
+                await asyncio.wait_for(subscription.wakeup.wait(), PUSH_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+
+            if subscription.dropped:
+                subscription.dropped = False
+                yield _format_event({"type": "resync"})
+            for message in subscription.drain():
+                yield _format_event(message)
+    finally:
+        hub.unsubscribe(subscription)
+        logger.info(f"Push stream closed for user {user_id}")
+
+@router.get("/events", summary="Server-Sent Events stream of the current user's activity")
+async def event_stream(user_id: int = Depends(_stream_user_id)):
+    """
+    Pushes new followers, likes, comments and new posts from followed accounts
+    as they happen, so clients no longer need to poll the content and profile
+    endpoints. A `resync` event means events were dropped because the client
+    fell behind, and the client should refetch.
+    """
+    return StreamingResponse(
+        _event_stream(user_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
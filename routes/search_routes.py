@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Query, HTTPException, Depends, status
 from sqlalchemy.orm import Session
+from datetime import datetime
+from core.cache import cache, cache_key
 from core.database import get_db
 from core.models import Registration
 from oauth2 import get_current_user  
 from core.models import Content
 from Logging.logging import logger
-import time
 
 router = APIRouter(
     tags=['Search']
@@ -22,7 +23,6 @@ def search_users(
     Search users by username with pagination, returning similar usernames in ascending order.
     Default: Page 1, 6 users per page.
     """
-    start_time = time.time()
     logger.info(f"User search initiated by {current_user.username} for pattern: '{username}', page: {page}")
 
     try:
@@ -49,9 +49,6 @@ def search_users(
         paginated_users = similar_users_sorted[offset: offset + PAGE_SIZE]
         logger.info(f"Returning {len(paginated_users)} users for page {page}")
 
-        execution_time = time.time() - start_time
-        logger.info(f"User search completed in {round(execution_time * 1000, 2)} ms")
-
         return {
             "total_users": total_users,
             "total_pages": total_pages,
@@ -60,12 +57,10 @@ def search_users(
         }
 
     except HTTPException as he:
-        execution_time = time.time() - start_time
-        logger.warning(f"HTTP Exception in user search after {round(execution_time * 1000, 2)} ms: {str(he.detail)}")
+        logger.warning(f"HTTP Exception in user search: {str(he.detail)}")
         raise he
     except Exception as e:
-        execution_time = time.time() - start_time
-        logger.error(f"Unexpected error in user search after {round(execution_time * 1000, 2)} ms: {str(e)}")
+        logger.error(f"Unexpected error in user search: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error occurred during user search: {str(e)}")
 
 @router.get("/search_by_title", status_code=status.HTTP_200_OK)
@@ -79,61 +74,70 @@ def search_content_by_title(
     Search content by title or content ID with pagination, returning similar titles in ascending order.
     Default: Page 1, 6 contents per page.
     """
-    start_time = time.time()
     search_type = "ID" if title.isdigit() else "title"
     logger.info(f"Content search initiated by {current_user.username} for {search_type}: '{title}', page: {page}")
 
     try:
-        PAGE_SIZE = 6
-
-        # Determine search type and execute query
-        if title.isdigit():
-            similar_content = db.query(Content).filter(Content.c_id == int(title)).all()
-            logger.info(f"Searching for content with ID: {title}")
-        else:
-            similar_content = db.query(Content).filter(Content.title.ilike(f"%{title}%")).all()
-            logger.info(f"Searching for content with title pattern: '{title}'")
-
-        logger.info(f"Found {len(similar_content)} matching content items")
-
-        # Sort content by title
-        similar_content_sorted = sorted(similar_content, key=lambda x: x.title.lower())
-
-        # Pagination logic
-        total_content = len(similar_content_sorted)
-        total_pages = (total_content + PAGE_SIZE - 1) // PAGE_SIZE
-
-        # Validate page number
-        if page > total_pages and total_content > 0:
-            logger.warning(f"Invalid page request: {page} exceeds total pages {total_pages}")
-            raise HTTPException(status_code=400, detail="Invalid choice of page")
-
-        # Get paginated content
-        offset = (page - 1) * PAGE_SIZE
-        paginated_content = similar_content_sorted[offset: offset + PAGE_SIZE]
-        logger.info(f"Returning {len(paginated_content)} content items for page {page}")
-
-        execution_time = time.time() - start_time
-        logger.info(f"Content search completed in {round(execution_time * 1000, 2)} ms")
-
+        # Popular terms are served from the cache; a new or deleted post invalidates every page
+        results = cache.get_or_compute(
+            cache_key("search_by_title", title.lower(), page),
+            lambda: _title_search_page(db, title, page),
+            tags=["content"]
+        )
         return {
-            "total_content": total_content,
-            "total_pages": total_pages,
-            "current_page": page,
+            **results,
             "content": [
-                {
-                    "title": c.title,
-                    "username": c.username,
-                    "created_at": c.created_at,
-                } for c in paginated_content
+                {**item, "created_at": datetime.fromisoformat(item["created_at"])} for item in results["content"]
             ],
         }
 
     except HTTPException as he:
-        execution_time = time.time() - start_time
-        logger.warning(f"HTTP Exception in content search after {round(execution_time * 1000, 2)} ms: {str(he.detail)}")
+        logger.warning(f"HTTP Exception in content search: {str(he.detail)}")
         raise he
     except Exception as e:
-        execution_time = time.time() - start_time
-        logger.error(f"Unexpected error in content search after {round(execution_time * 1000, 2)} ms: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error occurred during content search: {str(e)}")
\ No newline at end of file
+        logger.error(f"Unexpected error in content search: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error occurred during content search: {str(e)}")
+
+def _title_search_page(db: Session, title: str, page: int):
+    """One page of the title / ID search, as cacheable JSON data."""
+    PAGE_SIZE = 6
+
+    # Determine search type and execute query
+    if title.isdigit():
+        similar_content = db.query(Content).filter(Content.c_id == int(title)).all()
+        logger.info(f"Searching for content with ID: {title}")
+    else:
+        similar_content = db.query(Content).filter(Content.title.ilike(f"%{title}%")).all()
+        logger.info(f"Searching for content with title pattern: '{title}'")
+
+    logger.info(f"Found {len(similar_content)} matching content items")
+
+    # Sort content by title
+    similar_content_sorted = sorted(similar_content, key=lambda x: x.title.lower())
+
+    # Pagination logic
+    total_content = len(similar_content_sorted)
+    total_pages = (total_content + PAGE_SIZE - 1) // PAGE_SIZE
+
+    # Validate page number
+    if page > total_pages and total_content > 0:
+        logger.warning(f"Invalid page request: {page} exceeds total pages {total_pages}")
+        raise HTTPException(status_code=400, detail="Invalid choice of page")
+
+    # Get paginated content
+    offset = (page - 1) * PAGE_SIZE
+    paginated_content = similar_content_sorted[offset: offset + PAGE_SIZE]
+    logger.info(f"Returning {len(paginated_content)} content items for page {page}")
+
+    return {
+        "total_content": total_content,
+        "total_pages": total_pages,
+        "current_page": page,
+        "content": [
+            {
+                "title": c.title,
+                "username": c.username,
+                "created_at": c.created_at.isoformat(),
+            } for c in paginated_content
+        ],
+    }
@@ -1,15 +1,18 @@
 #User_routes.py
 
 # Standard imports
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import List, Optional
 
 # FastAPI specific imports
-from fastapi import APIRouter, HTTPException, status, Depends, BackgroundTasks,Query
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request, Response
 
 # Database and Models
 from sqlalchemy.orm import Session
+from core.cache import cache, cache_key, invalidate_after_commit
+from core.conditional import make_etag, not_modified
 from core.database import get_db
+from core.executor import io_executor, cpu_executor, RETRY_AFTER_SECONDS
 from core.models import Registration
 from core import models
 
@@ -48,7 +51,7 @@ OTP_EXPIRATION_MINUTES = 10
 MINIMUM_AGE_YEARS = 14
 
 @router.post("/register/send_otp")
-async def send_otp(user: RegisterUser, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+async def send_otp(user: RegisterUser, db: Session = Depends(get_db)):
 
     existing_user = db.query(Registration).filter(Registration.email == user.email).first()
     otp = generate_otp()
@@ -67,14 +70,23 @@ async def send_otp(user: RegisterUser, background_tasks: BackgroundTasks, db: Se
             otp=otp,
             otp_expiry=expiry_time,
             retry_attempts=1,
-            created_at=datetime.utcnow(),
+            created_at=datetime.now(timezone.utc),
             is_active=False
         )
         db.add(temp_user)
     
-    background_tasks.add_task(send_otp_background, user.email, otp)
-
+    # Store the OTP before emailing it, so a failed commit never sends a code that cannot be verified
     db.commit()
+
+    # The OTP email is critical: if even the reserved capacity is taken, ask the client to retry.
+    # The stored OTP is simply replaced by the retry
+    if not io_executor.submit(send_otp_background, user.email, otp, critical=True):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please retry shortly",
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+        )
+
     return {"message": f"OTP sent successfully to {user.email}. Please verify your OTP."}
 # Step 2: Verify OTP and activate the user
 @router.post("/register/verify_otp")
@@ -96,7 +108,7 @@ def verify_otp(data: VerifyOTP, db: Session = Depends(get_db)):
 
 #registration of user
 @router.post("/register/complete_registration", response_model=RegistrationResponse)
-async def complete_registration(user_details: RegisterUserDetails, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+async def complete_registration(user_details: RegisterUserDetails, db: Session = Depends(get_db)):
     user = db.query(Registration).filter(Registration.email == user_details.email).first()
     if not user:
         raise HTTPException(status_code=400, detail="User does not exist. Please verify your OTP first.")
@@ -104,15 +116,6 @@ async def complete_registration(user_details: RegisterUserDetails, background_ta
     if user.is_active:
         raise HTTPException(status_code=208, detail="User is already registered.")
     
-    # Add background tasks for age verification
-    background_tasks.add_task(age_difference, user_details.dob)
-
-    # Add background task for password strength verification
-    background_tasks.add_task(check_password_strength, user_details.password)
-
-    # Add background task for phone number validation
-    background_tasks.add_task(validate_phone_number, user_details.phone_number)
-
     # Age verification (synchronous, you can modify this to run in the background if necessary)
     years, months, days, hours, minutes = age_difference(user_details.dob)
     if years < MINIMUM_AGE_YEARS:
@@ -130,8 +133,8 @@ async def complete_registration(user_details: RegisterUserDetails, background_ta
     if not validate_phone_number(user_details.phone_number):
         raise HTTPException(status_code=406, detail="Invalid phone number. It must be exactly 10 digits.")
 
-    # Store hashed password
-    hashed_password = hashing(user_details.password)
+    # Store hashed password, hashed on the CPU executor so bcrypt does not block the event loop
+    hashed_password = await cpu_executor.run(hashing, user_details.password)
     user.username = user_details.username
     user.password = hashed_password
     user.phone_number = user_details.phone_number
@@ -186,8 +189,19 @@ def get_all_users(page: int = Query(1, alias="page", ge=1), db: Session = Depend
 
 # Fetch a specific user by ID with followers and following counts
 @router.get("/get_user/{user_id}", response_model=UserProfileResponse)
-def get_user_by_id(user_id: int, db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.user_id == user_id).first()
+def get_user_by_id(request: Request, response: Response, user_id: int, db: Session = Depends(get_db)):
+    unchanged = not_modified(request, response, make_etag([f"user:{user_id}"], user_id))
+    if unchanged:
+        return unchanged
+
+    return cache.get_or_compute(
+        cache_key("get_user", user_id),
+        lambda: _user_profile(db, user_id),
+        tags=[f"user:{user_id}"]
+    )
+
+def _user_profile(db: Session, user_id: int):
+    user = db.query(Registration).filter(Registration.user_id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -199,7 +213,8 @@ def get_user_by_id(user_id: int, db: Session = Depends(get_db)):
     user_profile = {
         "username": user.username,
         "followers": followers_count,
-        "following": following_count
+        "following": following_count,
+        "content": []
     }
 
     return user_profile
@@ -207,7 +222,6 @@ def get_user_by_id(user_id: int, db: Session = Depends(get_db)):
 # Update user details
 @router.put("/update_user/{user_id}", response_model=RegistrationResponse)
 async def update_user(
-    background_tasks: BackgroundTasks,
     user_id: int, 
     updated_user: RegisterUser, 
     db: Session = Depends(get_db), 
@@ -231,21 +245,21 @@ async def update_user(
     user.country = updated_user.country if updated_user.country else user.country
 
     if updated_user.password:
-        user.password = hashing(updated_user.password)
+        user.password = await cpu_executor.run(hashing, updated_user.password)
 
+    invalidate_after_commit(db, f"user:{user_id}")
     db.commit()
     db.refresh(user)
 
-    # Add email sending to background tasks
+    # Courtesy email, skipped when the background executor is shedding load
     email_to_use = old_email if updated_user.email else user.email
-    background_tasks.add_task(send_update_email_background, email_to_use, user.username)
+    io_executor.submit(send_update_email_background, email_to_use, user.username)
 
     return user
 
 #Delete the user
 @router.delete("/delete_user/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_user(
-    background_tasks: BackgroundTasks,
     user_id: int, 
     db: Session = Depends(get_db), 
     current_user: str = Depends(get_current_user)
@@ -263,9 +277,10 @@ async def delete_user(
 
     # Delete the user
     db.delete(user)
+    invalidate_after_commit(db, f"user:{user_id}")
     db.commit()
 
-    # Add email sending to background tasks
-    background_tasks.add_task(send_deletion_email_background, user_email, user_username)
+    # Courtesy email, skipped when the background executor is shedding load
+    io_executor.submit(send_deletion_email_background, user_email, user_username)
 
     return {"message": "User deleted successfully"}
\ No newline at end of file
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, status
+from sqlalchemy.orm import Session
+from core.database import get_db
+from core.models import Registration
+from oauth2 import get_current_user
+from schemas.viewer import ViewerStateRequest, ViewerStateResponse
+from tasks.viewer_state import get_viewer_state
+from Logging.logging import logger
+
+router = APIRouter(
+    tags=["Viewer"]
+)
+
+@router.post("/viewer_state", response_model=ViewerStateResponse, status_code=status.HTTP_200_OK, summary="Like and follow status for a batch of posts and users")
+def viewer_state(
+    request: ViewerStateRequest,
+    db: Session = Depends(get_db),
+    current_user: Registration = Depends(get_current_user)
+):
+    """
+    For every post id, whether the current user liked it, and for every user id,
+    whether the current user follows them. Lets a client render a whole feed page
+    with one request instead of probing each item.
+    """
+    logger.info(f"Viewer state request from user {current_user.user_id} for {len(request.post_ids)} posts and {len(request.user_ids)} users")
+    return get_viewer_state(db, current_user.user_id, request.post_ids, request.user_ids)
@@ -1,6 +1,9 @@
 #Comments.py
+from typing import Optional
 from pydantic import BaseModel
 
 class CommentInput(BaseModel):
     post_id: int
     user_comment: str
+    # Set to reply to another comment on the same post
+    parent_id: Optional[int] = None
@@ -28,13 +28,18 @@ class ContentUpdate(BaseModel):
 
 # Detailed response model for content with additional information
 class ContentDetailResponse(BaseModel):
+    c_id: Optional[int] = None  # Post ID, used for viewer state and comments lookups
+    user_id: Optional[int] = None  # Author ID
     username: str
     title: str
     caption: str
     created_at: datetime
     file: Optional[str] = None  # File associated with content, if any
-    comments: List[str] = []  # List of comments on the content
+    comments: List[str] = []  # First comments on the content, oldest first
+    comments_count: int = 0  # Total number of comments
     total_likes: int = 0  # Total number of likes
+    liked_by_viewer: Optional[bool] = None  # Whether the requesting user liked the post
+    following_author: Optional[bool] = None  # Whether the requesting user follows the author
 
     class Config:
         from_attributes = True  # Ensure SQLAlchemy models work with Pydantic using from_attributes
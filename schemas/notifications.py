@@ -0,0 +1,27 @@
+##Notifications.py
+
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+# Upper bound of ids accepted in one mark-as-read request
+MAX_MARK_READ_IDS = 500
+
+class NotificationItem(BaseModel):
+    id: int
+    kind: str  # like / comment / follow / new_post
+    actor_username: Optional[str] = None
+    post_id: Optional[int] = None
+    text: Optional[str] = None
+    is_read: bool
+    created_at: str
+
+class NotificationPage(BaseModel):
+    notifications: List[NotificationItem]
+    unread_count: int
+    next_cursor: Optional[str] = None
+
+class MarkReadRequest(BaseModel):
+    ids: Optional[List[int]] = Field(default=None, max_length=MAX_MARK_READ_IDS)  # None marks everything read
+
+class NotificationPreferences(BaseModel):
+    email_notifications: bool
@@ -7,7 +7,8 @@ class ContentDetailResponse(BaseModel):
     title: str
     caption: str
     created_at: str
-    comments: List[str]
+    comments: List[str]  # First comments, oldest first
+    comments_count: int = 0
     total_likes: int
 
 class UserProfileResponse(BaseModel):
@@ -0,0 +1,15 @@
+##Viewer.py
+
+from pydantic import BaseModel, Field
+from typing import Dict, List
+
+# Upper bound of ids accepted per list in one viewer state request
+MAX_VIEWER_STATE_IDS = 300
+
+class ViewerStateRequest(BaseModel):
+    post_ids: List[int] = Field(default=[], max_length=MAX_VIEWER_STATE_IDS)
+    user_ids: List[int] = Field(default=[], max_length=MAX_VIEWER_STATE_IDS)
+
+class ViewerStateResponse(BaseModel):
+    liked: Dict[int, bool]  # post_id -> whether the viewer liked it
+    following: Dict[int, bool]  # user_id -> whether the viewer follows them
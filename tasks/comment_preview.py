@@ -0,0 +1,41 @@
+import os
+from collections import defaultdict
+from typing import Dict, Iterable, List
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from core.models import Comment
+
+# Comments embedded per post in content listings; the rest is paged through /posts/{id}/comments
+COMMENT_PREVIEW_SIZE = int(os.getenv("COMMENT_PREVIEW_SIZE", "3"))
+
+def get_comment_previews(db: Session, post_ids: Iterable[int], per_post: int = COMMENT_PREVIEW_SIZE) -> Dict[int, List[str]]:
+    """
+    Returns the first `per_post` top-level comment texts of every given post, oldest first,
+    in one query that ranks each post's comments with row_number().
+    """
+    post_ids = set(post_ids)
+    previews = defaultdict(list)
+    if not post_ids or per_post <= 0:
+        return previews
+
+    ranked = (
+        select(
+            Comment.post_id,
+            Comment.user_comment,
+            func.row_number().over(
+                partition_by=Comment.post_id,
+                order_by=(Comment.created_at, Comment.comment_id)
+            ).label("position")
+        )
+        .where(Comment.post_id.in_(post_ids), Comment.parent_id.is_(None))
+        .subquery()
+    )
+    rows = db.execute(
+        select(ranked.c.post_id, ranked.c.user_comment)
+        .where(ranked.c.position <= per_post)
+        .order_by(ranked.c.post_id, ranked.c.position)
+    ).all()
+
+    for post_id, text in rows:
+        previews[post_id].append(text)
+    return previews
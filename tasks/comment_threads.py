@@ -0,0 +1,25 @@
+import os
+from typing import List, Tuple
+
+# Every level of a comment path is the comment id zero-padded to this width, so paths
+# sort depth-first with each level oldest first, and a subtree is one range of paths
+PATH_SEGMENT_WIDTH = 10
+# Replies nest at most this deep, which keeps paths short enough for the index
+MAX_REPLY_DEPTH = int(os.getenv("MAX_REPLY_DEPTH", "16"))
+
+def comment_path(parent_path: str, comment_id: int) -> str:
+    """The path of a comment: its parent's path ("" at the top level) followed by its own id."""
+    return f"{parent_path}{comment_id:0{PATH_SEGMENT_WIDTH}d}"
+
+def ancestor_ids(path: str) -> List[int]:
+    """Ids of every comment on a path, from the top-level comment down to the last one."""
+    return [int(path[i:i + PATH_SEGMENT_WIDTH]) for i in range(0, len(path), PATH_SEGMENT_WIDTH)]
+
+def subtree_bounds(path: str) -> Tuple[str, str]:
+    """
+    Exclusive bounds of the paths of all replies below a comment: they start with
+    its path and sort before the path its next sibling would have. Digits only,
+    so the comparison is the same in every collation.
+    """
+    next_sibling = path[:-PATH_SEGMENT_WIDTH] + f"{int(path[-PATH_SEGMENT_WIDTH:]) + 1:0{PATH_SEGMENT_WIDTH}d}"
+    return path, next_sibling
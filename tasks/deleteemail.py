@@ -1,16 +1,17 @@
-from utils.email_service import send_email
+from utils.email_service import deliver_email
+from Logging.logging import logger
 
 #Send email when user gets deleted
-async def send_deletion_email_background(email: str, username: str):
+def send_deletion_email_background(email: str, username: str):
     deletion_email_context = {
         "username": username,
     }
     try:
-        await send_email(
+        deliver_email(
             email,
             "Account Deleted - Trend Connect",
             "userdelete.html",
             deletion_email_context
         )
     except Exception as e:
-        print(f"Background task - Error sending deletion email: {e}")
\ No newline at end of file
+        logger.error(f"Background task - Error sending deletion email: {e}")
@@ -0,0 +1,242 @@
+import os
+import threading
+from typing import Dict, List, Optional
+from sqlalchemy import insert
+from core.database import SessionLocal, background_session
+from core import models
+from tasks.notifications import LIKE, add_notification_batch
+from utils.mail_transport import get_mail_transport, build_message
+from Logging.logging import logger
+
+# Outbox entry kind delivered by tasks.outbox_worker
+DIGEST_EMAIL = "engagement_digest_email"
+
+# Like and comment events are collected per post for this long before one digest per owner is queued
+DIGEST_WINDOW_SECONDS = int(os.getenv("NOTIFICATION_DIGEST_WINDOW_SECONDS", "300"))
+# Names and comment excerpts quoted per post; the rest are summarised as counts
+DIGEST_MAX_NAMES = 3
+DIGEST_MAX_COMMENTS = 3
+
+
+class _PostActivity:
+    """Likes and comments received by one post during the current window."""
+    __slots__ = ("likers", "commenters", "comment_counts", "latest_comments")
+
+    def __init__(self):
+        self.likers: Dict[int, str] = {}
+        self.commenters: Dict[int, str] = {}
+        self.comment_counts: Dict[int, int] = {}
+        self.latest_comments: List[tuple] = []
+
+    def add_comment(self, user_id: int, username: str, text: str):
+        self.commenters[user_id] = username
+        self.comment_counts[user_id] = self.comment_counts.get(user_id, 0) + 1
+        self.latest_comments.append((user_id, username, text))
+        del self.latest_comments[:-DIGEST_MAX_COMMENTS]
+
+    def merge(self, other: "_PostActivity"):
+        """Adds the events of a later window on top of this one."""
+        self.likers.update(other.likers)
+        self.commenters.update(other.commenters)
+        for user_id, count in other.comment_counts.items():
+            self.comment_counts[user_id] = self.comment_counts.get(user_id, 0) + count
+        self.latest_comments = (self.latest_comments + other.latest_comments)[-DIGEST_MAX_COMMENTS:]
+
+    def summary(self, owner_id: int, title: str) -> Optional[dict]:
+        """What the owner is told about this post, leaving out their own activity."""
+        likers = [name for user_id, name in self.likers.items() if user_id != owner_id]
+        commenters = [name for user_id, name in self.commenters.items() if user_id != owner_id]
+        if not likers and not commenters:
+            return None
+        return {
+            "title": title,
+            "likes": len(likers),
+            "likers": likers[:DIGEST_MAX_NAMES],
+            "comments": sum(count for user_id, count in self.comment_counts.items() if user_id != owner_id),
+            "latest_comments": [[name, text] for user_id, name, text in self.latest_comments if user_id != owner_id],
+        }
+
+    def __bool__(self):
+        return bool(self.likers or self.commenters)
+
+
+class NotificationDigest:
+    """
+    In-process aggregator for like and comment notifications.
+
+    Events are buffered per post and deduplicated per actor (a user who likes,
+    unlikes and likes again within the window counts once). Every
+    `window_seconds` the buffered posts are resolved to their owners in one
+    query and a single digest email per owner who wants email is queued in
+    the notification outbox, so a post liked thousands of times costs its owner one email per
+    window instead of one per like. The same flush writes the window's likes
+    to the owners' in-app inboxes with one counter update per owner, so likes
+    never contend on the owner's row; they show up in the inbox once the
+    window closes. Each API process keeps its own buffer; events still
+    buffered when a process is killed are not notified.
+    """
+
+    def __init__(self, session_factory=SessionLocal, window_seconds: int = DIGEST_WINDOW_SECONDS):
+        self.session_factory = session_factory
+        self.window_seconds = window_seconds
+
+        self._pending: Dict[int, _PostActivity] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # Lifecycle
+
+    def start(self):
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="notification-digest", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the flusher thread and queues digests for everything still buffered."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stopping.wait(self.window_seconds):
+            self.flush()
+
+    # Recording
+
+    def record_like(self, post_id: int, user_id: int, username: str):
+        with self._lock:
+            self._pending.setdefault(post_id, _PostActivity()).likers[user_id] = username
+
+    def retract_like(self, post_id: int, user_id: int):
+        """Drops a like that was undone before its digest went out."""
+        with self._lock:
+            activity = self._pending.get(post_id)
+            if activity is not None:
+                activity.likers.pop(user_id, None)
+
+    def record_comment(self, post_id: int, user_id: int, username: str, text: str):
+        with self._lock:
+            self._pending.setdefault(post_id, _PostActivity()).add_comment(user_id, username, text)
+
+    def __len__(self):
+        return len(self._pending)
+
+    # Flushing
+
+    def flush(self) -> int:
+        """Queues one digest per post owner for the buffered window. Returns the number queued."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            pending = {post_id: activity for post_id, activity in pending.items() if activity}
+            if not pending:
+                return 0
+
+            try:
+                queued = self._queue_digests(pending)
+            except Exception as e:
+                # Put the window back so the next flush retries it
+                with self._lock:
+                    for post_id, activity in pending.items():
+                        newer = self._pending.get(post_id)
+                        if newer is not None:
+                            activity.merge(newer)
+                        self._pending[post_id] = activity
+                logger.error(f"Notification digest flush failed, {len(pending)} posts kept: {str(e)}")
+                return 0
+
+            logger.info(f"Notification digest queued {queued} emails and like notifications for {len(pending)} posts")
+            return queued
+
+    def _queue_digests(self, pending: Dict[int, _PostActivity]) -> int:
+        with background_session("notification_digest", self.session_factory) as db:
+            posts = (
+                db.query(
+                    models.Content.c_id, models.Content.title, models.Content.user_id,
+                    models.Registration.email, models.Registration.email_notifications
+                )
+                .join(models.Registration, models.Registration.user_id == models.Content.user_id)
+                .filter(models.Content.c_id.in_(list(pending)))
+                .order_by(models.Content.c_id)
+                .all()
+            )
+
+            digests: Dict[str, List[dict]] = {}
+            likes: List[dict] = []
+            for post in posts:
+                likes.extend(
+                    {"user_id": post.user_id, "actor_id": liker_id, "kind": LIKE, "post_id": post.c_id}
+                    for liker_id in pending[post.c_id].likers
+                )
+                if not post.email_notifications or not post.email:
+                    continue
+                summary = pending[post.c_id].summary(post.user_id, post.title)
+                if summary is not None:
+                    digests.setdefault(post.email, []).append(summary)
+
+            add_notification_batch(db, likes)
+
+            if digests:
+                db.execute(insert(models.NotificationOutbox.__table__), [
+                    {
+                        "kind": DIGEST_EMAIL,
+                        "payload": {"to_email": email, "posts": summaries},
+                        "status": "pending",
+                        "attempts": 0,
+                    } for email, summaries in digests.items()
+                ])
+            return len(digests)
+
+
+def _count(n: int, noun: str) -> str:
+    return f"{n} {noun}" if n == 1 else f"{n} {noun}s"
+
+
+def _people(names: List[str], total: int) -> str:
+    if total == 1:
+        return names[0]
+    if total <= len(names):
+        return f"{', '.join(names[:-1])} and {names[-1]}"
+    others = total - len(names)
+    return f"{', '.join(names)} and {others} {'other' if others == 1 else 'others'}"
+
+
+def render_digest(posts: List[dict]):
+    """Builds the subject and plain-text body of a digest email."""
+    total_likes = sum(post["likes"] for post in posts)
+    total_comments = sum(post["comments"] for post in posts)
+
+    if len(posts) == 1 and not total_comments:
+        post = posts[0]
+        subject = f"{_people(post['likers'], post['likes'])} liked your post \"{post['title']}\""
+    elif len(posts) == 1 and not total_likes:
+        post = posts[0]
+        subject = f"{_count(post['comments'], 'new comment')} on your post \"{post['title']}\""
+    else:
+        subject = f"Your {'post' if len(posts) == 1 else 'posts'} received {_count(total_likes, 'like')} and {_count(total_comments, 'comment')}"
+
+    lines = ["Hi,", ""]
+    for post in posts:
+        lines.append(f"Title: {post['title']}")
+        if post["likes"]:
+            lines.append(f"  {_people(post['likers'], post['likes'])} liked it")
+        if post["comments"]:
+            lines.append(f"  {_count(post['comments'], 'new comment')}, latest:")
+            for username, text in post["latest_comments"]:
+                lines.append(f"    {username}: {text}")
+        lines.append("")
+    lines.append("Check it out!")
+    return f"Trend Connect Notifications: {subject}", "\n".join(lines)
+
+
+# Outbox handler: deliver one digest email
+def deliver_digest_email(payload: dict):
+    subject, body = render_digest(payload["posts"])
+    get_mail_transport().send(build_message(payload["to_email"], subject, body))
+
+
+notification_digest = NotificationDigest()
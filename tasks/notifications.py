@@ -0,0 +1,103 @@
+from collections import Counter
+from typing import Iterable, List, Optional
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.orm import Session
+from core import models
+from core.pubsub import publish_after_commit
+
+# Notification kinds shown in the in-app inbox
+LIKE = "like"
+COMMENT = "comment"
+FOLLOW = "follow"
+NEW_POST = "new_post"
+
+# Characters of a comment kept in its notification
+NOTIFICATION_TEXT_LENGTH = 200
+
+
+def _push_event(kind: str, actor_id: int, post_id: Optional[int], text: Optional[str] = None) -> dict:
+    return {"type": "notification", "kind": kind, "actor_id": actor_id, "post_id": post_id, "text": text}
+
+
+def _bump_unread(db: Session, user_ids: List[int]):
+    db.execute(
+        update(models.Registration)
+        .where(models.Registration.user_id.in_(user_ids))
+        .values(unread_notifications=models.Registration.unread_notifications + 1)
+    )
+
+
+# Write a notification and bump the recipient's unread counter in the caller's transaction
+def add_notification(db: Session, user_id: int, actor_id: int, kind: str, post_id: Optional[int] = None, text: Optional[str] = None):
+    if user_id == actor_id:
+        return
+    text = text[:NOTIFICATION_TEXT_LENGTH] if text else None
+    db.execute(insert(models.Notification).values(
+        user_id=user_id,
+        actor_id=actor_id,
+        kind=kind,
+        post_id=post_id,
+        text=text
+    ))
+    _bump_unread(db, [user_id])
+    publish_after_commit(db, user_id, _push_event(kind, actor_id, post_id, text))
+
+
+# Fan-out variant: one notification per recipient, written in two statements
+def add_notifications(db: Session, user_ids: List[int], actor_id: int, kind: str, post_id: Optional[int] = None):
+    user_ids = [user_id for user_id in user_ids if user_id != actor_id]
+    if not user_ids:
+        return
+    db.execute(insert(models.Notification), [
+        {"user_id": user_id, "actor_id": actor_id, "kind": kind, "post_id": post_id}
+        for user_id in user_ids
+    ])
+    _bump_unread(db, user_ids)
+    message = _push_event(kind, actor_id, post_id)
+    for user_id in user_ids:
+        publish_after_commit(db, user_id, message)
+
+
+# Batch variant for events collected elsewhere (see tasks.notification_digest): one insert for
+# all rows and one counter update per recipient, however many events it received
+def add_notification_batch(db: Session, notifications: List[dict]):
+    notifications = [row for row in notifications if row["user_id"] != row["actor_id"]]
+    if not notifications:
+        return
+    db.execute(insert(models.Notification), notifications)
+
+    registrations = models.Registration.__table__
+    db.execute(
+        update(registrations)
+        .where(registrations.c.user_id == bindparam("recipient_id"))
+        .values(unread_notifications=registrations.c.unread_notifications + bindparam("received")),
+        [
+            {"recipient_id": user_id, "received": received}
+            for user_id, received in Counter(row["user_id"] for row in notifications).items()
+        ]
+    )
+    for row in notifications:
+        publish_after_commit(db, row["user_id"], _push_event(row["kind"], row["actor_id"], row["post_id"]))
+
+
+def mark_read(db: Session, user_id: int, notification_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Marks the given notifications (or all of them) as read and lowers the
+    unread counter by the number of rows that actually changed, so repeated
+    or concurrent calls cannot drive it below the true count.
+    """
+    query = update(models.Notification).where(
+        models.Notification.user_id == user_id,
+        models.Notification.is_read.is_(False)
+    )
+    if notification_ids is not None:
+        query = query.where(models.Notification.id.in_(list(notification_ids)))
+    changed = db.execute(query.values(is_read=True)).rowcount
+
+    if changed:
+        db.execute(
+            update(models.Registration)
+            .where(models.Registration.user_id == user_id)
+            .values(unread_notifications=models.Registration.unread_notifications - changed)
+        )
+    return changed
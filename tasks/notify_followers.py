@@ -1,47 +1,83 @@
-from fastapi import BackgroundTasks
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-import smtplib
 from core import models
-from configuration.config import settings  # Import settings from the config file
+from tasks import notifications
+from utils.mail_transport import get_mail_transport, build_message
+from Logging.logging import logger
+
+# Outbox entry kinds handled by tasks.outbox_worker
+NEW_POST = "new_post"
+NEW_POST_EMAIL = "new_post_email"
+
+# Follower rows read and outbox rows written per round trip when fanning out
+FANOUT_BATCH_SIZE = 1000
 
 # Function to send an email
 def send_email_notification(to_email: str, title: str, caption: str, username: str):
-    try:
-        sender_email = settings.EMAIL_USERNAME
-        sender_password = settings.EMAIL_PASSWORD
-        smtp_server = settings.SMTP_SERVER
-        smtp_port = settings.SMTP_PORT
-        mail_from = settings.MAIL_FROM
-
-        subject = f"New Post from {username}: {title}"
-        body = f"Hi,\n\n{username} has posted new content:\n\nTitle: {title}\nCaption: {caption}\n\nCheck it out!"
-
-        msg = MIMEMultipart()
-        msg["From"] = mail_from
-        msg["To"] = to_email
-        msg["Subject"] = subject
-        msg.attach(MIMEText(body, "plain"))
-
-        # Send email using TLS (since SSL on port 587 is incorrect)
-        with smtplib.SMTP(smtp_server, smtp_port) as server:
-            server.starttls()
-            server.login(sender_email, sender_password)
-            server.sendmail(sender_email, to_email, msg.as_string())
-
-        print(f"Email sent to {to_email}")
-
-    except Exception as e:
-        print(f"Error sending email to {to_email}: {e}")
-
-# Background task to notify followers
-def notify_followers_background(username: str, title: str, caption: str, db: Session, background_tasks: BackgroundTasks):
-    user = db.query(models.Registration).filter(models.Registration.username == username).first()
-    
-    if user:
-        followers = db.query(models.Follows).filter(models.Follows.following_id == user.user_id).all()
-        follower_emails = [follower.follower.email for follower in followers]
-
-        for email in follower_emails:
-            background_tasks.add_task(send_email_notification, email, title, caption, username)
+    subject = f"New Post from {username}: {title}"
+    body = f"Hi,\n\n{username} has posted new content:\n\nTitle: {title}\nCaption: {caption}\n\nCheck it out!"
+
+    # Send over a pooled, already authenticated SMTP connection
+    get_mail_transport().send(build_message(to_email, subject, body, sender_name=None))
+
+    logger.info("Email sent to %s", to_email)
+
+# Record the notification in the same transaction as the new content
+def enqueue_new_post_notification(db: Session, content: models.Content):
+    """
+    Adds a new-post entry to the notification outbox. The caller commits it
+    together with the content row, so a post is never created without its
+    notification and the request does no per-follower work.
+    """
+    db.add(models.NotificationOutbox(kind=NEW_POST, payload={"c_id": content.c_id}))
+
+# Outbox handler: expand one new post into one email entry per follower
+def fan_out_new_post(db: Session, payload: dict) -> int:
+    """
+    Writes an in-app notification for every follower of the post's author and
+    one NEW_POST_EMAIL outbox entry per follower who wants email, reading
+    followers in keyset batches. Runs inside the worker's transaction, so the
+    expansion is all-or-nothing. Returns the number of email entries created.
+    """
+    post = db.query(models.Content).filter(models.Content.c_id == payload["c_id"]).first()
+    if not post:
+        return 0
+
+    outbox = models.NotificationOutbox.__table__
+    created, last_follow_id = 0, 0
+    while True:
+        followers = (
+            db.query(models.Follows.id, models.Follows.follower_id, models.Registration.email, models.Registration.email_notifications)
+            .join(models.Registration, models.Registration.user_id == models.Follows.follower_id)
+            .filter(models.Follows.following_id == post.user_id, models.Follows.id > last_follow_id)
+            .order_by(models.Follows.id)
+            .limit(FANOUT_BATCH_SIZE)
+            .all()
+        )
+        if not followers:
+            break
+
+        rows = [
+            {
+                "kind": NEW_POST_EMAIL,
+                "payload": {
+                    "to_email": follower.email,
+                    "title": post.title,
+                    "caption": post.caption,
+                    "username": post.username
+                },
+                "status": "pending",
+                "attempts": 0,
+            } for follower in followers if follower.email and follower.email_notifications
+        ]
+        notifications.add_notifications(db, [follower.follower_id for follower in followers], post.user_id, notifications.NEW_POST, post.c_id)
+        if rows:
+            db.execute(insert(outbox), rows)
+            created += len(rows)
+        last_follow_id = followers[-1].id
+
+    return created
+
+# Outbox handler: deliver one follower email
+def deliver_new_post_email(payload: dict):
+    send_email_notification(payload["to_email"], payload["title"], payload["caption"], payload["username"])
@@ -0,0 +1,183 @@
+"""
+Notification outbox worker.
+
+Drains `notification_outbox` in a separate process:
+
+    python -m tasks.outbox_worker
+
+Entries are claimed in batches with a short lease (SELECT ... FOR UPDATE SKIP
+LOCKED on PostgreSQL), so several workers can run side by side. Transactional
+handlers (fan-out) run inside a database transaction; delivery handlers
+(SMTP) run concurrently on a bounded thread pool outside of any transaction.
+Failures are retried with exponential backoff and dead-lettered after
+OUTBOX_MAX_ATTEMPTS attempts (status "dead", kept for inspection).
+"""
+import os
+import signal
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from core.database import SessionLocal
+from core.models import NotificationOutbox
+from tasks.notify_followers import NEW_POST, NEW_POST_EMAIL, fan_out_new_post, deliver_new_post_email
+from tasks.notification_digest import DIGEST_EMAIL, deliver_digest_email
+from Logging.logging import logger
+
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+OUTBOX_CONCURRENCY = int(os.getenv("OUTBOX_CONCURRENCY", "8"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "6"))
+OUTBOX_BACKOFF_SECONDS = int(os.getenv("OUTBOX_BACKOFF_SECONDS", "30"))
+OUTBOX_MAX_BACKOFF_SECONDS = int(os.getenv("OUTBOX_MAX_BACKOFF_SECONDS", "3600"))
+# A claimed entry becomes visible to other workers again if not finished within the lease
+OUTBOX_LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", "300"))
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "2"))
+
+# kind -> handler(db, payload), run inside the worker's transaction
+TRANSACTIONAL_HANDLERS = {
+    NEW_POST: fan_out_new_post,
+}
+
+# kind -> handler(payload), network I/O run concurrently outside any transaction
+DELIVERY_HANDLERS = {
+    NEW_POST_EMAIL: deliver_new_post_email,
+    DIGEST_EMAIL: deliver_digest_email,
+}
+
+OutboxEntry = namedtuple("OutboxEntry", ["id", "kind", "payload", "attempts"])
+
+
+class OutboxWorker:
+    def __init__(self, session_factory=SessionLocal, batch_size: int = OUTBOX_BATCH_SIZE,
+                 concurrency: int = OUTBOX_CONCURRENCY, max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+                 backoff_seconds: int = OUTBOX_BACKOFF_SECONDS, lease_seconds: int = OUTBOX_LEASE_SECONDS):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.lease_seconds = lease_seconds
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="outbox-delivery")
+
+    def claim(self):
+        """Leases a batch of due entries and returns them as plain tuples."""
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            rows = (
+                db.query(NotificationOutbox)
+                .filter(NotificationOutbox.status == "pending", NotificationOutbox.next_attempt_at <= now)
+                .order_by(NotificationOutbox.next_attempt_at, NotificationOutbox.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            entries = [OutboxEntry(row.id, row.kind, row.payload, row.attempts) for row in rows]
+            lease_until = now + timedelta(seconds=self.lease_seconds)
+            for row in rows:
+                row.next_attempt_at = lease_until
+            db.commit()
+            return entries
+        finally:
+            db.close()
+
+    def _run_transactional(self, entry: OutboxEntry):
+        """Runs the handler and removes the entry in one transaction. Returns an error or None."""
+        db = self.session_factory()
+        try:
+            TRANSACTIONAL_HANDLERS[entry.kind](db, entry.payload)
+            db.query(NotificationOutbox).filter(NotificationOutbox.id == entry.id).delete(synchronize_session=False)
+            db.commit()
+            return None
+        except Exception as e:
+            db.rollback()
+            return str(e)
+        finally:
+            db.close()
+
+    @staticmethod
+    def _run_delivery(entry: OutboxEntry):
+        try:
+            DELIVERY_HANDLERS[entry.kind](entry.payload)
+            return None
+        except Exception as e:
+            return str(e)
+
+    def _backoff(self, attempts: int) -> timedelta:
+        return timedelta(seconds=min(self.backoff_seconds * 2 ** (attempts - 1), OUTBOX_MAX_BACKOFF_SECONDS))
+
+    def _record_results(self, results):
+        """Deletes finished entries and reschedules or dead-letters failed ones."""
+        delivered = [entry.id for entry, error in results if error is None]
+        failed = [(entry, error) for entry, error in results if error is not None]
+        if not delivered and not failed:
+            return
+
+        db = self.session_factory()
+        try:
+            if delivered:
+                db.query(NotificationOutbox).filter(NotificationOutbox.id.in_(delivered)).delete(synchronize_session=False)
+            self._record_failures(db, failed)
+            db.commit()
+        finally:
+            db.close()
+
+    def _record_failures(self, db, failed):
+        now = datetime.utcnow()
+        for entry, error in failed:
+            attempts = entry.attempts + 1
+            values = {"attempts": attempts, "last_error": error[:500]}
+            if attempts >= self.max_attempts:
+                values["status"] = "dead"
+                logger.error(f"Outbox entry {entry.id} ({entry.kind}) dead-lettered after {attempts} attempts: {error}")
+            else:
+                values["next_attempt_at"] = now + self._backoff(attempts)
+                logger.warning(f"Outbox entry {entry.id} ({entry.kind}) failed, attempt {attempts}: {error}")
+            db.query(NotificationOutbox).filter(NotificationOutbox.id == entry.id).update(values, synchronize_session=False)
+
+    def process_once(self) -> int:
+        """Claims and handles one batch. Returns the number of entries claimed."""
+        entries = self.claim()
+        if not entries:
+            return 0
+
+        failures = []
+        deliveries = []
+        for entry in entries:
+            if entry.kind in TRANSACTIONAL_HANDLERS:
+                error = self._run_transactional(entry)
+                if error is not None:
+                    failures.append((entry, error))
+            elif entry.kind in DELIVERY_HANDLERS:
+                deliveries.append(entry)
+            else:
+                failures.append((entry, f"No handler for outbox entry kind '{entry.kind}'"))
+
+        results = list(zip(deliveries, self.executor.map(self._run_delivery, deliveries)))
+        self._record_results(results + failures)
+
+        logger.info(f"Outbox batch: {len(entries)} claimed, {len(failures) + sum(1 for _, error in results if error)} failed")
+        return len(entries)
+
+    def run(self, stop_event: threading.Event):
+        """Drains the outbox until `stop_event` is set, sleeping while it is empty."""
+        logger.info("Outbox worker started")
+        while not stop_event.is_set():
+            try:
+                if self.process_once() < self.batch_size:
+                    stop_event.wait(OUTBOX_POLL_SECONDS)
+            except Exception as e:
+                logger.error(f"Outbox worker iteration failed: {str(e)}")
+                stop_event.wait(OUTBOX_POLL_SECONDS)
+        self.executor.shutdown(wait=True)
+        logger.info("Outbox worker stopped")
+
+
+def main():
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+    OutboxWorker().run(stop_event)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 from sqlalchemy.orm import Session
 from fastapi import UploadFile
 import os
-from datetime import datetime
+from datetime import datetime, timezone
 from core import models
 
 def save_content_to_folder_background(
@@ -37,7 +37,7 @@ def save_content_to_folder_background(
             "title": title,
             "caption": caption,
             "file": file_location,
-            "created_at": datetime.now()
+            "created_at": datetime.now(timezone.utc)
         }
 
     except Exception as e:
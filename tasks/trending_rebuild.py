@@ -0,0 +1,71 @@
+"""
+Recomputes the trending scores from scratch:
+
+    python -m tasks.trending_rebuild
+
+Every like and comment of the last TRENDING_REBUILD_HALF_LIVES half-lives is
+scored again from its timestamp and `trending_scores` is replaced in one
+transaction; older events would add less than 2 ** -n of their weight. Use it
+after restoring a backup or changing TRENDING_HALF_LIFE_SECONDS or the event
+weights. API processes pick the new scores up at their next sync. Increments they sync
+while the job runs are overwritten, so run it when traffic is low.
+"""
+import os
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+from core.database import background_session
+from core.models import Comment, Likes, TrendingScore
+from core.trending import COMMENT, EVENT_WEIGHTS, LIKE, TRENDING_HALF_LIFE_SECONDS, epoch_of, event_score, timestamp_of
+from Logging.logging import logger
+
+TRENDING_REBUILD_HALF_LIVES = int(os.getenv("TRENDING_REBUILD_HALF_LIVES", "20"))
+# Rows read per round trip while streaming the events
+REBUILD_BATCH_SIZE = 10000
+
+
+def compute_trending_scores(db: Session, now: Optional[float] = None,
+                            half_life: float = TRENDING_HALF_LIFE_SECONDS,
+                            horizon_half_lives: int = TRENDING_REBUILD_HALF_LIVES):
+    """Returns the epoch of `now` and the score of every post with likes or comments in the horizon."""
+    now = time.time() if now is None else now
+    epoch = epoch_of(now, half_life)
+    since = datetime.fromtimestamp(now - horizon_half_lives * half_life, timezone.utc).replace(tzinfo=None)
+
+    scores: Dict[int, float] = defaultdict(float)
+    for kind, model in ((LIKE, Likes), (COMMENT, Comment)):
+        weight = EVENT_WEIGHTS[kind]
+        events = db.execute(
+            select(model.post_id, model.created_at)
+            .where(model.created_at >= since, model.post_id.is_not(None))
+            .execution_options(yield_per=REBUILD_BATCH_SIZE)
+        )
+        for post_id, created_at in events:
+            scores[post_id] += event_score(timestamp_of(created_at), epoch, weight, half_life)
+    return epoch, scores
+
+
+def rebuild_trending_scores(db: Session, now: Optional[float] = None,
+                            half_life: float = TRENDING_HALF_LIFE_SECONDS) -> int:
+    """Replaces the contents of `trending_scores`. Returns the number of posts scored."""
+    epoch, scores = compute_trending_scores(db, now, half_life)
+    db.execute(delete(TrendingScore))
+    if scores:
+        db.execute(insert(TrendingScore), [
+            {"post_id": post_id, "epoch": epoch, "score": score} for post_id, score in scores.items()
+        ])
+    return len(scores)
+
+
+def main():
+    start_time = time.time()
+    with background_session("trending_rebuild") as db:
+        count = rebuild_trending_scores(db)
+    logger.info(f"Trending scores rebuilt for {count} posts in {round(time.time() - start_time, 2)} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+from typing import Iterable
+from sqlalchemy.orm import Session
+from core.models import Likes, Follows
+from core.like_buffer import like_buffer
+
+def get_viewer_state(db: Session, viewer_id: int, post_ids: Iterable[int], user_ids: Iterable[int]):
+    """
+    Answers, for one viewer, which of the given posts they liked and which of the
+    given users they follow, with one set-membership query per table.
+    Likes still waiting in the write-behind buffer take precedence over the database.
+    """
+    post_ids = set(post_ids)
+    user_ids = set(user_ids)
+
+    liked_ids = set()
+    if post_ids:
+        liked_ids = {
+            row.post_id for row in db.query(Likes.post_id)
+            .filter(Likes.user_id == viewer_id, Likes.post_id.in_(post_ids))
+            .all()
+        }
+        for post_id, direction in like_buffer.pending_for_user(viewer_id, post_ids).items():
+            if direction == 1:
+                liked_ids.add(post_id)
+            else:
+                liked_ids.discard(post_id)
+
+    followed_ids = set()
+    if user_ids:
+        followed_ids = {
+            row.following_id for row in db.query(Follows.following_id)
+            .filter(Follows.follower_id == viewer_id, Follows.following_id.in_(user_ids))
+            .all()
+        }
+
+    return {
+        "liked": {post_id: post_id in liked_ids for post_id in post_ids},
+        "following": {user_id: user_id in followed_ids for user_id in user_ids},
+    }
@@ -0,0 +1,136 @@
+"""
+Reading threaded comments on a synthetic post with 100,000 comments: the
+materialized path (one indexed range per subtree, reply counts kept on the row)
+versus a plain parent_id tree fetched level by level, the way a model without
+paths has to. Rows live in an in-memory SQLite database with the model's indexes.
+
+    python -m testing.benchmarks.bench_comment_threads [comments] [rounds]
+"""
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import sessionmaker
+from core.database import Base
+from core.models import Comment, Content, Registration
+from tasks.comment_threads import MAX_REPLY_DEPTH, ancestor_ids, comment_path, subtree_bounds
+
+TOP_LEVEL_SHARE = 0.05
+PAGE = 50
+
+
+def _setup(count: int):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add(Registration(user_id=1, username="author", email="author@example.com"))
+    db.add(Content(c_id=1, user_id=1, username="author", title="Viral post", caption="", comments_count=count))
+    db.commit()
+
+    # Replies answer a random earlier comment, so big threads attract the most replies and a few dominate
+    rng = random.Random(48)
+    start = datetime(2025, 1, 1)
+    rows = []
+    for comment_id in range(1, count + 1):
+        parent = None
+        if rows and rng.random() > TOP_LEVEL_SHARE:
+            parent = rng.choice(rows)
+            if parent["depth"] >= MAX_REPLY_DEPTH:
+                parent = rows[ancestor_ids(parent["path"])[0] - 1]
+        row = {
+            "comment_id": comment_id, "user_id": 1, "post_id": 1, "user_comment": f"comment {comment_id}",
+            "created_at": start + timedelta(seconds=comment_id),
+            "parent_id": parent["comment_id"] if parent else None,
+            "path": comment_path(parent["path"] if parent else "", comment_id),
+            "depth": parent["depth"] + 1 if parent else 0, "reply_count": 0
+        }
+        if parent:
+            for ancestor_id in ancestor_ids(parent["path"]):
+                rows[ancestor_id - 1]["reply_count"] += 1
+        rows.append(row)
+    db.execute(insert(Comment), rows)
+    db.commit()
+    largest = max((row for row in rows if row["parent_id"] is None), key=lambda row: row["reply_count"])["comment_id"]
+    return db, largest
+
+
+def _top_level_path(db, _root):
+    return db.execute(
+        select(Comment.comment_id, Comment.user_comment, Comment.reply_count)
+        .where(Comment.post_id == 1, Comment.parent_id.is_(None))
+        .order_by(Comment.created_at, Comment.comment_id).limit(PAGE)
+    ).all()
+
+
+def _top_level_naive(db, _root):
+    page = db.execute(
+        select(Comment.comment_id, Comment.user_comment)
+        .where(Comment.post_id == 1, Comment.parent_id.is_(None))
+        .order_by(Comment.created_at, Comment.comment_id).limit(PAGE)
+    ).all()
+    return [(row.comment_id, row.user_comment, len(_thread_naive(db, row.comment_id))) for row in page]
+
+
+def _thread_path(db, root):
+    path = db.execute(select(Comment.path).where(Comment.comment_id == root)).scalar_one()
+    after, before = subtree_bounds(path)
+    return db.execute(
+        select(Comment.comment_id, Comment.parent_id, Comment.user_comment)
+        .where(Comment.post_id == 1, Comment.path > after, Comment.path < before)
+        .order_by(Comment.path)
+    ).all()
+
+
+def _thread_naive(db, root):
+    rows, level = [], [root]
+    while level:
+        children = db.execute(
+            select(Comment.comment_id, Comment.parent_id, Comment.user_comment)
+            .where(Comment.post_id == 1, Comment.parent_id.in_(level))
+            .order_by(Comment.created_at, Comment.comment_id)
+        ).all()
+        rows.extend(children)
+        level = [row.comment_id for row in children]
+    return rows
+
+
+def _thread_page_path(db, root):
+    path = db.execute(select(Comment.path).where(Comment.comment_id == root)).scalar_one()
+    after, before = subtree_bounds(path)
+    return db.execute(
+        select(Comment.comment_id, Comment.user_comment)
+        .where(Comment.post_id == 1, Comment.path > after, Comment.path < before)
+        .order_by(Comment.path).limit(PAGE)
+    ).all()
+
+
+def _thread_page_naive(db, root):
+    # Without paths a depth-first page needs the whole subtree first
+    return _thread_naive(db, root)[:PAGE]
+
+
+def _time(label: str, fn, db, root, rounds: int):
+    fn(db, root)  # warm up
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn(db, root)
+    print(f"{label:<52} {(time.perf_counter() - start) / rounds * 1000:9.2f} ms")
+
+
+def main(count: int = 100_000, rounds: int = 10):
+    db, root = _setup(count)
+    size = db.execute(select(Comment.reply_count).where(Comment.comment_id == root)).scalar_one()
+    print(f"{count} comments, largest thread {size} replies, max depth "
+          f"{db.execute(select(func.max(Comment.depth))).scalar_one()}")
+    _time(f"top-level page of {PAGE} with reply counts, path", _top_level_path, db, root, rounds)
+    _time(f"top-level page of {PAGE} with reply counts, parent_id", _top_level_naive, db, root, rounds)
+    _time("whole largest thread, path range", _thread_path, db, root, rounds)
+    _time("whole largest thread, parent_id level by level", _thread_naive, db, root, rounds)
+    _time(f"first {PAGE} replies of largest thread, path range", _thread_page_path, db, root, rounds)
+    _time(f"first {PAGE} replies of largest thread, parent_id", _thread_page_naive, db, root, rounds)
+    db.close()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,93 @@
+"""
+Bytes saved versus CPU spent by CompressionMiddleware's encoders, per
+endpoint, on synthetic bodies shaped like the real responses. Streams are
+compressed chunk by chunk with a flush after each chunk, as the middleware does.
+Encoders whose package is not installed (brotli, zstandard) are skipped.
+
+    python -m testing.benchmarks.bench_compression [rounds]
+"""
+import json
+import sys
+import time
+import orjson
+from core.compression import ENCODERS, BrotliEncoder, GzipEncoder, ZstdEncoder
+
+LEVELS = {"gzip": (1, 6, 9), "br": (1, 4, 11), "zstd": (1, 3, 9)}
+ENCODER_CLASSES = {"gzip": GzipEncoder, "br": BrotliEncoder, "zstd": ZstdEncoder}
+
+
+def _content_page():
+    """A /get_content page of six posts with many comments each."""
+    posts = [
+        {
+            "c_id": i, "user_id": i % 50, "username": f"creator{i % 50}", "title": f"Sunset over the bay #{i}",
+            "caption": "Golden hour at the pier, shot on film. " * 3, "created_at": "2025-01-01", "file": None,
+            "comments": [f"Amazing shot {j}! Where was this taken?" for j in range(150)],
+            "total_likes": 1200 + i, "liked_by_viewer": False, "following_author": True
+        } for i in range(6)
+    ]
+    return [orjson.dumps({"content": posts, "total_content": 600, "total_pages": 100, "current_page": 1})]
+
+
+def _followers_page():
+    """A /followers/{username} page of 200 users."""
+    followers = [{"username": f"fan_{i:05d}", "followed_since": f"2025-01-{i % 28 + 1:02d} 12:00:00"} for i in range(200)]
+    return [json.dumps({"followers": followers, "next_cursor": "MjAyNS0wMS0wMVQxMjowMDowMHwxMjM0"}).encode()]
+
+
+def _followers_export():
+    """A format=ndjson export of 10,000 followers, streamed in batches of 1,000."""
+    return [
+        "".join(
+            json.dumps({"username": f"fan_{i:05d}", "followed_since": "2025-01-01 12:00:00"}) + "\n"
+            for i in range(batch * 1000, (batch + 1) * 1000)
+        ).encode()
+        for batch in range(10)
+    ]
+
+
+def _push_events():
+    """Server-sent notification events, one small chunk each."""
+    return [
+        f"event: notification\ndata: {json.dumps({'kind': 'like', 'post_id': i, 'actor': f'fan_{i}'})}\n\n".encode()
+        for i in range(200)
+    ]
+
+
+ENDPOINTS = {
+    "/get_content": _content_page,
+    "/followers/{username}": _followers_page,
+    "/followers/{username}?format=ndjson": _followers_export,
+    "/push (SSE)": _push_events,
+}
+
+
+def _compress(encoder_class, level: int, chunks) -> int:
+    encoder = encoder_class(level)
+    if len(chunks) == 1:
+        return len(encoder.compress(chunks[0]) + encoder.finish())
+    size = sum(len(encoder.compress(chunk) + encoder.flush()) for chunk in chunks)
+    return size + len(encoder.finish())
+
+
+def main(rounds: int = 20):
+    print(f"{'endpoint':<38} {'encoding':<8} {'raw B':>9} {'sent B':>9} {'saved':>7} {'CPU ms':>8} {'KB saved/CPU ms':>16}")
+    for endpoint, build in ENDPOINTS.items():
+        chunks = build()
+        raw = sum(len(chunk) for chunk in chunks)
+        for name in ENCODERS:
+            for level in LEVELS[name]:
+                start = time.process_time()
+                for _ in range(rounds):
+                    sent = _compress(ENCODER_CLASSES[name], level, chunks)
+                cpu_ms = (time.process_time() - start) / rounds * 1000
+                saved = raw - sent
+                efficiency = saved / 1024 / cpu_ms if cpu_ms else float("inf")
+                print(
+                    f"{endpoint:<38} {name + '-' + str(level):<8} {raw:>9} {sent:>9} "
+                    f"{saved / raw:>7.1%} {cpu_ms:>8.3f} {efficiency:>16.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,75 @@
+"""
+Messages per second through a local aiosmtpd sink: one SMTP session per
+message (the previous behaviour of the notification tasks) versus the pooled
+transport, one message at a time and in batches.
+
+Requires aiosmtpd (pip install aiosmtpd). TLS is left out on both sides, so the
+per-message numbers are optimistic compared to a real STARTTLS server.
+
+    python -m testing.benchmarks.bench_mail_transport [messages]
+"""
+import smtplib
+import sys
+import time
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+from utils.mail_transport import SMTPConnectionPool, build_message
+
+HOST = "127.0.0.1"
+PORT = 8025
+
+
+class _SinkHandler:
+    async def handle_DATA(self, server, session, envelope):
+        return "250 Message accepted"
+
+
+def _accept_all(server, session, envelope, mechanism, auth_data):
+    return AuthResult(success=True)
+
+
+def _per_message_session(messages):
+    for message in messages:
+        with smtplib.SMTP(HOST, PORT) as server:
+            server.login("bench", "bench")
+            server.send_message(message)
+
+
+def _pooled_send(pool, messages):
+    for message in messages:
+        pool.send(message)
+
+
+def _report(label, count, elapsed):
+    print(f"{label:<28} {count / elapsed:10.1f} msg/s  ({elapsed * 1000:.1f} ms for {count})")
+
+
+def main(count: int = 500):
+    controller = Controller(
+        _SinkHandler(), hostname=HOST, port=PORT,
+        authenticator=_accept_all, auth_require_tls=False
+    )
+    controller.start()
+    try:
+        messages = [build_message(f"user{i}@example.com", "Benchmark", "Hello") for i in range(count)]
+        pool = SMTPConnectionPool(HOST, PORT, "bench", "bench", starttls=False)
+
+        start = time.perf_counter()
+        _per_message_session(messages)
+        _report("new session per message", count, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        _pooled_send(pool, messages)
+        _report("pooled send()", count, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        pool.send_many(messages)
+        _report("pooled send_many()", count, time.perf_counter() - start)
+
+        pool.close()
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,85 @@
+"""
+Cost of turning listed posts into a JSON body, per 1,000 items: ORM objects
+through ContentDetailResponse and FastAPI's default encoding (the previous
+path of the content listings) versus column tuples through plain dicts and
+orjson (FastJSONResponse). Rows come from an in-memory SQLite database, so the
+query stage includes hydration but not network time.
+
+    python -m testing.benchmarks.bench_serialization [items] [rounds]
+"""
+import sys
+import time
+from datetime import datetime
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from core.database import Base
+from core.models import Content, Registration
+from core.responses import FastJSONResponse
+from routes.content_routes import POST_COLUMNS
+from schemas.content import ContentDetailResponse
+
+COMMENTS = ["Nice post!", "Love this", "Where was this taken?"]
+
+
+def _setup(count: int):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add(Registration(user_id=1, username="author", email="author@example.com"))
+    db.add_all(
+        Content(
+            c_id=i, user_id=1, username="author", title=f"Post {i}", caption="A caption " * 5,
+            file=f"post_{i}.jpg", created_at=datetime(2025, 1, 1), likes_count=i % 100
+        ) for i in range(1, count + 1)
+    )
+    db.commit()
+    return db
+
+
+def _model_path(db, count: int) -> bytes:
+    posts = db.query(Content).limit(count).all()
+    details = [
+        ContentDetailResponse(
+            c_id=c.c_id, user_id=c.user_id, username=c.username, title=c.title, caption=c.caption,
+            created_at=c.created_at, comments=COMMENTS, total_likes=c.likes_count,
+            liked_by_viewer=False, following_author=True
+        ) for c in posts
+    ]
+    return JSONResponse(jsonable_encoder({"content": details})).body
+
+
+def _tuple_path(db, count: int) -> bytes:
+    rows = db.query(*POST_COLUMNS).limit(count).all()
+    details = [
+        {
+            "c_id": row.c_id, "user_id": row.user_id, "username": row.username, "title": row.title,
+            "caption": row.caption, "created_at": row.created_at.isoformat(), "file": None,
+            "comments": COMMENTS, "total_likes": row.likes_count,
+            "liked_by_viewer": False, "following_author": True
+        } for row in rows
+    ]
+    return FastJSONResponse({"content": details}).body
+
+
+def _time(label: str, fn, db, count: int, rounds: int):
+    db.expunge_all()
+    fn(db, count)  # warm up
+    start = time.perf_counter()
+    for _ in range(rounds):
+        db.expunge_all()
+        fn(db, count)
+    per_thousand = (time.perf_counter() - start) / rounds / count * 1000
+    print(f"{label:<40} {per_thousand * 1000:8.2f} ms per 1,000 items")
+
+
+def main(count: int = 1000, rounds: int = 20):
+    db = _setup(count)
+    _time("ORM + ContentDetailResponse + encoder", _model_path, db, count, rounds)
+    _time("column tuples + dicts + orjson", _tuple_path, db, count, rounds)
+    db.close()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
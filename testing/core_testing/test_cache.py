@@ -0,0 +1,218 @@
+import threading
+import time
+import unittest
+from fnmatch import fnmatch
+from unittest.mock import patch
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from core.cache import LocalBackend, RedisBackend, ResponseCache, invalidate_after_commit
+
+class FakeRedis:
+    """The subset of the Redis client API used by RedisBackend, with expiry."""
+
+    def __init__(self):
+        self.data = {}
+
+    def _live(self, key):
+        value, expires_at = self.data.get(key, (None, None))
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def get(self, key):
+        value = self._live(key)
+        return value.encode() if isinstance(value, str) else value
+
+    def set(self, key, value, ex=None):
+        self.data[key] = (value, time.monotonic() + ex if ex else None)
+
+    def mget(self, keys):
+        return [self._live(key) for key in keys]
+
+    def incr(self, key):
+        value = int(self._live(key) or 0) + 1
+        self.data[key] = (str(value).encode(), None)
+        return value
+
+    def pipeline(self, transaction=True):
+        client, calls = self, []
+
+        class Pipeline:
+            def incr(self, key):
+                calls.append(key)
+
+            def execute(self):
+                return [client.incr(key) for key in calls]
+        return Pipeline()
+
+    def scan_iter(self, pattern):
+        return [key for key in list(self.data) if fnmatch(key, pattern)]
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+class CacheBehaviour:
+    """Tests shared by both backends; subclasses provide make_backend()."""
+
+    def setUp(self):
+        patcher = patch('core.cache.logger')
+        self.mock_logger = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache = ResponseCache(self.make_backend())
+        self.calls = 0
+
+    def compute(self, value="fresh"):
+        def compute():
+            self.calls += 1
+            return {"value": value, "call": self.calls}
+        return compute
+
+    def test_hit_after_miss(self):
+        """The second lookup is answered from the cache"""
+        first = self.cache.get_or_compute("k", self.compute(), tags=["content"])
+        second = self.cache.get_or_compute("k", self.compute(), tags=["content"])
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.cache.counts["hit"], 1)
+        self.assertEqual(self.cache.counts["miss"], 1)
+
+    def test_tag_invalidation(self):
+        """Bumping any tag of an entry makes it a miss; unrelated tags do not"""
+        self.cache.get_or_compute("k", self.compute(), tags=["content", "post:1"])
+        self.cache.invalidate("post:2")
+        self.cache.get_or_compute("k", self.compute(), tags=["content", "post:1"])
+        self.assertEqual(self.calls, 1)
+
+        self.cache.invalidate("post:1")
+        result = self.cache.get_or_compute("k", self.compute(), tags=["content", "post:1"])
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(result["call"], 2)
+
+    def test_tags_derived_from_result(self):
+        """Tags computed from the result are checked like static ones"""
+        def tags(data):
+            return [f"post:{data['call']}"]
+
+        self.cache.get_or_compute("k", self.compute(), tags=tags)
+        self.cache.invalidate("post:1")
+        self.cache.get_or_compute("k", self.compute(), tags=tags)
+        self.assertEqual(self.calls, 2)
+
+    def test_expiry(self):
+        """Entries are recomputed once their TTL has passed"""
+        self.cache.get_or_compute("k", self.compute(), ttl=1)
+        with patch('time.monotonic', return_value=time.monotonic() + 2):
+            self.cache.get_or_compute("k", self.compute(), ttl=1)
+        self.assertEqual(self.calls, 2)
+
+class TestLocalCache(CacheBehaviour, unittest.TestCase):
+    def make_backend(self):
+        return LocalBackend(max_entries=2)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """Past max_entries the entry read longest ago goes first"""
+        for key in ("a", "b"):
+            self.cache.get_or_compute(key, self.compute(key))
+        self.cache.get_or_compute("a", self.compute("a"))
+        self.cache.get_or_compute("c", self.compute("c"))
+
+        self.assertIsNotNone(self.cache.backend.get("a"))
+        self.assertIsNone(self.cache.backend.get("b"))
+
+    def test_concurrent_misses_compute_once(self):
+        """Requests arriving while a key is being computed wait for that result"""
+        release = threading.Event()
+        started = threading.Event()
+        results = []
+
+        def slow():
+            started.set()
+            release.wait(5)
+            self.calls += 1
+            return {"call": self.calls}
+
+        leader = threading.Thread(target=lambda: results.append(self.cache.get_or_compute("k", slow)))
+        leader.start()
+        started.wait(5)
+        followers = [
+            threading.Thread(target=lambda: results.append(self.cache.get_or_compute("k", slow)))
+            for _ in range(4)
+        ]
+        for thread in followers:
+            thread.start()
+        while self.cache.counts["coalesced"] < 4:
+            time.sleep(0.01)
+        release.set()
+        for thread in [leader] + followers:
+            thread.join(5)
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, [{"call": 1}] * 5)
+
+    def test_failed_computation_is_not_cached(self):
+        """Errors propagate and the next lookup computes again"""
+        def fail():
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            self.cache.get_or_compute("k", fail)
+        self.cache.get_or_compute("k", self.compute())
+        self.assertEqual(self.calls, 1)
+
+    def test_unserializable_value_is_served_uncached(self):
+        """A value that cannot be stored is still returned"""
+        value = self.cache.get_or_compute("k", lambda: {"when": object()})
+        self.assertIn("when", value)
+        self.assertIsNone(self.cache.backend.get("k"))
+        self.assertEqual(self.cache.counts["error"], 1)
+
+class TestRedisCache(CacheBehaviour, unittest.TestCase):
+    def make_backend(self):
+        self.client = FakeRedis()
+        return RedisBackend(client=self.client)
+
+    def test_entries_are_shared_between_processes(self):
+        """Two caches on one server share entries and invalidations"""
+        other = ResponseCache(RedisBackend(client=self.client))
+        self.cache.get_or_compute("k", self.compute(), tags=["user:1"])
+        other.get_or_compute("k", self.compute(), tags=["user:1"])
+        self.assertEqual(self.calls, 1)
+
+        other.invalidate("user:1")
+        self.cache.get_or_compute("k", self.compute(), tags=["user:1"])
+        self.assertEqual(self.calls, 2)
+
+    def test_backend_outage_falls_back_to_computing(self):
+        """A failing server costs the cache, not the request"""
+        with patch.object(self.client, "get", side_effect=ConnectionError("down")):
+            result = self.cache.get_or_compute("k", self.compute())
+        self.assertEqual(result["value"], "fresh")
+        self.assertEqual(self.cache.counts["error"], 1)
+
+class TestInvalidateAfterCommit(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        self.db = sessionmaker(bind=self.engine)()
+        self.addCleanup(self.engine.dispose)
+        self.addCleanup(self.db.close)
+
+    @patch('core.cache.cache')
+    def test_tags_are_invalidated_on_commit_only(self, mock_cache):
+        """Invalidations queued in a rolled back transaction are dropped"""
+        self.db.execute(text("SELECT 1"))
+        invalidate_after_commit(self.db, "post:1")
+        self.db.rollback()
+        self.db.commit()
+        mock_cache.invalidate.assert_not_called()
+
+        invalidate_after_commit(self.db, "post:1", "content")
+        invalidate_after_commit(self.db, "post:1")
+        self.db.commit()
+        mock_cache.invalidate.assert_called_once()
+        self.assertEqual(set(mock_cache.invalidate.call_args.args), {"post:1", "content"})
+
+if __name__ == '__main__':
+    unittest.main()
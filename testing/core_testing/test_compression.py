@@ -0,0 +1,107 @@
+import asyncio
+import gzip
+import json
+import unittest
+import zlib
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+from core.compression import CompressionMiddleware, GzipEncoder, choose_encoding
+
+ROWS = [{"username": f"fan{i}", "followed_since": "2025-01-01 00:00:00"} for i in range(200)]
+
+class TestChooseEncoding(unittest.TestCase):
+    encoders = {"zstd": GzipEncoder, "br": GzipEncoder, "gzip": GzipEncoder}
+
+    def test_preference_and_quality(self):
+        """The server's preference breaks ties; q-values and q=0 are honoured"""
+        self.assertEqual(choose_encoding("gzip, deflate, br, zstd", self.encoders), "zstd")
+        self.assertEqual(choose_encoding("gzip, br;q=0.5", self.encoders), "gzip")
+        self.assertEqual(choose_encoding("*;q=0.1, gzip;q=0", self.encoders), "zstd")
+        self.assertEqual(choose_encoding("br", {"gzip": GzipEncoder}), None)
+        self.assertIsNone(choose_encoding("", self.encoders))
+        self.assertIsNone(choose_encoding("identity", self.encoders))
+
+class TestCompressionMiddleware(unittest.TestCase):
+    def setUp(self):
+        app = FastAPI()
+        app.add_middleware(CompressionMiddleware, min_size=500, encoders={"gzip": GzipEncoder})
+
+        @app.get("/followers")
+        def followers():
+            return {"followers": ROWS}
+
+        @app.get("/small")
+        def small():
+            return {"ok": True}
+
+        @app.get("/image")
+        def image():
+            return Response(b"\x89PNG" * 500, media_type="image/png")
+
+        @app.get("/tagged")
+        def tagged():
+            return JSONResponse({"followers": ROWS}, headers={"ETag": '"abc"'})
+
+        self.client = TestClient(app)
+
+    def test_large_json_is_compressed(self):
+        """Bodies over the threshold are gzipped with a matching Content-Length"""
+        response = self.client.get("/followers", headers={"Accept-Encoding": "gzip"})
+
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertEqual(response.headers["vary"], "Accept-Encoding")
+        self.assertEqual(response.json(), {"followers": ROWS})
+        self.assertLess(int(response.headers["content-length"]), len(json.dumps({"followers": ROWS})))
+
+    def test_skipped_responses(self):
+        """Small bodies, other content types and clients without gzip get the body as is"""
+        small = self.client.get("/small", headers={"Accept-Encoding": "gzip"})
+        self.assertNotIn("content-encoding", small.headers)
+        self.assertEqual(small.headers["vary"], "Accept-Encoding")
+
+        image = self.client.get("/image", headers={"Accept-Encoding": "gzip"})
+        self.assertNotIn("content-encoding", image.headers)
+
+        plain = self.client.get("/followers", headers={"Accept-Encoding": "identity"})
+        self.assertNotIn("content-encoding", plain.headers)
+
+    def test_strong_etag_is_weakened(self):
+        """A compressed body no longer matches the bytes a strong ETag named"""
+        response = self.client.get("/tagged", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["etag"], 'W/"abc"')
+
+    def test_stream_chunks_are_flushed_one_by_one(self):
+        """Each chunk of a stream is sent compressed as soon as it is produced and decodes on its own"""
+        lines = [json.dumps(row) + "\n" for row in ROWS[:5]]
+
+        async def endpoint(scope, receive, send):
+            async def body():
+                for line in lines:
+                    yield line
+            await StreamingResponse(body(), media_type="application/x-ndjson")(scope, receive, send)
+
+        middleware = CompressionMiddleware(endpoint, min_size=500, encoders={"gzip": GzipEncoder})
+        scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", b"gzip")]}
+        messages = []
+
+        async def receive():
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            messages.append(message)
+
+        asyncio.run(middleware(scope, receive, send))
+
+        start, chunks = messages[0], messages[1:]
+        self.assertIn((b"content-encoding", b"gzip"), start["headers"])
+        self.assertNotIn(b"content-length", [name for name, _ in start["headers"]])
+
+        decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        decoded = [decoder.decompress(chunk["body"]).decode() for chunk in chunks if chunk.get("more_body")]
+        self.assertEqual(decoded, lines)
+        self.assertFalse(chunks[-1]["more_body"])
+        self.assertEqual(gzip.decompress(b"".join(chunk["body"] for chunk in chunks)).decode(), "".join(lines))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,9 @@
 import unittest  # Importing the unittest module to write unit tests
 from unittest.mock import patch, MagicMock  # Import patching tools to mock components
-from core.database import get_db  # Import the function to test (get_db)
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from core.database import get_db, background_session  # Import the functions to test
+from core.metrics import BackgroundMetrics
 
 class TestDatabase(unittest.TestCase):  # Define the test class inheriting from unittest.TestCase
     @patch('core.database.SessionLocal')  # Patching SessionLocal so we can mock it during the test
@@ -23,5 +26,46 @@ class TestDatabase(unittest.TestCase):  # Define the test class inheriting from
         # Verify that the mock session's close method was called exactly once
         mock_session.close.assert_called_once()
 
+    def test_background_session_commits_and_closes(self):
+        """The session is committed and closed when the block succeeds"""
+        mock_session = MagicMock()
+
+        with background_session("task", lambda: mock_session) as db:
+            self.assertIs(db, mock_session)
+
+        mock_session.commit.assert_called_once()
+        mock_session.rollback.assert_not_called()
+        mock_session.close.assert_called_once()
+
+    def test_background_session_rolls_back_on_error(self):
+        """Errors roll the session back, close it and propagate"""
+        mock_session = MagicMock()
+
+        with self.assertRaises(ValueError):
+            with background_session("task", lambda: mock_session):
+                raise ValueError("boom")
+
+        mock_session.commit.assert_not_called()
+        mock_session.rollback.assert_called_once()
+        mock_session.close.assert_called_once()
+
+    def test_background_session_reports_connection_hold_time(self):
+        """The time the pooled connection was checked out is recorded under the task name"""
+        engine = create_engine("sqlite://")
+        metrics = BackgroundMetrics()
+        try:
+            with patch('core.database.background_metrics', metrics):
+                with background_session("digest", sessionmaker(bind=engine)) as db:
+                    db.execute(text("SELECT 1"))
+                # Connections used outside of background_session are not attributed to a task
+                with engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+        finally:
+            engine.dispose()
+
+        self.assertEqual(list(metrics.connection_held), ["digest"])
+        self.assertEqual(metrics.connection_held["digest"].count, 1)
+        self.assertIn('background_db_connection_held_seconds_count{task="digest"} 1', metrics.render())
+
 if __name__ == '__main__':  # If this file is run directly (not imported), start the tests
     unittest.main()
@@ -0,0 +1,86 @@
+import asyncio
+import threading
+import unittest
+from unittest.mock import patch
+from fastapi import HTTPException
+from core.executor import BoundedExecutor, render_executor_metrics
+
+class TestBoundedExecutor(unittest.TestCase):
+    def setUp(self):
+        patcher = patch('core.executor.logger')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.release = threading.Event()
+        self.started = threading.Event()
+        # One worker, four queue slots, non-critical tasks shed from the third queued task on
+        self.executor = BoundedExecutor("test", workers=1, max_queue=4, shed_ratio=0.5)
+        self.addCleanup(self.executor.shutdown, 5)
+        self.addCleanup(self.release.set)
+
+    def _block_worker(self):
+        def blocker():
+            self.started.set()
+            self.release.wait(5)
+        self.executor.submit(blocker)
+        self.started.wait(5)
+
+    def test_sheds_non_critical_before_rejecting_critical(self):
+        """Non-critical tasks are shed at the threshold; critical ones use the reserve until the queue is full"""
+        self._block_worker()
+        done = []
+
+        self.assertTrue(self.executor.submit(done.append, 1))
+        self.assertTrue(self.executor.submit(done.append, 2))
+        self.assertFalse(self.executor.submit(done.append, 3))
+        self.assertTrue(self.executor.submit(done.append, 4, critical=True))
+        self.assertTrue(self.executor.submit(done.append, 5, critical=True))
+        self.assertFalse(self.executor.submit(done.append, 6, critical=True))
+        self.assertEqual(self.executor.depth, 4)
+
+        self.release.set()
+        self.assertEqual(self.executor.shutdown(5), 0)
+        self.assertEqual(done, [1, 2, 4, 5])
+        self.assertEqual(self.executor.snapshot(), {"completed": 5, "failed": 0, "shed": 1, "rejected": 1})
+
+    def test_failures_are_counted_and_shutdown_rejects(self):
+        """A failing task does not stop the worker; nothing is accepted after shutdown"""
+        def fail():
+            raise ValueError("boom")
+
+        self.executor.submit(fail)
+        self.executor.shutdown(5)
+
+        self.assertFalse(self.executor.submit(print))
+        self.assertEqual(self.executor.snapshot()["failed"], 1)
+        self.assertEqual(self.executor.snapshot()["rejected"], 1)
+
+    def test_shutdown_reports_abandoned_tasks(self):
+        """Tasks still queued when the drain deadline passes are reported"""
+        self._block_worker()
+        self.executor.submit(print)
+        self.executor.submit(print)
+
+        self.assertEqual(self.executor.shutdown(0.1), 2)
+
+    def test_run_returns_result_or_answers_503(self):
+        """run() awaits the task's result, and answers 503 when the pool is saturated"""
+        self.assertEqual(asyncio.run(self.executor.run(sum, [1, 2, 3])), 6)
+
+        self._block_worker()
+        for i in range(4):
+            self.executor.submit(print, critical=True)
+        with self.assertRaises(HTTPException) as context:
+            asyncio.run(self.executor.run(sum, [1]))
+        self.assertEqual(context.exception.status_code, 503)
+        self.assertIn("Retry-After", context.exception.headers)
+
+    def test_metrics_exposition(self):
+        """Queue depth and task outcomes of every pool are exposed"""
+        output = render_executor_metrics()
+
+        self.assertIn("# TYPE executor_queue_depth gauge", output)
+        self.assertIn('executor_queue_depth{pool="io"}', output)
+        self.assertIn('executor_tasks_total{pool="cpu",outcome="shed"}', output)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from core.database import Base
+from core.models import Registration, Content, Likes
+from core.like_buffer import LikeBuffer
+
+class TestLikeBuffer(unittest.TestCase):
+    def setUp(self):
+        """Create an in-memory database with two posts and a spill directory"""
+        self.engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(bind=self.engine)
+        self.SessionTesting = sessionmaker(bind=self.engine)
+
+        db = self.SessionTesting()
+        for user_id in range(1, 6):
+            db.add(Registration(user_id=user_id, username=f"user{user_id}", email=f"user{user_id}@example.com"))
+        db.add(Content(c_id=1, user_id=1, username="user1", title="First", caption="Post"))
+        db.add(Content(c_id=2, user_id=1, username="user1", title="Second", caption="Post"))
+        db.commit()
+        db.close()
+
+        self.spill_dir = tempfile.TemporaryDirectory()
+        self.spill_path = os.path.join(self.spill_dir.name, "likes_spill.ndjson")
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.spill_dir.cleanup()
+
+    def make_buffer(self):
+        # A long interval keeps the flusher thread out of the way; tests flush explicitly
+        return LikeBuffer(
+            session_factory=self.SessionTesting,
+            flush_interval_ms=60_000,
+            max_events=1000,
+            spill_path=self.spill_path
+        )
+
+    def state(self):
+        db = self.SessionTesting()
+        try:
+            likes = sorted((like.user_id, like.post_id) for like in db.query(Likes).all())
+            counters = dict(db.query(Content.c_id, Content.likes_count).all())
+            return likes, counters
+        finally:
+            db.close()
+
+    @patch('core.like_buffer.logger')
+    def test_flush_merges_events_and_counters(self, mock_logger):
+        """Repeated events per (user, post) collapse to the latest direction"""
+        buffer = self.make_buffer()
+        buffer.start()
+        buffer.record(2, 1, 1)
+        buffer.record(3, 1, 1)
+        buffer.record(4, 2, 1)
+        buffer.record(4, 2, 0)  # Changed their mind before the flush
+        buffer.record(5, 1, 1)
+        buffer.record(5, 1, 1)
+
+        self.assertEqual(len(buffer), 4)
+        buffer.flush()
+
+        likes, counters = self.state()
+        self.assertEqual(likes, [(2, 1), (3, 1), (5, 1)])
+        self.assertEqual(counters, {1: 3, 2: 0})
+
+        buffer.record(2, 1, 0)
+        buffer.stop()
+
+        likes, counters = self.state()
+        self.assertEqual(likes, [(3, 1), (5, 1)])
+        self.assertEqual(counters[1], 2)
+        self.assertEqual(os.listdir(self.spill_dir.name), [])
+
+    @patch('core.like_buffer.logger')
+    def test_read_your_writes(self, mock_logger):
+        """Buffered events are visible before they reach the database"""
+        buffer = self.make_buffer()
+        buffer.record(2, 1, 1)
+        buffer.record(2, 2, 0)
+
+        self.assertEqual(buffer.pending_state(2, 1), 1)
+        self.assertIsNone(buffer.pending_state(3, 1))
+        self.assertEqual(buffer.pending_for_user(2, [1, 2, 3]), {1: 1, 2: 0})
+
+    @patch('core.like_buffer.logger')
+    def test_flushing_events_stay_visible(self, mock_logger):
+        """Events of a batch being written are read until it commits, and merged back if it fails"""
+        buffer = self.make_buffer()
+        buffer.record(2, 1, 1)
+        buffer.record(2, 2, 0)
+        seen = []
+
+        def write_batch(batch):
+            seen.append((buffer.pending_state(2, 1), buffer.pending_for_user(2, [1, 2])))
+            buffer.record(2, 2, 1)  # A newer event recorded mid-flush wins
+            raise RuntimeError("database down")
+
+        with patch.object(buffer, '_write_batch', side_effect=write_batch):
+            buffer.flush()
+        self.assertEqual(seen, [(1, {1: 1, 2: 0})])
+        self.assertEqual(buffer.pending_for_user(2, [1, 2]), {1: 1, 2: 1})
+
+        buffer.flush()
+        self.assertIsNone(buffer.pending_state(2, 1))
+        self.assertEqual(self.state()[0], [(2, 1), (2, 2)])
+
+    @patch('core.like_buffer.logger')
+    def test_spill_file_replayed_after_crash(self, mock_logger):
+        """Events journaled by a process that died before flushing are applied on restart"""
+        crashed = self.make_buffer()
+        crashed.start()
+        crashed.record(2, 1, 1)
+        crashed.record(3, 2, 1)
+        crashed._stopping.set()  # Simulate a crash: no final flush, spill file left behind
+
+        restarted = self.make_buffer()
+        restarted.start()
+        self.assertEqual(len(restarted), 2)
+        restarted.stop()
+
+        likes, counters = self.state()
+        self.assertEqual(likes, [(2, 1), (3, 2)])
+        self.assertEqual(counters, {1: 1, 2: 1})
+
+    @patch('core.like_buffer.logger')
+    def test_replay_is_idempotent(self, mock_logger):
+        """Replaying events that were already written does not double count"""
+        buffer = self.make_buffer()
+        buffer.record(2, 1, 1)
+        buffer.flush()
+        buffer.record(2, 1, 1)
+        buffer.flush()
+
+        likes, counters = self.state()
+        self.assertEqual(likes, [(2, 1)])
+        self.assertEqual(counters[1], 1)
+
+    @patch('core.like_buffer.logger')
+    def test_failed_flush_keeps_events(self, mock_logger):
+        """A failing batch is retried on the next flush"""
+        buffer = self.make_buffer()
+        buffer.record(2, 1, 1)
+
+        with patch.object(LikeBuffer, '_write_batch', side_effect=RuntimeError("database down")):
+            buffer.flush()
+        self.assertEqual(buffer.pending_state(2, 1), 1)
+
+        buffer.flush()
+        self.assertEqual(self.state()[0], [(2, 1)])
+
+if __name__ == '__main__':
+    unittest.main()
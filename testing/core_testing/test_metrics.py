@@ -0,0 +1,71 @@
+import unittest
+from unittest.mock import patch
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from core.metrics import Histogram, MetricsMiddleware, RequestMetrics, UNMATCHED_ROUTE
+
+class TestHistogram(unittest.TestCase):
+    def test_cumulative_buckets(self):
+        """Observations land in the first bucket whose bound they do not exceed"""
+        histogram = Histogram((0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value)
+
+        self.assertEqual(list(histogram.cumulative()), [("0.1", 2), ("1.0", 3), ("+Inf", 4)])
+        self.assertEqual(histogram.count, 4)
+        self.assertAlmostEqual(histogram.total, 3.65)
+
+class TestMetricsMiddleware(unittest.TestCase):
+    def setUp(self):
+        self.metrics = RequestMetrics()
+        app = FastAPI()
+        app.add_middleware(MetricsMiddleware, metrics=self.metrics)
+
+        @app.get("/items/{item_id}")
+        def get_item(item_id: int):
+            if item_id == 0:
+                raise HTTPException(status_code=404, detail="Not found")
+            return {"item_id": item_id}
+
+        @app.post("/items")
+        def create_item(payload: dict):
+            return payload
+
+        patcher = patch('core.metrics.log_event')
+        self.mock_log_event = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = TestClient(app)
+
+    def test_requests_grouped_by_route_template(self):
+        """Different ids share the templated route label; status codes are kept apart"""
+        self.client.get("/items/1")
+        self.client.get("/items/2")
+        self.client.get("/items/0")
+        self.client.get("/no/such/path")
+
+        self.assertEqual(self.metrics.requests, {
+            ("GET", "/items/{item_id}", 200): 2,
+            ("GET", "/items/{item_id}", 404): 1,
+            ("GET", UNMATCHED_ROUTE, 404): 1,
+        })
+        self.assertEqual(self.metrics.latency[("GET", "/items/{item_id}")].count, 3)
+        self.assertEqual(self.metrics.in_flight, 0)
+        self.assertEqual(self.mock_log_event.call_count, 4)
+
+    def test_payload_sizes_and_exposition(self):
+        """Request and response bytes are recorded and rendered in Prometheus format"""
+        response = self.client.post("/items", json={"name": "x" * 50})
+
+        request_size = self.metrics.request_size[("POST", "/items")]
+        response_size = self.metrics.response_size[("POST", "/items")]
+        self.assertEqual(request_size.total, len(response.request.content))
+        self.assertEqual(response_size.total, len(response.content))
+
+        text = self.metrics.render()
+        self.assertIn('http_requests_total{method="POST",route="/items",status="200"} 1', text)
+        self.assertIn('http_request_duration_seconds_bucket{method="POST",route="/items",le="+Inf"} 1', text)
+        self.assertIn('http_response_size_bytes_count{method="POST",route="/items"} 1', text)
+        self.assertIn("# TYPE http_request_duration_seconds histogram", text)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from core.profiler import ProfilerBusy, ProfilerMiddleware, StackSampler, collapse
+from oauth2 import create_tokens
+
+def _spin(seconds: float):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+def _waiting(output: str) -> bool:
+    return any(line.rsplit(" ", 1)[0].endswith("wait") for line in output.splitlines())
+
+class TestStackSampler(unittest.TestCase):
+    def test_samples_busy_thread_as_collapsed_stacks(self):
+        """A busy thread shows up root first, with one count per sample"""
+        worker = threading.Thread(target=_spin, args=(0.2,))
+        sampler = StackSampler(0.002)
+        sampler.start()
+        worker.start()
+        worker.join()
+        output = collapse(sampler.stop())
+
+        spin_lines = [line for line in output.splitlines() if "test_profiler:_spin" in line]
+        self.assertTrue(spin_lines)
+        stack, count = spin_lines[0].rsplit(" ", 1)
+        self.assertTrue(stack.endswith("test_profiler:_spin"))
+        self.assertGreater(int(count), 0)
+
+    def test_idle_threads_are_skipped(self):
+        """Threads blocked waiting for work are left out unless asked for"""
+        event = threading.Event()
+        waiter = threading.Thread(target=event.wait)
+        waiter.start()
+        try:
+            sampler = StackSampler(0.002)
+            sampler.start()
+            time.sleep(0.05)
+            self.assertFalse(_waiting(collapse(sampler.stop())))
+
+            sampler = StackSampler(0.002, include_idle=True)
+            sampler.start()
+            time.sleep(0.05)
+            self.assertTrue(_waiting(collapse(sampler.stop())))
+        finally:
+            event.set()
+            waiter.join()
+
+    def test_one_profile_at_a_time(self):
+        """A second sampler cannot start while one is running"""
+        first = StackSampler(0.01)
+        first.start()
+        try:
+            with self.assertRaises(ProfilerBusy):
+                StackSampler(0.01).start()
+        finally:
+            first.stop()
+
+        second = StackSampler(0.01)
+        second.start()
+        second.stop()
+
+class TestProfilerMiddleware(unittest.TestCase):
+    def setUp(self):
+        app = FastAPI()
+        app.add_middleware(ProfilerMiddleware, interval_ms=1)
+
+        @app.get("/slow")
+        def slow_endpoint():
+            _spin(0.1)
+            return {"done": True}
+
+        patcher = patch('oauth2.ADMIN_USERNAMES', frozenset({"admin"}))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = TestClient(app)
+
+    def _headers(self, username: str) -> dict:
+        token = create_tokens({"username": username, "user_id": 1})
+        return {"Authorization": f"Bearer {token}", "X-Profile": "1"}
+
+    def test_admin_receives_endpoint_stacks(self):
+        """The response is replaced by the stacks sampled inside the endpoint"""
+        response = self.client.get("/slow", headers=self._headers("admin"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["X-Profile-Status"], "200")
+        self.assertTrue(response.headers["content-type"].startswith("text/plain"))
+        lines = response.text.splitlines()
+        self.assertTrue(lines)
+        self.assertTrue(all("slow_endpoint" in line for line in lines))
+        self.assertTrue(any("test_profiler:_spin" in line for line in lines))
+
+    def test_header_ignored_for_other_users(self):
+        """Non-admins and requests without the header get the normal response"""
+        self.assertEqual(self.client.get("/slow", headers=self._headers("someone")).json(), {"done": True})
+        self.assertEqual(self.client.get("/slow").json(), {"done": True})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import asyncio
+import threading
+import unittest
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from core.database import Base
+from core.models import Registration
+from core.pubsub import LocalBroker, PushHub, PUSH_BUFFER_SIZE
+from routes.push_routes import _event_stream
+from tasks.notifications import FOLLOW, add_notification
+
+class TestPushHub(unittest.TestCase):
+    def test_deliver_only_to_recipient(self):
+        """Events reach every stream of their recipient and nobody else"""
+        async def scenario():
+            hub = PushHub()
+            first, second, other = hub.subscribe(1), hub.subscribe(1), hub.subscribe(2)
+            hub.deliver(1, {"kind": "like"})
+            self.assertEqual(list(first.drain()), [{"kind": "like"}])
+            self.assertEqual(list(second.drain()), [{"kind": "like"}])
+            self.assertEqual(list(other.drain()), [])
+            self.assertIsNone(first.buffer)
+
+            hub.unsubscribe(first)
+            hub.unsubscribe(second)
+            self.assertEqual(len(hub), 1)
+        asyncio.run(scenario())
+
+    def test_slow_reader_flagged_for_resync(self):
+        """A full buffer drops the oldest events and marks the stream for resync"""
+        async def scenario():
+            subscription = PushHub().subscribe(1)
+            for i in range(PUSH_BUFFER_SIZE + 5):
+                subscription.push({"n": i})
+            self.assertTrue(subscription.dropped)
+            messages = list(subscription.drain())
+            self.assertEqual(len(messages), PUSH_BUFFER_SIZE)
+            self.assertEqual(messages[-1], {"n": PUSH_BUFFER_SIZE + 4})
+        asyncio.run(scenario())
+
+class TestPublishAfterCommit(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(bind=self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        self.db.add(Registration(user_id=1, username="user1", email="user1@example.com"))
+        self.db.add(Registration(user_id=2, username="user2", email="user2@example.com"))
+        self.db.commit()
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+
+    @patch('core.pubsub.broker')
+    def test_events_published_on_commit_only(self, mock_broker):
+        """Notifications are pushed once committed and never for rolled back work"""
+        add_notification(self.db, 1, 2, FOLLOW)
+        mock_broker.publish_many.assert_not_called()
+        self.db.rollback()
+        mock_broker.publish_many.assert_not_called()
+
+        add_notification(self.db, 1, 2, FOLLOW)
+        self.db.commit()
+        mock_broker.publish_many.assert_called_once()
+        [(user_id, message)] = mock_broker.publish_many.call_args.args[0]
+        self.assertEqual(user_id, 1)
+        self.assertEqual(message["kind"], FOLLOW)
+        self.assertEqual(message["actor_id"], 2)
+
+class TestEventStream(unittest.TestCase):
+    @patch('routes.push_routes.logger')
+    def test_stream_receives_events_from_other_threads(self, mock_logger):
+        """An event published from a worker thread is written to the user's SSE stream"""
+        async def scenario():
+            hub = PushHub()
+            broker = LocalBroker()
+            await broker.start(hub)
+
+            with patch('routes.push_routes.hub', hub):
+                stream = _event_stream(7)
+                self.assertEqual(await stream.__anext__(), "retry: 5000\n\n")
+                pending = asyncio.ensure_future(stream.__anext__())
+                await asyncio.sleep(0)
+
+                publisher = threading.Thread(target=broker.publish_many, args=([(7, {"type": "notification", "kind": "like"})],))
+                publisher.start()
+                publisher.join()
+
+                chunk = await asyncio.wait_for(pending, 1)
+                self.assertEqual(chunk, 'event: notification\ndata: {"type":"notification","kind":"like"}\n\n')
+
+                hub.close()
+                with self.assertRaises(StopAsyncIteration):
+                    await stream.__anext__()
+                self.assertEqual(len(hub), 0)
+            await broker.stop()
+        asyncio.run(scenario())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from core.database import Base
+from core.models import Registration, Content, Likes
+from core.query_counter import track_queries, assert_max_queries, statement_shape, current_stats
+
+class TestQueryCounter(unittest.TestCase):
+    def setUp(self):
+        """Create an in-memory database with a few posts"""
+        self.engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(bind=self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+
+        self.db.add(Registration(user_id=1, username="owner", email="owner@example.com"))
+        for i in range(1, 8):
+            self.db.add(Content(c_id=i, user_id=1, username="owner", title=f"Post {i}", caption="Caption"))
+        self.db.commit()
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+
+    def test_counts_statements(self):
+        """Every executed statement is counted inside the tracked block"""
+        with track_queries() as stats:
+            self.db.query(Content).all()
+            self.db.query(Likes).count()
+
+        self.assertEqual(stats.count, 2)
+        self.assertGreaterEqual(stats.duration, 0)
+        self.assertIsNone(current_stats())
+
+    def test_flags_repeated_shapes(self):
+        """A per-row lookup loop is reported as a repeated statement shape"""
+        with track_queries() as stats:
+            for post in self.db.query(Content).all():
+                self.db.query(Likes).filter(Likes.post_id == post.c_id).count()
+
+        repeated = stats.repeated_shapes(threshold=5)
+        self.assertEqual(len(repeated), 1)
+        self.assertEqual(repeated[0][1], 7)
+
+    def test_assert_max_queries_fails(self):
+        """assert_max_queries raises when the budget is exceeded"""
+        with self.assertRaises(AssertionError):
+            with assert_max_queries(1):
+                self.db.query(Content).all()
+                self.db.query(Likes).all()
+
+    def test_assert_max_queries_passes(self):
+        """assert_max_queries is silent within the budget"""
+        with assert_max_queries(1) as stats:
+            self.db.query(Content).all()
+
+        self.assertEqual(stats.count, 1)
+
+    def test_failed_statement_leaves_no_start_time(self):
+        """A statement that raises does not leave its start time on the pooled connection"""
+        with self.engine.connect() as conn:
+            for _ in range(3):
+                with self.assertRaises(OperationalError):
+                    conn.execute(text("SELECT * FROM missing_table"))
+            conn.execute(text("SELECT 1"))
+            self.assertEqual(conn.info["query_start_time"], [])
+
+    def test_statement_shape(self):
+        """Literal values and IN lists are normalized away"""
+        self.assertEqual(
+            statement_shape("SELECT * FROM likes WHERE post_id = 12 AND name = 'x'"),
+            statement_shape("SELECT *  FROM likes WHERE post_id = 7 AND name = 'y'")
+        )
+        self.assertEqual(
+            statement_shape("SELECT 1 WHERE id IN (?, ?, ?)"),
+            statement_shape("SELECT 1 WHERE id IN (?, ?)")
+        )
+
+if __name__ == '__main__':
+    unittest.main()
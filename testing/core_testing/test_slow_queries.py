@@ -0,0 +1,127 @@
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from collections import deque
+from unittest.mock import Mock, patch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import StaticPool
+from core.query_counter import query_stats_middleware
+from core.slow_queries import BACKGROUND, SlowQueryLog, redact_parameters, read_slow_queries, slow_query_log, top_offenders
+
+class TestSlowQueryLog(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool
+        )
+        slow_query_log.clear()
+        patcher = patch.object(slow_query_log, "threshold_ms", 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(slow_query_log.clear)
+        self.addCleanup(self.engine.dispose)
+
+    def test_records_route_template_and_redacted_parameters(self):
+        """Statements issued by a request carry its route template; text parameters are redacted"""
+        app = FastAPI()
+        app.middleware("http")(query_stats_middleware)
+
+        @app.get("/users/{username}")
+        def get_user(username: str):
+            with self.engine.connect() as conn:
+                conn.execute(text("SELECT :name AS name, :limit AS lim"), {"name": username, "limit": 10})
+            return {}
+
+        with patch('core.slow_queries.logger') as mock_logger:
+            TestClient(app).get("/users/secret-name")
+
+        entry = slow_query_log.entries()[0]
+        self.assertEqual(entry.route, "GET /users/{username}")
+        self.assertIn("SELECT", entry.statement)
+        self.assertEqual(entry.parameters, ["<str len=11>", 10])
+        self.assertIsNone(entry.plan)  # EXPLAIN is only captured on PostgreSQL
+        self.assertNotIn("secret-name", json.dumps(entry._asdict()))
+        extra = mock_logger.warning.call_args.kwargs["extra"]
+        self.assertEqual(extra["route"], "GET /users/{username}")
+
+    def test_threshold_and_ring_size(self):
+        """Fast statements are skipped and only the newest entries are kept"""
+        with patch('core.slow_queries.logger'):
+            with patch.object(slow_query_log, "threshold_ms", 60_000), self.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            self.assertEqual(slow_query_log.entries(), [])
+
+            with patch.object(slow_query_log, "_entries", deque(maxlen=2)):
+                with self.engine.connect() as conn:
+                    for i in range(3):
+                        conn.execute(text(f"SELECT {i}"))
+                entries = slow_query_log.entries()
+
+        self.assertEqual([entry.statement for entry in entries], ["SELECT 2", "SELECT 1"])
+        self.assertEqual(entries[0].route, BACKGROUND)
+
+    def test_timed_by_the_query_counter(self):
+        """Statements are timed once, by core.query_counter; failed ones are not logged"""
+        with patch('core.slow_queries.logger'), self.engine.connect() as conn:
+            with self.assertRaises(OperationalError):
+                conn.execute(text("SELECT * FROM missing_table"))
+            conn.execute(text("SELECT 1"))
+            self.assertNotIn("slow_query_start_time", conn.info)
+            self.assertEqual(conn.info["query_start_time"], [])
+
+        self.assertEqual([entry.statement for entry in slow_query_log.entries()], ["SELECT 1"])
+
+    def test_explained_shapes_are_bounded(self):
+        """Only the most recently explained statement shapes are remembered"""
+        log = SlowQueryLog(threshold_ms=0, size=10, explain=True)
+        cursor = Mock()
+        cursor.connection.cursor.return_value.fetchall.return_value = [("Seq Scan on content",)]
+        with patch('core.slow_queries.EXPLAINED_SHAPES', 2):
+            for table in ("content", "likes", "comments"):
+                self.assertEqual(log._explain(cursor, f"SELECT * FROM {table}", ()), "Seq Scan on content")
+            self.assertIsNone(log._explain(cursor, "SELECT * FROM comments", ()))
+
+        self.assertEqual(list(log._explained), ["SELECT * FROM likes", "SELECT * FROM comments"])
+
+    def test_redact_parameters(self):
+        """Numbers survive, text is replaced by its length, batches by their size"""
+        self.assertEqual(
+            redact_parameters({"email": "a@b.c", "user_id": 7, "flag": True, "missing": None}),
+            {"email": "<str len=5>", "user_id": 7, "flag": True, "missing": None}
+        )
+        self.assertEqual(redact_parameters([(1, "x"), (2, "y")], executemany=True), "<2 parameter sets>")
+
+class TestTopOffenders(unittest.TestCase):
+    def test_aggregates_log_files_by_total_time(self):
+        """Records from plain and gzipped logs are grouped per statement and ranked by total time"""
+        records = [
+            {"message": "GET /a 200", "duration_ms": 900},
+            {"slow_query": "SELECT a", "route": "GET /a", "duration_ms": 300},
+            {"slow_query": "SELECT b", "route": "GET /b", "duration_ms": 500},
+            {"slow_query": "SELECT a", "route": "GET /c", "duration_ms": 400},
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            plain = os.path.join(directory, "trendconnect.log")
+            rotated = os.path.join(directory, "trendconnect.log.1.gz")
+            with open(plain, "w") as f:
+                f.write("\n".join(json.dumps(record) for record in records[:3]) + "\nnot json\n")
+            with gzip.open(rotated, "wt") as f:
+                f.write(json.dumps(records[3]) + "\n")
+
+            ranked = top_offenders(read_slow_queries([plain, rotated]))
+
+        self.assertEqual([total["statement"] for total in ranked], ["SELECT a", "SELECT b"])
+        self.assertEqual(ranked[0]["count"], 2)
+        self.assertEqual(ranked[0]["total_ms"], 700)
+        self.assertEqual(ranked[0]["max_ms"], 400)
+        self.assertEqual(ranked[0]["mean_ms"], 350)
+        self.assertEqual(set(ranked[0]["routes"]), {"GET /a", "GET /c"})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+import unittest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from core.database import Base
+from core.models import TrendingScore
+from core.trending import COMMENT, EPOCH_HALF_LIVES, LIKE, TopK, TrendingEngine, epoch_of
+
+HALF_LIFE = 3600
+# Ten half-lives into an epoch
+NOW = 1000 * HALF_LIFE * EPOCH_HALF_LIVES + 10 * HALF_LIFE
+
+class Clock:
+    def __init__(self, now=NOW):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+class TestTopK(unittest.TestCase):
+    def test_keeps_the_best_k(self):
+        """Low scores are turned away, raised members move up and outdated heap entries are skipped"""
+        top = TopK(3)
+        for post_id, score in ((1, 5.0), (2, 1.0), (3, 3.0), (4, 0.5)):
+            top.offer(post_id, score)
+        self.assertEqual(top.ranking(), [(1, 5.0), (3, 3.0), (2, 1.0)])
+
+        top.offer(2, 9.0)
+        top.offer(5, 4.0)  # Evicts 3, now the lowest member
+        self.assertEqual(top.ranking(), [(2, 9.0), (1, 5.0), (5, 4.0)])
+
+        for step in range(50):
+            top.offer(1, 10.0 + step)
+        self.assertEqual([post_id for post_id, _ in top.ranking()], [1, 2, 5])
+        self.assertLessEqual(len(top._heap), 4 * top.k + 1)
+
+class TestTrendingEngine(unittest.TestCase):
+    def setUp(self):
+        """Create an in-memory database for the scores table"""
+        self.engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(bind=self.engine)
+        self.SessionTesting = sessionmaker(bind=self.engine)
+        self.addCleanup(self.engine.dispose)
+        self.clock = Clock()
+
+    def make_engine(self, size=3):
+        return TrendingEngine(session_factory=self.SessionTesting, size=size, half_life=HALF_LIFE,
+                              sync_seconds=3600, clock=self.clock)
+
+    def test_recent_engagement_wins(self):
+        """Older events weigh half per half-life, comments three times a like"""
+        trending = self.make_engine()
+        for _ in range(4):
+            trending.record(1, LIKE, at=NOW - 2 * HALF_LIFE)
+        trending.record(2, LIKE, at=NOW)
+        trending.record(3, COMMENT, at=NOW - HALF_LIFE)
+
+        ranking = trending.top()
+        self.assertEqual([post_id for post_id, _ in ranking], [3, 1, 2])
+        self.assertAlmostEqual(ranking[0][1], 1.5)
+        self.assertAlmostEqual(ranking[1][1], 1.0)
+
+        # The same events read later have all lost weight but keep their order
+        self.clock.now += HALF_LIFE
+        self.assertEqual(trending.top(2), [(3, 0.75), (1, 0.5)])
+
+    def test_new_epoch_keeps_scores(self):
+        """Moving the landmark forward rescales scores without changing their heat"""
+        trending = self.make_engine()
+        trending.record(1, LIKE, at=NOW)
+        epoch = epoch_of(NOW, HALF_LIFE)
+
+        self.clock.now = (epoch + 1) * HALF_LIFE * EPOCH_HALF_LIVES
+        trending.record(2, LIKE)
+
+        half_lives = (self.clock.now - NOW) / HALF_LIFE
+        self.assertEqual(trending._epoch, epoch + 1)
+        self.assertEqual(trending.top(), [(2, 1.0), (1, 2.0 ** -half_lives)])
+
+    def test_sync_adds_up_processes_and_survives_restart(self):
+        """Two processes' increments are summed in the table, and a new process starts from it"""
+        first, second = self.make_engine(), self.make_engine()
+        first.record(1, LIKE, at=NOW)
+        second.record(1, LIKE, at=NOW)
+        second.record(2, COMMENT, at=NOW)
+        first.sync()
+        second.sync()
+        first.sync()
+
+        self.assertEqual(first.top(), [(2, 3.0), (1, 2.0)])
+        self.assertEqual(first._pending, {})
+
+        restarted = self.make_engine()
+        restarted.sync()
+        self.assertEqual(restarted.top(), [(2, 3.0), (1, 2.0)])
+
+    def test_sync_across_an_epoch_boundary(self):
+        """A process still in the previous epoch adds to rows already moved on, and vice versa"""
+        behind, ahead = self.make_engine(), self.make_engine()
+        behind.record(1, LIKE, at=NOW)
+        behind.sync()
+
+        self.clock.now = (epoch_of(NOW, HALF_LIFE) + 1) * HALF_LIFE * EPOCH_HALF_LIVES
+        ahead.record(1, LIKE)
+        ahead.sync()
+
+        half_lives = (self.clock.now - NOW) / HALF_LIFE
+        self.assertEqual(ahead.top(), [(1, 1.0 + 2.0 ** -half_lives)])
+        db = self.SessionTesting()
+        self.assertEqual(db.get(TrendingScore, 1).epoch, epoch_of(self.clock.now, HALF_LIFE))
+        db.close()
+
+    def test_failed_sync_keeps_increments(self):
+        """Increments that could not be written are retried at the next sync"""
+        trending = self.make_engine()
+        trending.record(1, LIKE, at=NOW)
+        trending.session_factory = lambda: (_ for _ in ()).throw(RuntimeError("database is down"))
+        trending.sync()
+        self.assertAlmostEqual(sum(trending._pending.values()), 2.0 ** 10)
+
+        trending.session_factory = self.SessionTesting
+        trending.sync()
+        self.assertEqual(trending.top(), [(1, 1.0)])
+
+    def test_retract_undoes_a_like(self):
+        """Liking and unliking over and over leaves the score where it was"""
+        trending = self.make_engine(size=1)
+        trending.record(1, LIKE, at=NOW)
+        trending.record(2, COMMENT, at=NOW - HALF_LIFE)
+        for step in range(10):
+            at = NOW - 60 * step
+            trending.record(2, LIKE, at=at)
+            trending.retract(2, LIKE, at=at)
+        [(post_id, score)] = trending.top()
+        self.assertEqual(post_id, 2)
+        self.assertAlmostEqual(score, 1.5)
+
+        # Dropping below a post outside the top brings that post in
+        trending.retract(2, COMMENT, at=NOW - HALF_LIFE)
+        self.assertEqual(trending.top(), [(1, 1.0)])
+
+        trending.sync()
+        db = self.SessionTesting()
+        self.assertAlmostEqual(db.get(TrendingScore, 2).score, 0.0)
+        db.close()
+
+    def test_discard(self):
+        trending = self.make_engine(size=1)
+        trending.record(1, COMMENT, at=NOW)
+        trending.record(2, LIKE, at=NOW)
+        trending.discard(1)
+        self.assertEqual(trending.top(), [(2, 1.0)])
+
+if __name__ == '__main__':
+    unittest.main()
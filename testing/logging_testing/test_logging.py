@@ -0,0 +1,119 @@
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import tempfile
+import unittest
+from Logging.logging import GzipRotatingFileHandler, JsonFormatter, ModuleLevelFilter, PROJECT_ROOT, _QueueHandler, _configure_library_loggers, _parse_levels
+
+def make_record(level=logging.INFO, pathname=None, msg="hello %s", args=("world",), **extra):
+    record = logging.LogRecord(
+        "trendconnect_logger", level, pathname or os.path.join(PROJECT_ROOT, "routes", "likes_routes.py"),
+        1, msg, args, None
+    )
+    record.__dict__.update(extra)
+    return record
+
+class TestJsonFormatter(unittest.TestCase):
+    def test_record_is_one_json_object_with_extras(self):
+        """Standard fields and extra fields land in one JSON line"""
+        line = JsonFormatter().format(make_record(status=201, duration_ms=3.5))
+
+        entry = json.loads(line)
+        self.assertEqual(entry["level"], "INFO")
+        self.assertEqual(entry["message"], "hello world")
+        self.assertEqual(entry["status"], 201)
+        self.assertEqual(entry["duration_ms"], 3.5)
+        self.assertNotIn("\n", line)
+
+class TestModuleLevelFilter(unittest.TestCase):
+    def test_most_specific_prefix_wins(self):
+        """Per-module levels override the default by dotted module prefix"""
+        level_filter = ModuleLevelFilter(logging.INFO, {"routes": logging.WARNING, "routes.likes_routes": logging.DEBUG})
+        tasks_file = os.path.join(PROJECT_ROOT, "tasks", "outbox_worker.py")
+        comments_file = os.path.join(PROJECT_ROOT, "routes", "comments_routes.py")
+
+        self.assertTrue(level_filter.filter(make_record(logging.DEBUG)))
+        self.assertFalse(level_filter.filter(make_record(logging.INFO, pathname=comments_file)))
+        self.assertTrue(level_filter.filter(make_record(logging.INFO, pathname=tasks_file)))
+        self.assertFalse(level_filter.filter(make_record(logging.DEBUG, pathname=tasks_file)))
+
+class TestLevelSettings(unittest.TestCase):
+    def test_invalid_level_is_reported(self):
+        """A misspelt level fails with the offending entry instead of a TypeError"""
+        self.assertEqual(_parse_levels("tasks=warning, routes=DEBUG"), {"tasks": logging.WARNING, "routes": logging.DEBUG})
+        with self.assertRaisesRegex(ValueError, "'tasks=LOUD'"):
+            _parse_levels("routes=DEBUG,tasks=LOUD")
+
+    def test_library_logger_reaches_the_queue(self):
+        """A library logger given a level also gets a handler, so its records are written"""
+        log_queue = queue.SimpleQueue()
+        library_logger = logging.getLogger("trendconnect_test.engine")
+        self.addCleanup(library_logger.handlers.clear)
+        _configure_library_loggers({"trendconnect_test.engine": logging.INFO}, _QueueHandler(log_queue))
+
+        logging.getLogger("trendconnect_test.engine.Engine").info("SELECT %s", 1)
+        logging.getLogger("trendconnect_test.engine").debug("hidden")
+
+        record = log_queue.get_nowait()
+        self.assertEqual((record.getMessage(), record.module_path), ("SELECT 1", "trendconnect_test.engine.Engine"))
+        self.assertTrue(log_queue.empty())
+
+class TestLoggingPipeline(unittest.TestCase):
+    def setUp(self):
+        self.log_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.log_dir.name, "app.log")
+
+    def tearDown(self):
+        self.log_dir.cleanup()
+
+    def test_queue_listener_writes_json_lines(self):
+        """Records are enqueued by the caller and written by the listener thread"""
+        log_queue = queue.SimpleQueue()
+        handler = GzipRotatingFileHandler(self.path, max_bytes=0, rotate_seconds=0, backup_count=2)
+        handler.setFormatter(JsonFormatter())
+        listener = logging.handlers.QueueListener(log_queue, handler)
+        listener.start()
+
+        queue_handler = _QueueHandler(log_queue)
+        queue_handler.handle(make_record())
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            queue_handler.handle(make_record(logging.ERROR, msg="failed", args=None, exc_info=sys.exc_info()))
+        listener.stop()
+        handler.close()
+
+        with open(self.path, encoding="utf-8") as log_file:
+            entries = [json.loads(line) for line in log_file]
+        self.assertEqual([entry["message"] for entry in entries], ["hello world", "failed"])
+        self.assertIn("ValueError: boom", entries[1]["exc"])
+
+    def test_rotation_gzips_and_prunes(self):
+        """Size based rotation compresses old files and keeps backup_count of them"""
+        handler = GzipRotatingFileHandler(self.path, max_bytes=200, rotate_seconds=0, backup_count=2)
+        handler.setFormatter(JsonFormatter())
+        for _ in range(30):
+            handler.handle(make_record())
+        handler.close()
+
+        self.assertEqual(sorted(os.listdir(self.log_dir.name)), ["app.log", "app.log.1.gz", "app.log.2.gz"])
+        with gzip.open(self.path + ".1.gz", "rt", encoding="utf-8") as rotated:
+            self.assertEqual(json.loads(rotated.readline())["message"], "hello world")
+
+    def test_time_based_rotation(self):
+        """A file older than the rotation interval is rolled over even when small"""
+        handler = GzipRotatingFileHandler(self.path, max_bytes=0, rotate_seconds=3600, backup_count=2)
+        handler.setFormatter(JsonFormatter())
+        handler.handle(make_record())
+        handler.rollover_at = 0
+        handler.handle(make_record())
+        handler.close()
+
+        self.assertEqual(sorted(os.listdir(self.log_dir.name)), ["app.log", "app.log.1.gz"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,17 +1,23 @@
 import unittest
+from datetime import datetime
 from unittest.mock import patch, MagicMock
-from fastapi import BackgroundTasks, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
 from core import models
+from core.database import Base
 from schemas.comments import CommentInput
-from routes.comments_routes import add_comment
-from tasks.comment_notify import notify_post_owner_background
+from tasks.comment_threads import comment_path
+from routes.comments_routes import add_comment, get_post_comments, get_comment_replies
 
 class TestCommentRoutes(unittest.TestCase):
     def setUp(self):
         """Set up test fixtures before each test method."""
         self.db = MagicMock(spec=Session)
-        self.background_tasks = BackgroundTasks()
+        patcher = patch("routes.comments_routes.notify_post_owner_background")
+        self.mock_notify = patcher.start()
+        self.addCleanup(patcher.stop)
         self.current_user = models.Registration(
             user_id=1,
             username="test_user"
@@ -37,13 +43,12 @@ class TestCommentRoutes(unittest.TestCase):
     def mock_db_success_scenario(self):
         """Helper method to set up successful database operation mocks."""
         self.db.query.return_value.filter.return_value.first.return_value = self.mock_post
-        self.db.add.return_value = None
+        # The insert assigns the comment id, which the comment's path is built from
+        self.db.add.side_effect = lambda x: isinstance(x, models.Comment) and setattr(x, "comment_id", 1)
         self.db.commit.return_value = None
         self.db.refresh.side_effect = lambda x: setattr(x, "comment_id", 1)
 
-    # Fix: Updated the patch path to target the correct module
-    @patch("tasks.comment_notify.notify_post_owner_background")
-    def test_add_comment_success(self, mock_notify):
+    def test_add_comment_success(self):
         """Test successful comment creation with all valid inputs."""
         # Arrange
         self.mock_db_success_scenario()
@@ -51,7 +56,6 @@ class TestCommentRoutes(unittest.TestCase):
         # Act
         response = add_comment(
             self.valid_comment_input,
-            self.background_tasks,
             self.db,
             self.current_user
         )
@@ -68,8 +72,8 @@ class TestCommentRoutes(unittest.TestCase):
         self.db.commit.assert_called_once()
         self.db.refresh.assert_called_once()
 
-        # Verify background task was added
-        self.assertEqual(len(self.background_tasks.tasks), 1)
+        # Verify the comment was recorded for the owner's digest
+        self.mock_notify.assert_called_once_with(1, "Test comment", 1, "test_user")
 
     def test_add_comment_post_not_found(self):
         """Test comment creation when post doesn't exist."""
@@ -80,7 +84,6 @@ class TestCommentRoutes(unittest.TestCase):
         with self.assertRaises(HTTPException) as context:
             add_comment(
                 self.valid_comment_input,
-                self.background_tasks,
                 self.db,
                 self.current_user
             )
@@ -90,8 +93,7 @@ class TestCommentRoutes(unittest.TestCase):
         self.db.add.assert_not_called()
         self.db.commit.assert_not_called()
 
-    @patch("tasks.comment_notify.notify_post_owner_background")
-    def test_add_comment_database_error(self, mock_notify):
+    def test_add_comment_database_error(self):
         """Test handling of database errors during comment creation."""
         # Arrange
         self.mock_db_success_scenario()
@@ -101,16 +103,14 @@ class TestCommentRoutes(unittest.TestCase):
         with self.assertRaises(Exception) as context:
             add_comment(
                 self.valid_comment_input,
-                self.background_tasks,
                 self.db,
                 self.current_user
             )
 
         self.assertEqual(str(context.exception), "Database error")
-        self.assertEqual(len(self.background_tasks.tasks), 0)
+        self.mock_notify.assert_not_called()
 
-    @patch("tasks.comment_notify.notify_post_owner_background")
-    def test_add_comment_with_long_comment(self, mock_notify):
+    def test_add_comment_with_long_comment(self):
         """Test adding a comment with maximum length."""
         # Arrange
         long_comment = "x" * 1000
@@ -123,7 +123,6 @@ class TestCommentRoutes(unittest.TestCase):
         # Act
         response = add_comment(
             comment_input,
-            self.background_tasks,
             self.db,
             self.current_user
         )
@@ -131,24 +130,111 @@ class TestCommentRoutes(unittest.TestCase):
         # Assert
         self.assertEqual(response["message"], "Comment added successfully")
         self.assertEqual(response["comment"]["user_comment"], long_comment)
-        self.assertEqual(len(self.background_tasks.tasks), 1)
+        self.mock_notify.assert_called_once()
 
-    # Fix: Updated test to verify background tasks directly instead of mock
-    def test_background_task_registration(self):
-        """Test that background task is properly registered."""
+    def test_comment_recorded_for_digest(self):
+        """Test that the comment is handed to the notification digest."""
         # Arrange
         self.mock_db_success_scenario()
         
         # Act
         add_comment(
             self.valid_comment_input,
-            self.background_tasks,
             self.db,
             self.current_user
         )
 
         # Assert
-        self.assertEqual(len(self.background_tasks.tasks), 1)
+        self.mock_notify.assert_called_once()
+
+class TestPostComments(unittest.TestCase):
+    def setUp(self):
+        """Create an in-memory database with one post and 12 comments"""
+        self.engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(bind=self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        self.addCleanup(self.engine.dispose)
+        self.addCleanup(self.db.close)
+
+        self.db.add(models.Registration(user_id=1, username="author", email="author@example.com"))
+        self.db.add(models.Content(c_id=1, user_id=1, username="author", title="Post", caption="Caption"))
+        # Two comments share a timestamp, so the walk relies on comment_id as tie-breaker
+        for i in range(12):
+            self.db.add(models.Comment(comment_id=i + 1, path=comment_path("", i + 1), user_id=1, post_id=1,
+                                       user_comment=f"comment {i}", created_at=datetime(2025, 1, 1, 0, min(i, 10))))
+        self.db.commit()
+        self.current_user = self.db.query(models.Registration).one()
+
+    def test_keyset_walk_oldest_first(self):
+        """Following next_cursor returns every comment once, in order"""
+        seen, cursor = [], None
+        while True:
+            page = get_post_comments(1, limit=5, cursor=cursor, db=self.db, current_user=self.current_user)
+            seen.extend(comment["user_comment"] for comment in page["comments"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        self.assertEqual(seen, [f"comment {i}" for i in range(12)])
+        self.assertEqual(page["comments"][0]["username"], "author")
+
+    def test_unknown_post(self):
+        with self.assertRaises(HTTPException) as context:
+            get_post_comments(99, limit=5, cursor=None, db=self.db, current_user=self.current_user)
+        self.assertEqual(context.exception.status_code, 404)
+
+    def reply(self, parent_id, text):
+        with patch("routes.comments_routes.notify_post_owner_background"):
+            return add_comment(CommentInput(post_id=1, user_comment=text, parent_id=parent_id), self.db, self.current_user)["comment"]
+
+    def test_replies_walk_thread_order(self):
+        """Replies at any depth come depth-first, siblings oldest first, across pages"""
+        root = self.db.query(models.Comment).filter_by(user_comment="comment 0").one()
+        a = self.reply(root.comment_id, "a")
+        b = self.reply(root.comment_id, "b")
+        a1 = self.reply(a["comment_id"], "a1")
+        a1x = self.reply(a1["comment_id"], "a1x")
+        self.reply(b["comment_id"], "b1")
+        # A reply in another thread stays out of this one
+        other = self.db.query(models.Comment).filter_by(user_comment="comment 1").one()
+        self.reply(other.comment_id, "elsewhere")
+        self.assertEqual(a1x["depth"], 3)
+
+        seen, cursor = [], None
+        while True:
+            page = get_comment_replies(root.comment_id, limit=2, cursor=cursor, db=self.db, current_user=self.current_user)
+            seen.extend((reply["user_comment"], reply["depth"]) for reply in page["replies"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        self.assertEqual(seen, [("a", 1), ("a1", 2), ("a1x", 3), ("b", 1), ("b1", 2)])
+
+        a_replies = get_comment_replies(a["comment_id"], limit=10, cursor=None, db=self.db, current_user=self.current_user)
+        self.assertEqual([reply["user_comment"] for reply in a_replies["replies"]], ["a1", "a1x"])
+
+    def test_top_level_with_reply_counts(self):
+        """The post's listing skips replies and counts every reply below each comment"""
+        root = self.db.query(models.Comment).filter_by(user_comment="comment 0").one()
+        child = self.reply(root.comment_id, "child")
+        self.reply(child["comment_id"], "grandchild")
+
+        page = get_post_comments(1, limit=50, cursor=None, db=self.db, current_user=self.current_user)
+        self.assertEqual([comment["user_comment"] for comment in page["comments"]], [f"comment {i}" for i in range(12)])
+        self.assertEqual(page["comments"][0]["reply_count"], 2)
+        self.assertEqual(page["comments"][1]["reply_count"], 0)
+        self.assertEqual(self.db.get(models.Content, 1).comments_count, 2)
+
+    def test_reply_to_other_post_rejected(self):
+        self.db.add(models.Content(c_id=2, user_id=1, username="author", title="Other", caption="Caption"))
+        self.db.commit()
+        root = self.db.query(models.Comment).filter_by(user_comment="comment 0").one()
+        with self.assertRaises(HTTPException) as context:
+            add_comment(CommentInput(post_id=2, user_comment="x", parent_id=root.comment_id), self.db, self.current_user)
+        self.assertEqual(context.exception.status_code, 404)
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
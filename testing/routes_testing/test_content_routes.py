@@ -1,16 +1,30 @@
+import json
 import unittest
 from unittest.mock import patch, MagicMock, Mock
-from fastapi import HTTPException, UploadFile, BackgroundTasks
-from sqlalchemy.orm import Session
+from fastapi import HTTPException, Request, Response, UploadFile
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
 from datetime import datetime
 from core import models
-from routes.content_routes import get_all_content, create_content, delete_content_by_id, get_content_by_username
+from core.cache import cache
+from core.database import Base
+from core.query_counter import assert_max_queries
+from core.trending import COMMENT, LIKE, TrendingEngine
+from schemas.content import ContentDetailResponse
+from routes.content_routes import get_all_content, create_content, delete_content_by_id, get_content_by_username, get_trending
+from tasks.deletecontent import delete_content_folder_background
 
 class TestContentRoutes(unittest.TestCase):
     def setUp(self):
         """Set up test fixtures before each test method."""
         self.db = MagicMock(spec=Session)
-        self.background_tasks = BackgroundTasks()
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.request = Request({"type": "http", "headers": []})
+        patcher = patch("routes.content_routes.io_executor")
+        self.executor = patcher.start()
+        self.addCleanup(patcher.stop)
         self.current_user = models.Registration(
             user_id=1,
             username="test_user"
@@ -42,7 +56,7 @@ class TestContentRoutes(unittest.TestCase):
         ]
 
     @patch("tasks.savecontent.save_content_to_folder_background")
-    @patch("tasks.notify_followers.notify_followers_background")
+    @patch("routes.content_routes.enqueue_new_post_notification")
     async def test_create_content_success(self, mock_notify, mock_save):
         """Test successful content creation."""
         # Arrange
@@ -59,7 +73,6 @@ class TestContentRoutes(unittest.TestCase):
 
         # Act
         response = await create_content(
-            background_tasks=self.background_tasks,
             username="test_user",
             title="Test Title",
             caption="Test Caption",
@@ -81,14 +94,14 @@ class TestContentRoutes(unittest.TestCase):
         # Arrange
         mock_contents = self.mock_db_content()
         self.db.query().count.return_value = len(mock_contents)
-        self.db.query().offset().limit().all.return_value = mock_contents
+        self.db.query().order_by().offset().limit().all.return_value = mock_contents
         
         # Mock likes and comments
         self.db.query(models.Likes).filter().count.return_value = 5
         self.db.query(models.Comment).filter().all.return_value = []
 
         # Act
-        response = get_all_content(page=1, db=self.db, current_user=self.current_user)
+        response = json.loads(get_all_content(self.request, Response(), page=1, db=self.db, current_user=self.current_user).body)
 
         # Assert
         self.assertIn("content", response)
@@ -98,6 +111,32 @@ class TestContentRoutes(unittest.TestCase):
         self.assertEqual(response["current_page"], 1)
         self.assertEqual(len(response["content"]), 6)
 
+    def test_get_all_content_not_modified(self):
+        """A current If-None-Match is answered with 304; a change to a post on the page yields a new ETag"""
+        mock_contents = self.mock_db_content()
+        self.db.query().count.return_value = len(mock_contents)
+        self.db.query().order_by().offset().limit().all.return_value = mock_contents
+        self.db.query(models.Likes).filter().count.return_value = 5
+        self.db.query(models.Comment).filter().all.return_value = []
+
+        first = Response()
+        get_all_content(self.request, first, page=1, db=self.db, current_user=self.current_user)
+        etag = first.headers["ETag"]
+        conditional = Request({"type": "http", "headers": [(b"if-none-match", etag.encode())]})
+
+        with patch("routes.content_routes._content_page") as mock_page:
+            response = get_all_content(conditional, Response(), page=1, db=self.db, current_user=self.current_user)
+            mock_page.assert_not_called()
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers["ETag"], etag)
+
+        cache.invalidate("post:3")
+        second = Response()
+        response = get_all_content(conditional, second, page=1, db=self.db, current_user=self.current_user)
+        self.assertEqual(len(json.loads(response.body)["content"]), 6)
+        self.assertEqual(response.headers["ETag"], second.headers["ETag"])
+        self.assertNotEqual(second.headers["ETag"], etag)
+
     def test_get_all_content_invalid_page(self):
         """Test getting content with invalid page number."""
         # Arrange
@@ -105,7 +144,7 @@ class TestContentRoutes(unittest.TestCase):
         
         # Act & Assert
         with self.assertRaises(HTTPException) as context:
-            get_all_content(page=2, db=self.db, current_user=self.current_user)
+            get_all_content(self.request, Response(), page=2, db=self.db, current_user=self.current_user)
         
         self.assertEqual(context.exception.status_code, 400)
         self.assertEqual(context.exception.detail, "Invalid choice of page")
@@ -115,27 +154,27 @@ class TestContentRoutes(unittest.TestCase):
         # Arrange
         mock_contents = self.mock_db_content(3)
         self.db.query().filter().count.return_value = len(mock_contents)
-        self.db.query().filter().offset().limit().all.return_value = mock_contents
+        self.db.query().filter().order_by().offset().limit().all.return_value = mock_contents
         
         # Mock likes and comments
         self.db.query(models.Likes).filter().count.return_value = 5
         self.db.query(models.Comment).filter().all.return_value = []
 
         # Act
-        response = get_content_by_username(
+        response = json.loads(get_content_by_username(
+            self.request, Response(),
             username="test_user",
             page=1,
             db=self.db,
             current_user=self.current_user
-        )
+        ).body)
 
         # Assert
         self.assertIn("content", response)
         self.assertEqual(len(response["content"]), 3)
         self.assertEqual(response["current_page"], 1)
 
-    @patch("tasks.deletecontent.delete_content_folder_background")
-    def test_delete_content_success(self, mock_delete):
+    def test_delete_content_success(self):
         """Test successful content deletion."""
         # Arrange
         self.db.query().filter().first.return_value = self.mock_content
@@ -144,8 +183,7 @@ class TestContentRoutes(unittest.TestCase):
         response = delete_content_by_id(
             id=1,
             db=self.db,
-            current_user=self.current_user,
-            background_tasks=self.background_tasks
+            current_user=self.current_user
         )
 
         # Assert
@@ -153,7 +191,7 @@ class TestContentRoutes(unittest.TestCase):
         self.assertEqual(response["id"], 1)
         self.db.delete.assert_called_once()
         self.db.commit.assert_called_once()
-        self.assertEqual(len(self.background_tasks.tasks), 1)
+        self.executor.submit.assert_called_once_with(delete_content_folder_background, "test_user", critical=True)
 
     def test_delete_content_not_found(self):
         """Test deletion of non-existent content."""
@@ -165,8 +203,7 @@ class TestContentRoutes(unittest.TestCase):
             delete_content_by_id(
                 id=999,
                 db=self.db,
-                current_user=self.current_user,
-                background_tasks=self.background_tasks
+                current_user=self.current_user
             )
 
         self.assertEqual(context.exception.status_code, 404)
@@ -183,12 +220,111 @@ class TestContentRoutes(unittest.TestCase):
             delete_content_by_id(
                 id=1,
                 db=self.db,
-                current_user=self.current_user,
-                background_tasks=self.background_tasks
+                current_user=self.current_user
             )
 
         self.assertEqual(context.exception.status_code, 403)
         self.assertEqual(context.exception.detail, "Not authorized to delete this content")
 
+class TestContentListingRows(unittest.TestCase):
+    def setUp(self):
+        """Create an in-memory database with one author, three posts and some comments"""
+        self.engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(bind=self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.addCleanup(self.engine.dispose)
+        self.addCleanup(self.db.close)
+
+        self.db.add(models.Registration(user_id=1, username="author", email="author@example.com"))
+        self.db.add(models.Registration(user_id=2, username="viewer", email="viewer@example.com"))
+        for i in range(1, 4):
+            self.db.add(models.Content(c_id=i, user_id=1, username="author", title=f"Post {i}", caption="Caption",
+                                       file=f"post_{i}.jpg", created_at=datetime(2025, 1, i), likes_count=i))
+        for i in range(5):
+            self.db.add(models.Comment(user_id=2, post_id=1, user_comment=f"comment {i}", created_at=datetime(2025, 2, 1, 0, i)))
+        self.db.add(models.Comment(user_id=2, post_id=2, user_comment="only"))
+        self.db.query(models.Content).filter_by(c_id=1).update({"comments_count": 5})
+        self.db.query(models.Content).filter_by(c_id=2).update({"comments_count": 1})
+        self.db.add(models.Likes(user_id=2, post_id=2))
+        self.db.commit()
+        self.viewer = self.db.query(models.Registration).filter_by(user_id=2).one()
+
+    def test_rows_match_content_detail_response(self):
+        """Entries built from column tuples carry exactly the fields and encoding of ContentDetailResponse"""
+        with assert_max_queries(6):
+            response = get_content_by_username(
+                Request({"type": "http", "headers": []}), Response(),
+                username="author", page=1, db=self.db, current_user=self.viewer
+            )
+
+        self.assertEqual(response.media_type, "application/json")
+        body = json.loads(response.body)
+        self.assertEqual(body["total_content"], 3)
+        # Newest first
+        self.assertEqual([post["c_id"] for post in body["content"]], [3, 2, 1])
+        first = body["content"][2]
+        self.assertEqual(set(first), set(ContentDetailResponse.model_fields))
+        self.assertEqual(first["created_at"], "2025-01-01T00:00:00")
+        # Only the oldest comments are embedded, next to the total
+        self.assertEqual(first["comments"], ["comment 0", "comment 1", "comment 2"])
+        self.assertEqual(first["comments_count"], 5)
+        self.assertEqual(body["content"][1]["comments"], ["only"])
+        self.assertEqual(body["content"][0]["comments"], [])
+        self.assertEqual(first["total_likes"], 1)
+        self.assertEqual([post["liked_by_viewer"] for post in body["content"]], [False, True, False])
+        self.assertFalse(first["following_author"])
+        self.assertEqual(ContentDetailResponse(**first).title, "Post 1")
+
+    def test_same_day_posts_ordered_by_time(self):
+        """Posts of one day come newest first, and a user's posts are sought through the composite index"""
+        self.db.add(models.Content(c_id=4, user_id=1, username="author", title="Morning", caption="",
+                                   created_at=datetime(2025, 1, 3, 8, 0)))
+        self.db.add(models.Content(c_id=5, user_id=1, username="author", title="Evening", caption="",
+                                   created_at=datetime(2025, 1, 3, 20, 0)))
+        self.db.commit()
+
+        response = get_content_by_username(
+            Request({"type": "http", "headers": []}), Response(),
+            username="author", page=1, db=self.db, current_user=self.viewer
+        )
+        self.assertEqual([post["c_id"] for post in json.loads(response.body)["content"]], [5, 4, 3, 2, 1])
+
+        plan = " ".join(str(row) for row in self.db.execute(text(
+            "EXPLAIN QUERY PLAN SELECT c_id FROM content WHERE user_id = 1 ORDER BY created_at DESC, c_id LIMIT 6"
+        )))
+        self.assertIn("ix_content_user_created_at_id", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_unknown_username(self):
+        response = get_content_by_username(
+            Request({"type": "http", "headers": []}), Response(),
+            username="nobody", page=1, db=self.db, current_user=self.viewer
+        )
+        body = json.loads(response.body)
+        self.assertEqual((body["content"], body["total_content"]), ([], 0))
+
+    def test_trending_in_ranking_order(self):
+        """Trending posts come hottest first with their decayed score; deleted posts are skipped"""
+        now = 1_800_000_000
+        trending = TrendingEngine(session_factory=None, size=5, half_life=3600, clock=lambda: now)
+        trending.record(1, COMMENT, at=now - 3 * 3600)
+        trending.record(2, LIKE, at=now - 3600)
+        trending.record(3, LIKE, at=now)
+        trending.record(99, COMMENT, at=now)
+
+        with patch("routes.content_routes.trending", trending):
+            response = get_trending(Response(), limit=5, db=self.db, current_user=self.viewer)
+
+        content = json.loads(response.body)["content"]
+        self.assertEqual([(post["c_id"], post["trending_score"]) for post in content], [(3, 1.0), (2, 0.5), (1, 0.375)])
+        self.assertEqual(content[1]["liked_by_viewer"], True)
+        self.assertEqual(content[0]["comments_count"], 0)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
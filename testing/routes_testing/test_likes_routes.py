@@ -1,42 +1,44 @@
+import os
+import tempfile
+import threading
 import unittest
+from datetime import datetime
 from unittest.mock import Mock, patch
-from fastapi import HTTPException, BackgroundTasks
-from sqlalchemy.orm import Session
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
 
 from core import models
+from core.database import Base
+from core.trending import LIKE, timestamp_of
 from schemas.likes import LikeInput
 from routes.likes_routes import manage_likes  # Updated import path
 
+LIKED_AT = datetime(2026, 10, 19, 12, 0, 0)
+
 class TestLikeEndpoint(unittest.TestCase):
     def setUp(self):
         """Set up test cases"""
         self.db = Mock(spec=Session)
+        self.db.get_bind.return_value.dialect.name = "sqlite"
         self.current_user = Mock()
         self.current_user.user_id = 1
         self.current_user.username = "testuser"
-        self.background_tasks = Mock(spec=BackgroundTasks)
+        patcher = patch('routes.likes_routes.io_executor')
+        self.executor = patcher.start()
+        self.addCleanup(patcher.stop)
 
-    @patch('routes.likes_routes.models.Content')  # Updated patch path
-    @patch('routes.likes_routes.models.Likes')    # Updated patch path
-    def test_like_post_success(self, mock_likes_model, mock_content_model):
+    def test_like_post_success(self):
         """Test successful post like"""
         # Arrange
         like_input = LikeInput(post_id=1, dir=1)
-        
-        # Mock the database queries
-        mock_post = Mock()
-        mock_post.c_id = 1
-        mock_post.owner_id = 2
-        
-        # Set up the chain of mock returns
-        self.db.query.return_value.filter.return_value.first.side_effect = [
-            mock_post,  # Post exists
-            None        # Like doesn't exist yet
-        ]
+
+        # INSERT ... RETURNING gives a row, UPDATE ... RETURNING the new counter
+        self.db.execute.return_value.first.return_value = Mock(post_id=1, created_at=LIKED_AT)
+        self.db.execute.return_value.scalar.return_value = 1
 
         # Act
         result = manage_likes(
-            background_tasks=self.background_tasks,
             like=like_input,
             db=self.db,
             current_user=self.current_user
@@ -44,32 +46,21 @@ class TestLikeEndpoint(unittest.TestCase):
 
         # Assert
         self.assertEqual(result, {"message": "Post liked successfully"})
-        self.db.add.assert_called_once()
+        self.assertEqual(self.db.execute.call_count, 2)
         self.db.commit.assert_called_once()
-        self.background_tasks.add_task.assert_called_once()
+        self.executor.submit.assert_called_once()
 
-    @patch('routes.likes_routes.models.Content')  # Updated patch path
-    @patch('routes.likes_routes.models.Likes')    # Updated patch path
-    def test_unlike_post_success(self, mock_likes_model, mock_content_model):
+    @patch('routes.likes_routes.trending')
+    def test_unlike_post_success(self, mock_trending):
         """Test successful post unlike"""
         # Arrange
         like_input = LikeInput(post_id=1, dir=0)
-        
-        mock_post = Mock()
-        mock_post.c_id = 1
-        
-        mock_like = Mock()
-        mock_like.user_id = self.current_user.user_id
-        mock_like.post_id = like_input.post_id
 
-        self.db.query.return_value.filter.return_value.first.side_effect = [
-            mock_post,  # Post exists
-            mock_like   # Like exists
-        ]
+        self.db.execute.return_value.first.return_value = Mock(post_id=1, created_at=LIKED_AT)
+        self.db.execute.return_value.scalar.return_value = 0
 
         # Act
         result = manage_likes(
-            background_tasks=self.background_tasks,
             like=like_input,
             db=self.db,
             current_user=self.current_user
@@ -77,20 +68,41 @@ class TestLikeEndpoint(unittest.TestCase):
 
         # Assert
         self.assertEqual(result, {"message": "Post unliked successfully"})
-        self.db.delete.assert_called_once_with(mock_like)
+        self.assertEqual(self.db.execute.call_count, 2)
         self.db.commit.assert_called_once()
+        self.executor.submit.assert_not_called()
+        # The like's trending weight is taken back as of when it was made
+        mock_trending.retract.assert_called_once_with(1, LIKE, at=timestamp_of(LIKED_AT))
+
+    def test_like_single_statement_on_postgres(self):
+        """Test the like and counter update run as one statement on PostgreSQL"""
+        # Arrange
+        self.db.get_bind.return_value.dialect.name = "postgresql"
+        like_input = LikeInput(post_id=1, dir=1)
+        self.db.execute.return_value.first.return_value = (3, LIKED_AT)
 
-    @patch('routes.likes_routes.models.Content')  # Updated patch path
-    def test_like_nonexistent_post(self, mock_content_model):
+        # Act
+        result = manage_likes(
+            like=like_input,
+            db=self.db,
+            current_user=self.current_user
+        )
+
+        # Assert
+        self.assertEqual(result, {"message": "Post liked successfully"})
+        self.db.execute.assert_called_once()
+        self.db.commit.assert_called_once()
+
+    def test_like_nonexistent_post(self):
         """Test liking a post that doesn't exist"""
         # Arrange
         like_input = LikeInput(post_id=999, dir=1)
+        self.db.execute.return_value.first.return_value = None
         self.db.query.return_value.filter.return_value.first.return_value = None
 
         # Act & Assert
         with self.assertRaises(HTTPException) as context:
             manage_likes(
-                background_tasks=self.background_tasks,
                 like=like_input,
                 db=self.db,
                 current_user=self.current_user
@@ -98,30 +110,18 @@ class TestLikeEndpoint(unittest.TestCase):
         
         self.assertEqual(context.exception.status_code, 404)
         self.assertEqual(context.exception.detail, "No post found")
+        self.db.commit.assert_not_called()
 
-    @patch('routes.likes_routes.models.Content')  # Updated patch path
-    @patch('routes.likes_routes.models.Likes')    # Updated patch path
-    def test_like_already_liked_post(self, mock_likes_model, mock_content_model):
+    def test_like_already_liked_post(self):
         """Test liking a post that's already been liked"""
         # Arrange
         like_input = LikeInput(post_id=1, dir=1)
-        
-        mock_post = Mock()
-        mock_post.c_id = 1
-        
-        mock_existing_like = Mock()
-        mock_existing_like.user_id = self.current_user.user_id
-        mock_existing_like.post_id = like_input.post_id
-
-        self.db.query.return_value.filter.return_value.first.side_effect = [
-            mock_post,           # Post exists
-            mock_existing_like   # Like already exists
-        ]
+        self.db.execute.return_value.first.return_value = None  # ON CONFLICT DO NOTHING
+        self.db.query.return_value.filter.return_value.first.return_value = (1,)  # Post exists
 
         # Act & Assert
         with self.assertRaises(HTTPException) as context:
             manage_likes(
-                background_tasks=self.background_tasks,
                 like=like_input,
                 db=self.db,
                 current_user=self.current_user
@@ -129,26 +129,18 @@ class TestLikeEndpoint(unittest.TestCase):
         
         self.assertEqual(context.exception.status_code, 409)
         self.assertEqual(context.exception.detail, "Post already liked")
+        self.executor.submit.assert_not_called()
 
-    @patch('routes.likes_routes.models.Content')  # Updated patch path
-    @patch('routes.likes_routes.models.Likes')    # Updated patch path
-    def test_unlike_not_liked_post(self, mock_likes_model, mock_content_model):
+    def test_unlike_not_liked_post(self):
         """Test unliking a post that hasn't been liked"""
         # Arrange
         like_input = LikeInput(post_id=1, dir=0)
-        
-        mock_post = Mock()
-        mock_post.c_id = 1
-
-        self.db.query.return_value.filter.return_value.first.side_effect = [
-            mock_post,  # Post exists
-            None        # Like doesn't exist
-        ]
+        self.db.execute.return_value.first.return_value = None  # Nothing deleted
+        self.db.query.return_value.filter.return_value.first.return_value = (1,)  # Post exists
 
         # Act & Assert
         with self.assertRaises(HTTPException) as context:
             manage_likes(
-                background_tasks=self.background_tasks,
                 like=like_input,
                 db=self.db,
                 current_user=self.current_user
@@ -157,5 +149,139 @@ class TestLikeEndpoint(unittest.TestCase):
         self.assertEqual(context.exception.status_code, 404)
         self.assertEqual(context.exception.detail, "No like found")
 
+    @patch('routes.likes_routes.WRITE_BEHIND_ENABLED', True)
+    @patch('routes.likes_routes.like_buffer')
+    def test_write_behind_like_is_buffered(self, mock_buffer):
+        """Test write-behind mode queues the like instead of writing it"""
+        # Arrange
+        like_input = LikeInput(post_id=1, dir=1)
+        mock_buffer.pending_state.return_value = None
+        row = Mock()
+        row.like_id = None
+        self.db.query.return_value.outerjoin.return_value.filter.return_value.first.return_value = row
+
+        # Act
+        result = manage_likes(
+            like=like_input,
+            db=self.db,
+            current_user=self.current_user
+        )
+
+        # Assert
+        self.assertEqual(result, {"message": "Post liked successfully"})
+        mock_buffer.record.assert_called_once_with(1, 1, 1)
+        self.db.execute.assert_not_called()
+        self.db.commit.assert_not_called()
+
+    @patch('routes.likes_routes.WRITE_BEHIND_ENABLED', True)
+    @patch('routes.likes_routes.like_buffer')
+    def test_write_behind_reads_own_pending_like(self, mock_buffer):
+        """Test a buffered like is seen by the same user's next request"""
+        # Arrange
+        like_input = LikeInput(post_id=1, dir=1)
+        mock_buffer.pending_state.return_value = 1
+
+        # Act & Assert
+        with self.assertRaises(HTTPException) as context:
+            manage_likes(
+                like=like_input,
+                db=self.db,
+                current_user=self.current_user
+            )
+
+        self.assertEqual(context.exception.status_code, 409)
+        self.db.query.assert_not_called()
+        mock_buffer.record.assert_not_called()
+
+class TestConcurrentLikes(unittest.TestCase):
+    CLIENTS = 16
+
+    def setUp(self):
+        """Create a file-backed database so every client gets its own connection"""
+        handle, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        self.engine = create_engine(
+            f"sqlite:///{self.db_path}",
+            connect_args={"check_same_thread": False, "timeout": 30}
+        )
+        Base.metadata.create_all(bind=self.engine)
+        self.SessionTesting = sessionmaker(bind=self.engine)
+
+        db = self.SessionTesting()
+        db.add(models.Registration(user_id=1, username="owner", email="owner@example.com"))
+        for i in range(2, 2 + self.CLIENTS):
+            db.add(models.Registration(user_id=i, username=f"fan{i}", email=f"fan{i}@example.com"))
+        db.add(models.Content(c_id=1, user_id=1, username="owner", title="Viral", caption="Post"))
+        db.commit()
+        db.close()
+
+        # Notification tasks would run against the application database
+        patcher = patch('routes.likes_routes.io_executor')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.engine.dispose()
+        os.remove(self.db_path)
+
+    def _run_clients(self, user_ids, direction):
+        """Calls manage_likes from one thread per user id, all released at once"""
+        barrier = threading.Barrier(len(user_ids))
+        outcomes = []
+
+        def client(user_id):
+            user = Mock()
+            user.user_id = user_id
+            user.username = f"fan{user_id}"
+            db = self.SessionTesting()
+            try:
+                barrier.wait()
+                manage_likes(
+                    like=LikeInput(post_id=1, dir=direction),
+                    db=db,
+                    current_user=user
+                )
+                outcomes.append(201)
+            except HTTPException as e:
+                outcomes.append(e.status_code)
+            finally:
+                db.close()
+
+        threads = [threading.Thread(target=client, args=(user_id,)) for user_id in user_ids]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return outcomes
+
+    def _state(self):
+        db = self.SessionTesting()
+        try:
+            rows = db.query(models.Likes).filter(models.Likes.post_id == 1).count()
+            counter = db.query(models.Content.likes_count).filter(models.Content.c_id == 1).scalar()
+            return rows, counter
+        finally:
+            db.close()
+
+    @patch('routes.likes_routes.logger')
+    def test_double_tap_creates_one_like(self, mock_logger):
+        """The same user liking from many clients at once produces exactly one like"""
+        outcomes = self._run_clients([2] * self.CLIENTS, 1)
+
+        self.assertEqual(outcomes.count(201), 1)
+        self.assertEqual(outcomes.count(409), self.CLIENTS - 1)
+        self.assertEqual(self._state(), (1, 1))
+
+    @patch('routes.likes_routes.logger')
+    def test_many_users_keep_counter_exact(self, mock_logger):
+        """Concurrent likes and unlikes from distinct users keep the counter equal to the rows"""
+        user_ids = list(range(2, 2 + self.CLIENTS))
+        self.assertEqual(self._run_clients(user_ids, 1), [201] * self.CLIENTS)
+        self.assertEqual(self._state(), (self.CLIENTS, self.CLIENTS))
+
+        half = user_ids[: self.CLIENTS // 2]
+        self.assertEqual(self._run_clients(half, 0), [201] * len(half))
+        self.assertEqual(self._state(), (self.CLIENTS - len(half), self.CLIENTS - len(half)))
+
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
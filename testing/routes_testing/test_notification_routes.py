@@ -0,0 +1,147 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from core.database import Base
+from core.models import Registration, Content, Follows, Notification, NotificationOutbox
+from core.query_counter import assert_max_queries
+from schemas.comments import CommentInput
+from schemas.follow import FollowRequest
+from schemas.notifications import MarkReadRequest, NotificationPreferences
+from routes.comments_routes import add_comment
+from routes.content_routes import delete_content_by_id
+from routes.follow_routes import follow_user
+from routes.notification_routes import get_notifications, get_unread_count, read_notifications, update_notification_preferences
+from routes.user_routes import delete_user
+from tasks.notification_digest import NotificationDigest
+from tasks.notifications import COMMENT, FOLLOW, LIKE, add_notification
+from tasks.notify_user import notify_post_owner_background
+from tasks.notify_followers import NEW_POST_EMAIL, fan_out_new_post
+
+class TestNotificationRoutes(unittest.TestCase):
+    def setUp(self):
+        """User 1 owns post 10; users 2 and 3 interact with it"""
+        self.engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool
+        )
+        # Enforce foreign keys like PostgreSQL does
+        event.listen(self.engine, "connect", lambda dbapi_connection, _: dbapi_connection.execute("PRAGMA foreign_keys=ON"))
+        Base.metadata.create_all(bind=self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+
+        for user_id in (1, 2, 3):
+            self.db.add(Registration(user_id=user_id, username=f"user{user_id}", email=f"user{user_id}@example.com"))
+        self.db.add(Content(c_id=10, user_id=1, username="user1", title="Sunset", caption="A"))
+        self.db.commit()
+
+        self.owner = self.db.get(Registration, 1)
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+
+    def as_user(self, user_id):
+        return self.db.get(Registration, user_id)
+
+    def like(self, post_id, *actor_ids):
+        """Likes reach the inbox the way the like route sends them: through the digest flush"""
+        digest = NotificationDigest(session_factory=sessionmaker(bind=self.engine), window_seconds=3600)
+        with patch('tasks.notify_user.notification_digest', digest), patch('tasks.notification_digest.logger'):
+            for actor_id in actor_ids:
+                notify_post_owner_background(post_id, actor_id, f"user{actor_id}")
+            digest.flush()
+
+    @patch('routes.notification_routes.logger')
+    @patch('routes.comments_routes.notify_post_owner_background')
+    @patch('routes.comments_routes.logger')
+    @patch('routes.follow_routes.logger')
+    def test_events_fill_inbox_and_counter(self, mock_follow_logger, mock_comment_logger, mock_digest, mock_logger):
+        """Follows, comments and likes create notifications and bump the unread counter"""
+        follow_user(request=FollowRequest(user_id=1), current_user=self.as_user(2), db=self.db)
+        add_comment(CommentInput(post_id=10, user_comment="Lovely"), self.db, self.as_user(3))
+        self.db.commit()
+        self.like(10, 3, 1)  # The owner's own like is not notified
+        self.db.refresh(self.owner)
+
+        self.assertEqual(get_unread_count(current_user=self.owner), {"unread_count": 3})
+        page = get_notifications(limit=30, cursor=None, db=self.db, current_user=self.owner)
+        self.assertEqual(
+            [(item["kind"], item["actor_username"]) for item in page["notifications"]],
+            [("like", "user3"), ("comment", "user3"), ("follow", "user2")]
+        )
+        self.assertEqual(page["notifications"][1]["text"], "Lovely")
+        self.assertEqual(page["unread_count"], 3)
+
+    @patch('routes.notification_routes.logger')
+    def test_pagination_single_query_per_page(self, mock_logger):
+        """Pages follow the cursor, each fetched with one joined query"""
+        for _ in range(5):
+            add_notification(self.db, 1, 2, COMMENT, 10, "Nice")
+        self.db.commit()
+        self.db.refresh(self.owner)  # As loaded by get_current_user
+
+        with assert_max_queries(1):
+            first = get_notifications(limit=3, cursor=None, db=self.db, current_user=self.owner)
+        second = get_notifications(limit=3, cursor=first["next_cursor"], db=self.db, current_user=self.owner)
+
+        ids = [item["id"] for item in first["notifications"] + second["notifications"]]
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertEqual(len(set(ids)), 5)
+        self.assertIsNone(second["next_cursor"])
+
+    @patch('routes.notification_routes.logger')
+    def test_mark_read_keeps_counter_exact(self, mock_logger):
+        """Marking read lowers the counter only for rows that were unread"""
+        self.like(10, 2, 3)
+        add_notification(self.db, 1, 2, COMMENT, 10, "Nice")
+        self.db.commit()
+        first_id = self.db.query(Notification.id).order_by(Notification.id).first()[0]
+
+        result = read_notifications(request=MarkReadRequest(ids=[first_id]), db=self.db, current_user=self.owner)
+        self.assertEqual(result, {"marked_read": 1, "unread_count": 2})
+        result = read_notifications(request=MarkReadRequest(ids=[first_id]), db=self.db, current_user=self.owner)
+        self.assertEqual(result, {"marked_read": 0, "unread_count": 2})
+        result = read_notifications(request=MarkReadRequest(), db=self.db, current_user=self.owner)
+        self.assertEqual(result, {"marked_read": 2, "unread_count": 0})
+
+    @patch('routes.notification_routes.logger')
+    def test_new_post_emails_respect_preference(self, mock_logger):
+        """Every follower gets an in-app notification, only opted-in followers get email"""
+        self.db.add(Follows(follower_id=2, following_id=1))
+        self.db.add(Follows(follower_id=3, following_id=1))
+        self.db.commit()
+        update_notification_preferences(NotificationPreferences(email_notifications=False), db=self.db, current_user=self.as_user(3))
+
+        self.assertEqual(fan_out_new_post(self.db, {"c_id": 10}), 1)
+        self.db.commit()
+
+        emails = self.db.query(NotificationOutbox).filter(NotificationOutbox.kind == NEW_POST_EMAIL).all()
+        self.assertEqual([entry.payload["to_email"] for entry in emails], ["user2@example.com"])
+        self.assertEqual(
+            sorted(self.db.query(Notification.user_id).filter(Notification.kind == "new_post").all()),
+            [(2,), (3,)]
+        )
+        self.assertEqual([user.unread_notifications for user in self.db.query(Registration).order_by(Registration.user_id)], [0, 1, 1])
+
+    @patch('routes.user_routes.io_executor')
+    @patch('routes.content_routes.io_executor')
+    @patch('routes.content_routes.logger')
+    def test_deleting_posts_and_users_keeps_notifications_consistent(self, mock_logger, mock_content_executor, mock_user_executor):
+        """A deleted post or actor leaves its notifications in place; a deleted recipient takes them along"""
+        add_notification(self.db, 1, 3, LIKE, 10)
+        add_notification(self.db, 3, 2, FOLLOW)
+        self.db.commit()
+
+        delete_content_by_id(id=10, db=self.db, current_user=self.owner)
+        self.assertEqual(self.db.query(Notification.user_id, Notification.post_id).filter(Notification.kind == LIKE).all(), [(1, None)])
+
+        asyncio.run(delete_user(user_id=3, db=self.db, current_user=self.as_user(3)))
+        self.assertEqual(self.db.query(Notification.user_id, Notification.actor_id, Notification.kind).all(), [(1, None, LIKE)])
+
+if __name__ == '__main__':
+    unittest.main()
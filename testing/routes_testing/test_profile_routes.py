@@ -1,18 +1,30 @@
+import asyncio
+import json
 import unittest
 from unittest.mock import Mock, patch
 from datetime import datetime
-from fastapi import HTTPException
+from fastapi import HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 
+from core.cache import cache, invalidate_after_commit
+from core.database import Base
+from core.query_counter import assert_max_queries
 from core.models import Registration, Content, Likes, Comment, Follows
 from schemas.profile import UserProfileResponse, ContentDetailResponse
 from routes.profile_routes import profile_login, get_followers, get_following
+from utils.pagination import decode_cursor
 
 class TestProfileRoutes(unittest.TestCase):
     def setUp(self):
         """Set up test cases"""
         self.db = Mock(spec=Session)
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.request = Request({"type": "http", "headers": []})
         self.mock_user = Mock(spec=Registration)
         self.mock_user.user_id = 1
         self.mock_user.username = "testuser"
@@ -85,26 +97,55 @@ class TestProfileRoutes(unittest.TestCase):
     def test_get_followers_success(self):
         """Test successful retrieval of followers"""
         # Arrange
-        mock_follower = Mock(spec=Follows)
-        mock_follower.follower_id = 2
-        mock_follower.followed_at = datetime.now()
+        mock_row = Mock()
+        mock_row.username = "follower1"
+        mock_row.followed_at = datetime.now()
+        mock_row.id = 7
 
-        mock_follower_user = Mock(spec=Registration)
-        mock_follower_user.username = "follower1"
-
-        self.db.query.return_value.filter.return_value.first.side_effect = [
-            self.mock_user,  # User query
-            mock_follower_user,  # Follower user query
-        ]
-        self.db.query.return_value.filter.return_value.all.return_value = [mock_follower]
+        self.db.query.return_value.filter.return_value.first.return_value = self.mock_user
+        self.db.query.return_value.join.return_value.filter.return_value.order_by.return_value.limit.return_value.all.return_value = [mock_row]
 
         # Act
-        result = get_followers(username="testuser", db=self.db)
+        result = get_followers(self.request, Response(), username="testuser", limit=50, cursor=None, format="json", db=self.db)
 
         # Assert
         self.assertTrue("followers" in result)
         self.assertEqual(len(result["followers"]), 1)
         self.assertEqual(result["followers"][0]["username"], "follower1")
+        self.assertIsNone(result["next_cursor"])
+
+    def test_get_followers_next_cursor(self):
+        """Test a full page of followers returns a cursor for the next page"""
+        # Arrange
+        rows = []
+        for i in range(3):
+            mock_row = Mock()
+            mock_row.username = f"follower{i}"
+            mock_row.followed_at = datetime(2025, 1, 10 - i)
+            mock_row.id = 10 - i
+            rows.append(mock_row)
+
+        self.db.query.return_value.filter.return_value.first.return_value = self.mock_user
+        self.db.query.return_value.join.return_value.filter.return_value.order_by.return_value.limit.return_value.all.return_value = rows
+
+        # Act
+        result = get_followers(self.request, Response(), username="testuser", limit=2, cursor=None, format="json", db=self.db)
+
+        # Assert
+        self.assertEqual(len(result["followers"]), 2)
+        self.assertEqual(decode_cursor(result["next_cursor"]), (datetime(2025, 1, 9), 9))
+
+    def test_get_followers_invalid_cursor(self):
+        """Test a malformed cursor is rejected"""
+        # Arrange
+        self.db.query.return_value.filter.return_value.first.return_value = self.mock_user
+
+        # Act & Assert
+        with self.assertRaises(HTTPException) as context:
+            get_followers(self.request, Response(), username="testuser", limit=50, cursor="not-a-cursor", format="json", db=self.db)
+
+        self.assertEqual(context.exception.status_code, 400)
+        self.assertEqual(context.exception.detail, "Invalid cursor")
 
     def test_get_followers_user_not_found(self):
         """Test get followers with non-existent user"""
@@ -113,7 +154,7 @@ class TestProfileRoutes(unittest.TestCase):
 
         # Act & Assert
         with self.assertRaises(HTTPException) as context:
-            get_followers(username="nonexistent", db=self.db)
+            get_followers(self.request, Response(), username="nonexistent", db=self.db)
         
         self.assertEqual(context.exception.status_code, 404)
         self.assertEqual(context.exception.detail, "User not found")
@@ -121,21 +162,16 @@ class TestProfileRoutes(unittest.TestCase):
     def test_get_following_success(self):
         """Test successful retrieval of following users"""
         # Arrange
-        mock_following = Mock(spec=Follows)
-        mock_following.following_id = 2
-        mock_following.followed_at = datetime.now()
-
-        mock_followed_user = Mock(spec=Registration)
-        mock_followed_user.username = "followed1"
+        mock_row = Mock()
+        mock_row.username = "followed1"
+        mock_row.followed_at = datetime.now()
+        mock_row.id = 3
 
-        self.db.query.return_value.filter.return_value.first.side_effect = [
-            self.mock_user,  # User query
-            mock_followed_user,  # Followed user query
-        ]
-        self.db.query.return_value.filter.return_value.all.return_value = [mock_following]
+        self.db.query.return_value.filter.return_value.first.return_value = self.mock_user
+        self.db.query.return_value.join.return_value.filter.return_value.order_by.return_value.limit.return_value.all.return_value = [mock_row]
 
         # Act
-        result = get_following(username="testuser", db=self.db)
+        result = get_following(self.request, Response(), username="testuser", limit=50, cursor=None, format="json", db=self.db)
 
         # Assert
         self.assertTrue("following" in result)
@@ -149,7 +185,7 @@ class TestProfileRoutes(unittest.TestCase):
 
         # Act & Assert
         with self.assertRaises(HTTPException) as context:
-            get_following(username="nonexistent", db=self.db)
+            get_following(self.request, Response(), username="nonexistent", db=self.db)
         
         self.assertEqual(context.exception.status_code, 404)
         self.assertEqual(context.exception.detail, "User not found")
@@ -158,14 +194,130 @@ class TestProfileRoutes(unittest.TestCase):
         """Test get following when user isn't following anyone"""
         # Arrange
         self.db.query.return_value.filter.return_value.first.return_value = self.mock_user
-        self.db.query.return_value.filter.return_value.all.return_value = []
+        self.db.query.return_value.join.return_value.filter.return_value.order_by.return_value.limit.return_value.all.return_value = []
 
         # Act & Assert
         with self.assertRaises(HTTPException) as context:
-            get_following(username="testuser", db=self.db)
+            get_following(self.request, Response(), username="testuser", limit=50, cursor=None, format="json", db=self.db)
         
         self.assertEqual(context.exception.status_code, 404)
         self.assertEqual(context.exception.detail, "Not following anyone")
 
+class TestProfileLoginQueries(unittest.TestCase):
+    def setUp(self):
+        """Create an in-memory database where one user has five liked posts"""
+        self.engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(bind=self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+
+        self.db.add(Registration(user_id=1, username="creator", email="creator@example.com", password="hashed"))
+        for i in range(1, 6):
+            self.db.add(Content(c_id=i, user_id=1, username="creator", title=f"Post {i}", caption="A",
+                                created_at=datetime(2025, 1, i), likes_count=10 * i))
+        self.db.commit()
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+
+    @patch('routes.profile_routes.logger')
+    @patch('routes.profile_routes.verify', return_value=True)
+    def test_posts_newest_first_in_constant_queries(self, mock_verify, mock_logger):
+        """Posts come newest first with their like counters, without a query per post"""
+        credentials = OAuth2PasswordRequestForm(username="creator", password="password123", scope="")
+        # User, followers, following, posts and comment previews
+        with assert_max_queries(5):
+            result = profile_login(user_credential=credentials, db=self.db)
+
+        self.assertEqual([post.title for post in result["content"]], [f"Post {i}" for i in range(5, 0, -1)])
+        self.assertEqual([post.total_likes for post in result["content"]], [50, 40, 30, 20, 10])
+
+class TestFollowListQueries(unittest.TestCase):
+    def setUp(self):
+        """Create an in-memory database where 30 users follow one user"""
+        self.engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(bind=self.engine)
+        self.SessionTesting = sessionmaker(bind=self.engine)
+        self.db = self.SessionTesting()
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.request = Request({"type": "http", "headers": []})
+
+        self.db.add(Registration(user_id=1, username="creator", email="creator@example.com"))
+        for i in range(2, 32):
+            self.db.add(Registration(user_id=i, username=f"fan{i}", email=f"fan{i}@example.com"))
+            self.db.add(Follows(follower_id=i, following_id=1, followed_at=datetime(2025, 1, 1, 0, i)))
+        self.db.commit()
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+
+    def test_followers_query_count_is_constant(self):
+        """A page of followers costs one user lookup and one join, regardless of size"""
+        with assert_max_queries(2):
+            result = get_followers(self.request, Response(), username="creator", limit=30, cursor=None, format="json", db=self.db)
+
+        self.assertEqual(len(result["followers"]), 30)
+        self.assertEqual(result["followers"][0]["username"], "fan31")
+
+    def test_followers_keyset_walk(self):
+        """Following next_cursor visits every follower exactly once"""
+        seen, cursor = [], None
+        while True:
+            result = get_followers(self.request, Response(), username="creator", limit=7, cursor=cursor, format="json", db=self.db)
+            seen.extend(row["username"] for row in result["followers"])
+            cursor = result["next_cursor"]
+            if cursor is None:
+                break
+
+        self.assertEqual(len(seen), 30)
+        self.assertEqual(len(set(seen)), 30)
+
+    def test_followers_not_modified(self):
+        """A current ETag is answered with 304 after only the user lookup; a new follower changes it"""
+        first = Response()
+        get_followers(self.request, first, username="creator", limit=30, cursor=None, format="json", db=self.db)
+        etag = first.headers["ETag"]
+        conditional = Request({"type": "http", "headers": [(b"if-none-match", etag.encode())]})
+
+        with assert_max_queries(1):
+            response = get_followers(conditional, Response(), username="creator", limit=30, cursor=None, format="json", db=self.db)
+        self.assertEqual(response.status_code, 304)
+
+        self.db.add(Registration(user_id=40, username="newfan", email="newfan@example.com"))
+        self.db.add(Follows(follower_id=40, following_id=1, followed_at=datetime(2025, 2, 1)))
+        invalidate_after_commit(self.db, "followers:1")
+        self.db.commit()
+
+        second = Response()
+        result = get_followers(conditional, second, username="creator", limit=30, cursor=None, format="json", db=self.db)
+        self.assertEqual(result["followers"][0]["username"], "newfan")
+        self.assertNotEqual(second.headers["ETag"], etag)
+
+    @patch('core.database.SessionLocal')
+    def test_followers_ndjson_export(self, mock_session_local):
+        """format=ndjson streams every follower as one JSON line"""
+        mock_session_local.side_effect = self.SessionTesting
+
+        response = get_followers(self.request, Response(), username="creator", limit=50, cursor=None, format="ndjson", db=self.db)
+
+        async def read_body():
+            return "".join([chunk async for chunk in response.body_iterator])
+
+        lines = asyncio.run(read_body()).splitlines()
+
+        self.assertEqual(response.media_type, "application/x-ndjson")
+        self.assertEqual(len(lines), 30)
+        self.assertEqual(json.loads(lines[-1])["username"], "fan2")
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
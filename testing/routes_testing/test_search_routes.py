@@ -4,6 +4,7 @@ from datetime import datetime
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
 
+from core.cache import cache
 from core.models import Registration, Content
 from routes.search_routes import search_users, search_content_by_title
 
@@ -11,6 +12,8 @@ class TestSearchRoutes(unittest.TestCase):
     def setUp(self):
         """Set up test cases"""
         self.db = Mock(spec=Session)
+        cache.clear()
+        self.addCleanup(cache.clear)
         self.current_user = Mock()
         self.current_user.user_id = 1
         self.current_user.username = "testuser"
@@ -18,7 +18,9 @@ class TestUserRoutes(unittest.TestCase):
     def setUp(self):
         """Set up test cases"""
         self.mock_db = Mock()
-        self.mock_background_tasks = Mock()
+        patcher = patch('routes.user_routes.io_executor')
+        self.mock_executor = patcher.start()
+        self.addCleanup(patcher.stop)
         
         # Common test data with proper date format
         self.valid_email = "test@example.com"
@@ -50,17 +52,36 @@ class TestUserRoutes(unittest.TestCase):
             
             result = await send_otp(
                 user=user,
-                background_tasks=self.mock_background_tasks,
                 db=self.mock_db
             )
             
             self.assertIn("OTP sent successfully", result["message"])
             self.mock_db.add.assert_called_once()
-            self.mock_background_tasks.add_task.assert_called_once()
+            self.mock_executor.submit.assert_called_once()
 
     def test_send_otp_new_user(self):
         self.loop.run_until_complete(self.async_test_send_otp_new_user())
 
+    async def async_test_send_otp_commits_before_emailing(self):
+        """Test the OTP is stored before its email is queued, and nothing is sent if the commit fails"""
+        self.mock_db.query.return_value.filter.return_value.first.return_value = None
+        self.mock_db.commit.side_effect = RuntimeError("database down")
+
+        with self.assertRaises(RuntimeError):
+            await send_otp(user=RegisterUser(email=self.valid_email), db=self.mock_db)
+        self.mock_executor.submit.assert_not_called()
+
+        # Shedding load after the commit still asks the client to retry
+        self.mock_db.commit.side_effect = None
+        self.mock_executor.submit.return_value = False
+        with self.assertRaises(HTTPException) as context:
+            await send_otp(user=RegisterUser(email=self.valid_email), db=self.mock_db)
+        self.assertEqual(context.exception.status_code, 503)
+        self.assertEqual(self.mock_db.commit.call_count, 2)
+
+    def test_send_otp_commits_before_emailing(self):
+        self.loop.run_until_complete(self.async_test_send_otp_commits_before_emailing())
+
     async def async_test_send_otp_existing_active_user(self):
         """Test sending OTP to an already active user"""
         mock_existing_user = Mock(
@@ -75,7 +96,6 @@ class TestUserRoutes(unittest.TestCase):
         with self.assertRaises(HTTPException) as context:
             await send_otp(
                 user=user,
-                background_tasks=self.mock_background_tasks,
                 db=self.mock_db
             )
         
@@ -122,7 +142,6 @@ class TestUserRoutes(unittest.TestCase):
             
             result = await complete_registration(
                 user_details=user_details,
-                background_tasks=self.mock_background_tasks,
                 db=self.mock_db
             )
             
@@ -158,7 +177,6 @@ class TestUserRoutes(unittest.TestCase):
             updated_user = RegisterUserDetails(**updated_user_data)
             
             result = await update_user(
-                background_tasks=self.mock_background_tasks,
                 user_id=1,
                 updated_user=updated_user,
                 db=self.mock_db,
@@ -167,7 +185,7 @@ class TestUserRoutes(unittest.TestCase):
             
             self.mock_db.commit.assert_called_once()
             self.mock_db.refresh.assert_called_once_with(mock_user)
-            self.mock_background_tasks.add_task.assert_called_once()
+            self.mock_executor.submit.assert_called_once()
 
     def test_update_user_success(self):
         self.loop.run_until_complete(self.async_test_update_user_success())
@@ -183,14 +201,13 @@ class TestUserRoutes(unittest.TestCase):
         
         await delete_user(
             user_id=1,
-            background_tasks=self.mock_background_tasks,
             db=self.mock_db,
             current_user=mock_current_user
         )
         
         self.mock_db.delete.assert_called_once_with(mock_user)
         self.mock_db.commit.assert_called_once()
-        self.mock_background_tasks.add_task.assert_called_once()
+        self.mock_executor.submit.assert_called_once()
 
     def test_delete_user_success(self):
         self.loop.run_until_complete(self.async_test_delete_user_success())
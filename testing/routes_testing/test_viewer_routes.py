@@ -0,0 +1,79 @@
+import unittest
+from unittest.mock import Mock, patch
+from pydantic import ValidationError
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from core.database import Base
+from core.models import Registration, Content, Likes, Follows
+from core.query_counter import assert_max_queries
+from schemas.viewer import ViewerStateRequest, MAX_VIEWER_STATE_IDS
+from routes.viewer_routes import viewer_state
+
+class TestViewerStateRoute(unittest.TestCase):
+    def setUp(self):
+        """Viewer 1 likes post 10 and follows user 2 out of a few posts and users"""
+        self.engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(bind=self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+
+        for user_id in (1, 2, 3):
+            self.db.add(Registration(user_id=user_id, username=f"user{user_id}", email=f"user{user_id}@example.com"))
+        self.db.add(Content(c_id=10, user_id=2, username="user2", title="A", caption="A"))
+        self.db.add(Content(c_id=11, user_id=3, username="user3", title="B", caption="B"))
+        self.db.add(Likes(user_id=1, post_id=10))
+        self.db.add(Follows(follower_id=1, following_id=2))
+        self.db.commit()
+
+        self.current_user = Mock()
+        self.current_user.user_id = 1
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+
+    @patch('routes.viewer_routes.logger')
+    def test_viewer_state_two_queries(self, mock_logger):
+        """Like and follow status for a batch costs one query per table"""
+        request = ViewerStateRequest(post_ids=[10, 11, 12], user_ids=[2, 3])
+
+        with assert_max_queries(2):
+            result = viewer_state(request=request, db=self.db, current_user=self.current_user)
+
+        self.assertEqual(result["liked"], {10: True, 11: False, 12: False})
+        self.assertEqual(result["following"], {2: True, 3: False})
+
+    @patch('routes.viewer_routes.logger')
+    def test_viewer_state_empty_lists(self, mock_logger):
+        """Empty requests do not touch the database"""
+        with assert_max_queries(0):
+            result = viewer_state(request=ViewerStateRequest(), db=self.db, current_user=self.current_user)
+
+        self.assertEqual(result, {"liked": {}, "following": {}})
+
+    @patch('tasks.viewer_state.like_buffer')
+    @patch('routes.viewer_routes.logger')
+    def test_viewer_state_reads_buffered_likes(self, mock_logger, mock_buffer):
+        """Likes still in the write-behind buffer override the stored state"""
+        mock_buffer.pending_for_user.return_value = {10: 0, 11: 1}
+
+        result = viewer_state(
+            request=ViewerStateRequest(post_ids=[10, 11]),
+            db=self.db,
+            current_user=self.current_user
+        )
+
+        self.assertEqual(result["liked"], {10: False, 11: True})
+
+    def test_viewer_state_request_limit(self):
+        """Requests above the id limit are rejected by validation"""
+        with self.assertRaises(ValidationError):
+            ViewerStateRequest(post_ids=list(range(MAX_VIEWER_STATE_IDS + 1)))
+
+if __name__ == '__main__':
+    unittest.main()
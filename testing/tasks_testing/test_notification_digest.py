@@ -0,0 +1,141 @@
+import unittest
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from core.database import Base
+from core.models import Registration, Content, Notification, NotificationOutbox
+from tasks.notification_digest import DIGEST_EMAIL, NotificationDigest, render_digest
+
+class TestNotificationDigest(unittest.TestCase):
+    def setUp(self):
+        """Users 1 and 2 own one post each; users 3-50 engage with them"""
+        self.engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(bind=self.engine)
+        self.SessionTesting = sessionmaker(bind=self.engine)
+
+        db = self.SessionTesting()
+        for user_id in range(1, 51):
+            db.add(Registration(user_id=user_id, username=f"user{user_id}", email=f"user{user_id}@example.com"))
+        db.add(Content(c_id=10, user_id=1, username="user1", title="Sunset", caption="A"))
+        db.add(Content(c_id=11, user_id=1, username="user1", title="Beach", caption="B"))
+        db.add(Content(c_id=20, user_id=2, username="user2", title="Mountain", caption="C"))
+        db.commit()
+        db.close()
+
+        # A long window keeps the flusher thread out of the way; tests flush explicitly
+        self.digest = NotificationDigest(session_factory=self.SessionTesting, window_seconds=3600)
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def queued(self):
+        db = self.SessionTesting()
+        try:
+            entries = db.query(NotificationOutbox).order_by(NotificationOutbox.id).all()
+            self.assertTrue(all(entry.kind == DIGEST_EMAIL for entry in entries))
+            return {entry.payload["to_email"]: entry.payload["posts"] for entry in entries}
+        finally:
+            db.close()
+
+    @patch('tasks.notification_digest.logger')
+    def test_burst_collapses_into_one_email_per_owner(self, mock_logger):
+        """Thousands of events for one owner become a single digest"""
+        for _ in range(20):
+            for user_id in range(3, 51):
+                self.digest.record_like(10, user_id, f"user{user_id}")
+        self.digest.record_like(20, 3, "user3")
+
+        self.assertEqual(self.digest.flush(), 2)
+
+        queued = self.queued()
+        self.assertEqual(set(queued), {"user1@example.com", "user2@example.com"})
+        [post] = queued["user1@example.com"]
+        self.assertEqual(post["likes"], 48)
+        self.assertEqual(post["likers"], ["user3", "user4", "user5"])
+        self.assertEqual(len(self.digest), 0)
+
+    @patch('tasks.notification_digest.logger')
+    def test_retracted_and_own_activity_not_notified(self, mock_logger):
+        """Undone likes and the owner's own likes and comments are left out"""
+        self.digest.record_like(10, 3, "user3")
+        self.digest.retract_like(10, 3)
+        self.digest.record_like(10, 1, "user1")
+        self.digest.record_comment(10, 1, "user1", "Thanks all")
+
+        self.assertEqual(self.digest.flush(), 0)
+        self.assertEqual(self.queued(), {})
+
+    @patch('tasks.notification_digest.logger')
+    def test_comments_and_likes_across_posts(self, mock_logger):
+        """One owner's posts share a digest with counts and the latest comments"""
+        self.digest.record_like(10, 3, "user3")
+        for i in range(5):
+            self.digest.record_comment(11, 4, "user4", f"comment {i}")
+        self.digest.record_comment(11, 5, "user5", "nice")
+
+        self.digest.flush()
+
+        posts = self.queued()["user1@example.com"]
+        self.assertEqual([post["title"] for post in posts], ["Sunset", "Beach"])
+        self.assertEqual(posts[1]["comments"], 6)
+        self.assertEqual(posts[1]["latest_comments"], [["user4", "comment 3"], ["user4", "comment 4"], ["user5", "nice"]])
+
+        subject, body = render_digest(posts)
+        self.assertEqual(subject, "Trend Connect Notifications: Your posts received 1 like and 6 comments")
+        self.assertIn("user3 liked it", body)
+        self.assertIn("user5: nice", body)
+
+    @patch('tasks.notification_digest.logger')
+    def test_failed_flush_keeps_events(self, mock_logger):
+        """A window that cannot be queued is merged into the next one"""
+        self.digest.record_like(10, 3, "user3")
+
+        with patch.object(NotificationDigest, '_queue_digests', side_effect=RuntimeError("database down")):
+            self.assertEqual(self.digest.flush(), 0)
+        self.digest.record_like(10, 4, "user4")
+
+        self.assertEqual(self.digest.flush(), 1)
+        self.assertEqual(self.queued()["user1@example.com"][0]["likers"], ["user3", "user4"])
+
+    @patch('tasks.notification_digest.logger')
+    def test_likes_reach_inbox_in_one_write_per_owner(self, mock_logger):
+        """Buffered likes become inbox notifications and move each owner's unread counter once"""
+        for user_id in range(3, 51):
+            self.digest.record_like(10, user_id, f"user{user_id}")
+        self.digest.record_like(20, 3, "user3")
+        self.digest.record_like(20, 4, "user4")
+        self.digest.retract_like(20, 4)
+        self.digest.record_like(20, 2, "user2")  # Own like, not notified
+        self.digest.record_comment(11, 5, "user5", "nice")  # Comments are written to the inbox by their route
+
+        db = self.SessionTesting()
+        db.get(Registration, 2).email_notifications = False  # Inbox only
+        db.commit()
+        db.close()
+
+        self.assertEqual(self.digest.flush(), 1)
+
+        db = self.SessionTesting()
+        try:
+            notifications = db.query(Notification.user_id, Notification.actor_id, Notification.kind, Notification.post_id).all()
+            self.assertEqual(len(notifications), 49)
+            self.assertEqual({(user_id, kind) for user_id, _, kind, _ in notifications}, {(1, "like"), (2, "like")})
+            self.assertIn((2, 3, "like", 20), notifications)
+            counters = dict(db.query(Registration.user_id, Registration.unread_notifications).filter(Registration.user_id.in_([1, 2, 3])).all())
+            self.assertEqual(counters, {1: 48, 2: 1, 3: 0})
+        finally:
+            db.close()
+
+    def test_render_single_post_subject(self):
+        """A likes-only digest for one post names the first likers"""
+        subject, _ = render_digest([{"title": "Sunset", "likes": 42, "likers": ["a", "b", "c"], "comments": 0, "latest_comments": []}])
+        self.assertEqual(subject, "Trend Connect Notifications: a, b, c and 39 others liked your post \"Sunset\"")
+
+if __name__ == '__main__':
+    unittest.main()
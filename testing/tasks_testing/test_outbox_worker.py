@@ -0,0 +1,121 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from core.database import Base
+from core.models import Registration, Content, Follows, NotificationOutbox
+from tasks.notify_followers import NEW_POST, NEW_POST_EMAIL, enqueue_new_post_notification
+from tasks.outbox_worker import OutboxWorker
+
+class TestOutboxWorker(unittest.TestCase):
+    def setUp(self):
+        """User 1 has three followers, one of them without an email address"""
+        self.engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(bind=self.engine)
+        self.SessionTesting = sessionmaker(bind=self.engine)
+
+        db = self.SessionTesting()
+        db.add(Registration(user_id=1, username="author", email="author@example.com"))
+        db.add(Registration(user_id=2, username="user2", email="user2@example.com"))
+        db.add(Registration(user_id=3, username="user3", email="user3@example.com"))
+        db.add(Registration(user_id=4, username="user4", email=None))
+        for follower_id in (2, 3, 4):
+            db.add(Follows(follower_id=follower_id, following_id=1))
+        content = Content(c_id=10, user_id=1, username="author", title="Hello", caption="World")
+        db.add(content)
+        db.flush()
+        enqueue_new_post_notification(db, content)
+        db.commit()
+        db.close()
+
+        self.worker = OutboxWorker(session_factory=self.SessionTesting, concurrency=2, max_attempts=2)
+
+    def tearDown(self):
+        self.worker.executor.shutdown(wait=True)
+        self.engine.dispose()
+
+    def entries(self):
+        db = self.SessionTesting()
+        try:
+            return db.query(NotificationOutbox).order_by(NotificationOutbox.id).all()
+        finally:
+            db.close()
+
+    def make_due(self):
+        db = self.SessionTesting()
+        db.query(NotificationOutbox).update({"next_attempt_at": datetime.utcnow() - timedelta(seconds=1)})
+        db.commit()
+        db.close()
+
+    @patch('tasks.outbox_worker.logger')
+    @patch('tasks.notify_followers.send_email_notification')
+    def test_fan_out_then_deliver(self, mock_send, mock_logger):
+        """A new post expands into one email per reachable follower, then all are delivered"""
+        self.assertEqual([entry.kind for entry in self.entries()], [NEW_POST])
+
+        self.assertEqual(self.worker.process_once(), 1)
+        emails = self.entries()
+        self.assertEqual([entry.kind for entry in emails], [NEW_POST_EMAIL, NEW_POST_EMAIL])
+        self.assertEqual(
+            sorted(entry.payload["to_email"] for entry in emails),
+            ["user2@example.com", "user3@example.com"]
+        )
+        mock_send.assert_not_called()
+
+        self.assertEqual(self.worker.process_once(), 2)
+        self.assertEqual(self.entries(), [])
+        self.assertEqual(
+            sorted(call.args[0] for call in mock_send.call_args_list),
+            ["user2@example.com", "user3@example.com"]
+        )
+        mock_send.assert_called_with(mock_send.call_args.args[0], "Hello", "World", "author")
+
+    @patch('tasks.outbox_worker.logger')
+    @patch('tasks.notify_followers.send_email_notification')
+    def test_failed_delivery_backs_off_then_dead_letters(self, mock_send, mock_logger):
+        """Failures are rescheduled with backoff and dead-lettered after max attempts"""
+        self.worker.process_once()
+
+        def send(to_email, *args):
+            if to_email == "user3@example.com":
+                raise RuntimeError("mailbox full")
+        mock_send.side_effect = send
+
+        before = datetime.utcnow()
+        self.worker.process_once()
+        [failed] = self.entries()
+        self.assertEqual(failed.payload["to_email"], "user3@example.com")
+        self.assertEqual(failed.status, "pending")
+        self.assertEqual(failed.attempts, 1)
+        self.assertEqual(failed.last_error, "mailbox full")
+        self.assertGreaterEqual(failed.next_attempt_at, before + timedelta(seconds=self.worker.backoff_seconds))
+
+        self.assertEqual(self.worker.process_once(), 0)  # Not due yet
+
+        self.make_due()
+        self.worker.process_once()
+        [dead] = self.entries()
+        self.assertEqual(dead.status, "dead")
+        self.assertEqual(dead.attempts, 2)
+
+        self.make_due()
+        self.assertEqual(self.worker.process_once(), 0)
+
+    @patch('tasks.outbox_worker.logger')
+    def test_claim_leases_entries(self, mock_logger):
+        """Claimed entries are hidden from other workers until the lease expires"""
+        self.assertEqual(len(self.worker.claim()), 1)
+        self.assertEqual(self.worker.claim(), [])
+
+        self.make_due()
+        self.assertEqual(len(self.worker.claim()), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from core.database import Base
+from core.models import Registration, Content, Likes, Comment, TrendingScore
+from core.trending import COMMENT, LIKE, TrendingEngine
+from tasks.trending_rebuild import rebuild_trending_scores
+
+HALF_LIFE = 3600
+START = datetime(2026, 10, 19, 12, 0, 0)
+
+class TestTrendingRebuild(unittest.TestCase):
+    def setUp(self):
+        """Three posts liked and commented on over the last hours, one long ago"""
+        self.engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(bind=self.engine)
+        self.SessionTesting = sessionmaker(bind=self.engine)
+        self.now = (START - datetime(1970, 1, 1)).total_seconds()
+
+        db = self.SessionTesting()
+        for user_id in range(1, 6):
+            db.add(Registration(user_id=user_id, username=f"user{user_id}", email=f"user{user_id}@example.com"))
+        for c_id in range(1, 5):
+            db.add(Content(c_id=c_id, user_id=1, username="user1", title=f"Post {c_id}", caption="A"))
+        self.events = [
+            (LIKE, 1, 2, START - timedelta(hours=3)),
+            (LIKE, 1, 3, START - timedelta(hours=1)),
+            (COMMENT, 2, 2, START - timedelta(minutes=10)),
+            (LIKE, 3, 4, START),
+            (LIKE, 4, 5, START - timedelta(days=30)),
+        ]
+        for kind, post_id, user_id, created_at in self.events:
+            if kind == LIKE:
+                db.add(Likes(user_id=user_id, post_id=post_id, created_at=created_at))
+            else:
+                db.add(Comment(user_id=user_id, post_id=post_id, user_comment="Nice", created_at=created_at))
+        db.add(TrendingScore(post_id=99, epoch=0, score=1.0))
+        db.commit()
+        db.close()
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def test_rebuild_matches_incremental_scores(self):
+        """Scores recomputed from timestamps rank like the ones recorded as events happened"""
+        db = self.SessionTesting()
+        self.assertEqual(rebuild_trending_scores(db, now=self.now, half_life=HALF_LIFE), 3)
+        db.commit()
+        self.assertIsNone(db.get(TrendingScore, 99))
+        self.assertIsNone(db.get(TrendingScore, 4))
+        db.close()
+
+        incremental = TrendingEngine(session_factory=None, size=10, half_life=HALF_LIFE, clock=lambda: self.now)
+        for kind, post_id, _, created_at in self.events[:4]:
+            incremental.record(post_id, kind, at=(created_at - datetime(1970, 1, 1)).total_seconds())
+
+        rebuilt = TrendingEngine(session_factory=self.SessionTesting, size=10, half_life=HALF_LIFE, clock=lambda: self.now)
+        rebuilt.sync()
+
+        self.assertEqual([post_id for post_id, _ in rebuilt.top()], [2, 3, 1])
+        for (post_id, heat), (expected_id, expected_heat) in zip(rebuilt.top(), incremental.top()):
+            self.assertEqual(post_id, expected_id)
+            self.assertAlmostEqual(heat, expected_heat)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+from utils.email_service import send_email, send_bulk_email
+from utils.mail_templates import PRELOADED_TEMPLATES, preload_templates, render, render_many, template_env
+
+class TestMailTemplates(unittest.TestCase):
+    @patch('utils.mail_templates.logger')
+    def test_templates_resolved_from_project(self, mock_logger):
+        """All bundled templates load without a machine specific path"""
+        preload_templates()
+        for template_name in PRELOADED_TEMPLATES:
+            self.assertIs(template_env.get_template(template_name), template_env.get_template(template_name))
+
+    def test_render_many_escapes_each_context(self):
+        """Bulk rendering produces one autoescaped body per context"""
+        bodies = render_many("userupdate.html", [{"username": "alice"}, {"username": "<b>bob</b>"}])
+
+        self.assertEqual(len(bodies), 2)
+        self.assertIn("Dear alice,", bodies[0])
+        self.assertIn("Dear &lt;b&gt;bob&lt;/b&gt;,", bodies[1])
+        self.assertEqual(bodies[0], render("userupdate.html", {"username": "alice"}))
+
+class TestEmailService(unittest.TestCase):
+    @patch('utils.email_service.get_mail_transport')
+    def test_send_email_uses_shared_transport(self, mock_transport):
+        """A templated email is sent as HTML over the pooled transport"""
+        asyncio.run(send_email("user@example.com", "Your OTP", "styles.html", {"otp": "123456"}))
+
+        message = mock_transport.return_value.send.call_args.args[0]
+        self.assertEqual(message["To"], "user@example.com")
+        self.assertEqual(message.get_content_subtype(), "html")
+        self.assertIn("123456", message.get_content())
+
+    @patch('utils.email_service.get_mail_transport')
+    def test_send_bulk_email_reports_failures(self, mock_transport):
+        """A batch goes out in one send_many call and failed addresses are returned"""
+        mock_transport.return_value.send_many.side_effect = lambda messages: messages[1:]
+
+        failed = asyncio.run(send_bulk_email(
+            [("a@example.com", {"username": "a"}), ("b@example.com", {"username": "b"})],
+            "Account Updated - Trend Connect",
+            "userupdate.html"
+        ))
+
+        self.assertEqual(failed, ["b@example.com"])
+        mock_transport.return_value.send_many.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()
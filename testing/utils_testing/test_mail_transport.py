@@ -0,0 +1,84 @@
+import smtplib
+import unittest
+from unittest.mock import MagicMock, patch
+from utils.mail_transport import SMTPConnectionPool, build_message
+
+class TestSMTPConnectionPool(unittest.TestCase):
+    def setUp(self):
+        """A pool over a mocked smtplib.SMTP"""
+        patcher = patch('utils.mail_transport.smtplib.SMTP')
+        self.mock_smtp_class = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mock_smtp_class.side_effect = lambda *args, **kwargs: MagicMock()
+
+        self.pool = SMTPConnectionPool(
+            host="smtp.example.com",
+            port=587,
+            username="user",
+            password="secret",
+            size=2,
+            idle_seconds=30
+        )
+        self.message = build_message("to@example.com", "Subject", "Body")
+
+    def test_connection_reused_across_sends(self):
+        """Connect, STARTTLS and LOGIN happen once for many messages"""
+        for _ in range(5):
+            self.pool.send(self.message)
+
+        self.assertEqual(self.mock_smtp_class.call_count, 1)
+        smtp = self.pool._idle.get_nowait().smtp
+        smtp.starttls.assert_called_once()
+        smtp.login.assert_called_once_with("user", "secret")
+        self.assertEqual(smtp.send_message.call_count, 5)
+
+    def test_idle_connection_reconnects_when_dropped(self):
+        """A connection idle past the limit is probed and replaced if dead"""
+        self.pool.send(self.message)
+        conn = self.pool._idle.queue[-1]
+        conn.last_used -= 60
+        conn.smtp.noop.side_effect = smtplib.SMTPServerDisconnected()
+
+        self.pool.send(self.message)
+
+        self.assertEqual(self.mock_smtp_class.call_count, 2)
+        conn.smtp.send_message.assert_called_once()
+
+    def test_send_retries_after_disconnect(self):
+        """A message is retried once on a fresh connection when the server hangs up"""
+        self.pool.send(self.message)
+        stale = self.pool._idle.queue[-1].smtp
+        stale.send_message.side_effect = smtplib.SMTPServerDisconnected()
+
+        self.pool.send(self.message)
+
+        self.assertEqual(self.mock_smtp_class.call_count, 2)
+        fresh = self.pool._idle.get_nowait().smtp
+        self.assertIsNot(fresh, stale)
+        fresh.send_message.assert_called_once_with(self.message)
+
+    def test_send_many_returns_failures(self):
+        """Refused recipients are reported without aborting the batch"""
+        smtp = MagicMock()
+        smtp.send_message.side_effect = [None, smtplib.SMTPRecipientsRefused({}), None]
+        self.mock_smtp_class.side_effect = lambda *args, **kwargs: smtp
+        messages = [build_message(f"user{i}@example.com", "Subject", "Body") for i in range(3)]
+
+        failed = self.pool.send_many(messages)
+
+        self.assertEqual(failed, [messages[1]])
+        self.assertEqual(smtp.send_message.call_count, 3)
+        self.assertEqual(self.mock_smtp_class.call_count, 1)
+
+    def test_close_logs_out_idle_connections(self):
+        """close() quits every idle connection"""
+        self.pool.send(self.message)
+        smtp = self.pool._idle.queue[-1].smtp
+
+        self.pool.close()
+
+        smtp.quit.assert_called_once()
+        self.assertTrue(self.pool._idle.empty())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,43 +1,34 @@
-from jinja2 import Environment, FileSystemLoader
-from fastapi_mail import MessageSchema, FastMail
-from fastapi_mail.config import ConnectionConfig
+from typing import List, Tuple
 from fastapi import HTTPException
-from configuration.config import settings
+from fastapi.concurrency import run_in_threadpool
+from utils.mail_templates import render, render_many
+from utils.mail_transport import get_mail_transport, build_message
 
-# Set up email configuration
-mail_config = ConnectionConfig(
-    MAIL_USERNAME=settings.EMAIL_USERNAME,
-    MAIL_PASSWORD=settings.EMAIL_PASSWORD,
-    MAIL_FROM=settings.MAIL_FROM,
-    MAIL_PORT=settings.SMTP_PORT,
-    MAIL_SERVER=settings.SMTP_SERVER,
-    MAIL_FROM_NAME="Trend Connect",
-    MAIL_STARTTLS=settings.MAIL_TLS,
-    MAIL_SSL_TLS=settings.MAIL_SSL,
-    USE_CREDENTIALS=settings.USE_CREDENTIALS
-)
-
-# Jinja2 Template Environment Setup
-template_env = Environment(
-    loader=FileSystemLoader('E:\\TrendConnect\\templates'),  # Corrected file path
-    autoescape=True
-)
+def deliver_email(email: str, subject: str, template_name: str, context: dict):
+    """Blocking variant of send_email for worker threads (background executor, outbox)."""
+    # Render the cached template with context data
+    html_body = render(template_name, context)
+    get_mail_transport().send(build_message(email, subject, html_body, subtype="html"))
 
 async def send_email(email: str, subject: str, template_name: str, context: dict):
     try: 
-        # Render the template with context data
-        template = template_env.get_template(template_name)
-        html_body = template.render(context)
-        
-        
-        # Send email using FastMail
-        message = MessageSchema(
-            subject=subject,
-            recipients=[email],
-            body=html_body,
-            subtype="html",
-        )
-        fm = FastMail(mail_config)
-        await fm.send_message(message)
+        # Send over the shared SMTP pool without blocking the event loop
+        await run_in_threadpool(deliver_email, email, subject, template_name, context)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error sending email: {e}")
+
+async def send_bulk_email(recipients: List[Tuple[str, dict]], subject: str, template_name: str) -> List[str]:
+    """
+    Renders one template for every (email, context) pair and sends the batch
+    back to back over one pooled connection. Returns the addresses that failed.
+    """
+    try:
+        bodies = render_many(template_name, (context for _, context in recipients))
+        messages = [
+            build_message(email, subject, body, subtype="html")
+            for (email, _), body in zip(recipients, bodies)
+        ]
+        failed = await run_in_threadpool(get_mail_transport().send_many, messages)
+        return [message["To"] for message in failed]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error sending emails: {e}")
@@ -0,0 +1,37 @@
+import os
+from typing import Iterable, List
+from jinja2 import Environment, FileSystemLoader
+from Logging.logging import logger
+
+# Templates ship with the code: <repo>/templates, overridable for custom deployments
+TEMPLATE_DIR = os.getenv(
+    "MAIL_TEMPLATE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates")
+)
+
+# Compiled once at startup so the first email of each kind does not pay for parsing
+PRELOADED_TEMPLATES = ("styles.html", "userupdate.html", "userdelete.html", "new_post.html")
+
+# Outside production, edited templates are picked up without a restart
+template_env = Environment(
+    loader=FileSystemLoader(TEMPLATE_DIR),
+    autoescape=True,
+    auto_reload=os.getenv("ENVIRONMENT", "development") != "production"
+)
+
+
+def preload_templates():
+    """Compiles the known mail templates into the environment's cache."""
+    for template_name in PRELOADED_TEMPLATES:
+        template_env.get_template(template_name)
+    logger.info(f"Preloaded {len(PRELOADED_TEMPLATES)} mail templates from {TEMPLATE_DIR}")
+
+
+def render(template_name: str, context: dict) -> str:
+    return template_env.get_template(template_name).render(context)
+
+
+def render_many(template_name: str, contexts: Iterable[dict]) -> List[str]:
+    """Renders one template for many recipients, looking the template up once."""
+    template = template_env.get_template(template_name)
+    return [template.render(context) for context in contexts]
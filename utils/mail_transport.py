@@ -0,0 +1,191 @@
+import os
+import queue
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+from email.message import EmailMessage
+from typing import Iterable, List, Optional
+from configuration.config import settings
+from Logging.logging import logger
+
+# Authenticated SMTP connections kept open per worker process
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "4"))
+# Connections idle for longer than this are checked with NOOP before reuse
+SMTP_IDLE_SECONDS = int(os.getenv("SMTP_IDLE_SECONDS", "30"))
+SMTP_TIMEOUT_SECONDS = int(os.getenv("SMTP_TIMEOUT_SECONDS", "10"))
+
+SENDER_NAME = "Trend Connect"
+
+
+def build_message(to_email: str, subject: str, body: str, subtype: str = "plain", sender_name: Optional[str] = SENDER_NAME) -> EmailMessage:
+    """Builds a single-recipient message from the configured sender address."""
+    msg = EmailMessage()
+    msg["From"] = f"{sender_name} <{settings.MAIL_FROM}>" if sender_name else settings.MAIL_FROM
+    msg["To"] = to_email
+    msg["Subject"] = subject
+    msg.set_content(body, subtype=subtype)
+    return msg
+
+
+class _PooledConnection:
+    __slots__ = ("smtp", "last_used")
+
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.last_used = time.monotonic()
+
+
+class SMTPConnectionPool:
+    """
+    A bounded pool of connected, TLS-upgraded and logged-in SMTP sessions.
+
+    Connections are opened lazily up to `size`, handed out one caller at a
+    time and returned for reuse, so the TCP connect, EHLO, STARTTLS and AUTH
+    round trips are paid once per connection instead of once per message.
+    Connections idle for longer than `idle_seconds` are probed with NOOP and
+    transparently replaced if the server has dropped them.
+    """
+
+    def __init__(self, host: str, port: int, username: str = None, password: str = None,
+                 starttls: bool = True, ssl: bool = False, use_credentials: bool = True,
+                 size: int = SMTP_POOL_SIZE, idle_seconds: int = SMTP_IDLE_SECONDS,
+                 timeout: int = SMTP_TIMEOUT_SECONDS):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.ssl = ssl
+        self.use_credentials = use_credentials
+        self.idle_seconds = idle_seconds
+        self.timeout = timeout
+
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._closed = False
+
+    def _connect(self) -> _PooledConnection:
+        if self.ssl:
+            smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.starttls:
+                smtp.starttls()
+        if self.use_credentials:
+            smtp.login(self.username, self.password)
+        return _PooledConnection(smtp)
+
+    @staticmethod
+    def _discard(conn: _PooledConnection):
+        try:
+            conn.smtp.quit()
+        except Exception:
+            conn.smtp.close()
+
+    def _is_alive(self, conn: _PooledConnection) -> bool:
+        if time.monotonic() - conn.last_used < self.idle_seconds:
+            return True
+        try:
+            return conn.smtp.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    @contextmanager
+    def connection(self):
+        """Checks out a live connection; it is discarded instead of returned if the caller fails."""
+        self._slots.acquire()
+        conn = None
+        try:
+            try:
+                conn = self._idle.get_nowait()
+                if not self._is_alive(conn):
+                    self._discard(conn)
+                    conn = self._connect()
+            except queue.Empty:
+                conn = self._connect()
+
+            yield conn.smtp
+
+            conn.last_used = time.monotonic()
+            if self._closed:
+                self._discard(conn)
+            else:
+                self._idle.put(conn)
+        except BaseException:
+            if conn is not None:
+                self._discard(conn)
+            raise
+        finally:
+            self._slots.release()
+
+    def send(self, message: EmailMessage):
+        """Sends one message, retrying once on a fresh connection if the server hung up."""
+        try:
+            with self.connection() as smtp:
+                smtp.send_message(message)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            with self.connection() as smtp:
+                smtp.send_message(message)
+
+    def send_many(self, messages: Iterable[EmailMessage]) -> List[EmailMessage]:
+        """
+        Sends a batch back to back over one connection.
+        Returns the messages that could not be delivered.
+        """
+        failed = []
+        pending = list(messages)
+        while pending:
+            try:
+                with self.connection() as smtp:
+                    while pending:
+                        message = pending[0]
+                        try:
+                            smtp.send_message(message)
+                        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException):
+                            failed.append(message)
+                        pending.pop(0)
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                # Connection died mid-batch: the current message fails, the rest go on a new connection
+                failed.append(pending.pop(0))
+        return failed
+
+    def close(self):
+        """Closes every idle connection; connections in use are closed when returned."""
+        self._closed = True
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+
+_pool: Optional[SMTPConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_mail_transport() -> SMTPConnectionPool:
+    """The process-wide SMTP pool, created on first use from the mail settings."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = SMTPConnectionPool(
+                    host=settings.SMTP_SERVER,
+                    port=settings.SMTP_PORT,
+                    username=settings.EMAIL_USERNAME,
+                    password=settings.EMAIL_PASSWORD,
+                    starttls=settings.MAIL_TLS,
+                    ssl=settings.MAIL_SSL,
+                    use_credentials=settings.USE_CREDENTIALS,
+                )
+    return _pool
+
+
+def close_mail_transport():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            logger.info("SMTP connection pool closed")
+            _pool = None
@@ -0,0 +1,36 @@
+import base64
+import json
+from datetime import datetime
+from fastapi import HTTPException
+
+# Keyset cursors are opaque to clients: base64url encoded JSON of the last row's sort key
+def encode_cursor(sort_value: datetime, row_id: int) -> str:
+    payload = json.dumps([sort_value.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    """
+    Decodes a cursor created by encode_cursor into its (datetime, id) sort key.
+    Raises a 400 for anything that was not produced by this module.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+# Threads are walked in materialized-path order, so their cursor is the last row's path
+def encode_path_cursor(path: str) -> str:
+    return base64.urlsafe_b64encode(path.encode()).decode().rstrip("=")
+
+def decode_path_cursor(cursor: str) -> str:
+    """Decodes a cursor created by encode_path_cursor. Raises a 400 for anything else."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        path = base64.urlsafe_b64decode(padded.encode()).decode()
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not path.isdigit():
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return path